@@ -0,0 +1,87 @@
+// bench/edisBulk.bench.js
+//
+// Throughput of the bulk EDIS pipeline for 10/100/1000 ISINs against a local
+// mock of /edis/bulkform, next to a single POST with the whole list.
+// The mock answers after a base latency plus a per-ISIN cost, so the numbers
+// show how chunking and concurrency hide upstream processing time.
+//
+//   node bench/edisBulk.bench.js [baseLatencyMs] [perIsinMs]
+
+const http = require('http');
+const { performance } = require('perf_hooks');
+
+const BASE_LATENCY = parseFloat(process.argv[2]) || 20;
+const PER_ISIN = parseFloat(process.argv[3]) || 0.5;
+const SIZES = [10, 100, 1000];
+
+function startMockServer() {
+    const stats = { requests: 0 };
+    const server = http.createServer((req, res) => {
+        let body = '';
+        req.on('data', chunk => { body += chunk; });
+        req.on('end', () => {
+            stats.requests++;
+            const params = JSON.parse(body || '{}');
+            const count = Array.isArray(params.isin) ? params.isin.length : 1;
+            setTimeout(() => {
+                res.writeHead(200, { 'Content-Type': 'application/json' });
+                res.end(JSON.stringify({ edisFormHtml: '<form></form>', isins: count }));
+            }, BASE_LATENCY + PER_ISIN * count);
+        });
+    });
+
+    return new Promise((resolve) => {
+        server.listen(0, '127.0.0.1', () => resolve({ server, stats }));
+    });
+}
+
+// Deterministic, valid-looking ISINs with a few duplicates mixed in
+function makeISINs(count) {
+    const isins = [];
+    for (let i = 0; i < count; i++) {
+        isins.push(`INE${String(i % Math.ceil(count * 0.95)).padStart(9, '0')}`);
+    }
+    return isins;
+}
+
+async function run() {
+    const { server, stats } = await startMockServer();
+    process.env.DHAN_API_URL = `http://127.0.0.1:${server.address().port}`;
+
+    // Required after DHAN_API_URL is set, since services read it at load time
+    const bulkEDISService = require('../src/service/edisBulk');
+
+    const results = [];
+    for (const size of SIZES) {
+        const isins = makeISINs(size);
+
+        stats.requests = 0;
+        let start = performance.now();
+        await bulkEDISService.generateBulkEquityEDISForm([...new Set(isins)]);
+        const singleMs = performance.now() - start;
+
+        stats.requests = 0;
+        start = performance.now();
+        const report = await bulkEDISService.runBulkEDISPipeline(isins, { exchange: 'NSE', segment: 'EQ' });
+        const pipelineMs = performance.now() - start;
+
+        results.push({
+            isins: size,
+            unique: report.submitted,
+            duplicates: report.duplicates,
+            chunks: report.chunks,
+            upstreamRequests: stats.requests,
+            singlePost: { ms: +singleMs.toFixed(1), isinsPerSecond: Math.round(size / (singleMs / 1000)) },
+            pipeline: { ms: +pipelineMs.toFixed(1), isinsPerSecond: Math.round(size / (pipelineMs / 1000)) }
+        });
+    }
+
+    console.log(JSON.stringify({ baseLatencyMs: BASE_LATENCY, perIsinMs: PER_ISIN, results }, null, 2));
+    server.close();
+    require('../src/config/dhanHttpClient').close();
+}
+
+run().catch((error) => {
+    console.error(error);
+    process.exit(1);
+});
@@ -0,0 +1,80 @@
+// bench/lib/loadGenerator.js
+//
+// Open-loop load: requests start on a fixed schedule whether or not earlier
+// ones have finished, and latency is measured from the scheduled start, so
+// queueing delay is not hidden (no coordinated omission).
+
+const { performance } = require('perf_hooks');
+const { percentile } = require('./stats');
+
+function summarize(latencies) {
+    const sorted = Float64Array.from(latencies).sort();
+    const sum = sorted.reduce((acc, value) => acc + value, 0);
+    const round = value => +value.toFixed(3);
+    return {
+        p50: round(percentile(sorted, 50)),
+        p90: round(percentile(sorted, 90)),
+        p99: round(percentile(sorted, 99)),
+        p999: round(percentile(sorted, 99.9)),
+        max: round(sorted.length > 0 ? sorted[sorted.length - 1] : 0),
+        mean: round(sorted.length > 0 ? sum / sorted.length : 0)
+    };
+}
+
+// Call fn(i) `rate` times per second for durationMs. fn's promise settles
+// per request; a rejection counts as an error (by error.status when set).
+async function runOpenLoop({ rate, durationMs, fn, warmupMs = 0 }) {
+    const interval = 1000 / rate;
+    const total = Math.floor((rate * durationMs) / 1000);
+    const warmup = Math.floor((rate * warmupMs) / 1000);
+    const latencies = [];
+    const errors = {};
+    let completed = 0;
+    const pending = [];
+
+    const start = performance.now() + 1;
+    for (let i = 0; i < warmup + total; i++) {
+        const scheduledAt = start + i * interval;
+        const wait = scheduledAt - performance.now();
+        if (wait > 1) {
+            await new Promise(resolve => setTimeout(resolve, wait));
+        }
+
+        // A request fired early (timer granularity) is timed from when it actually starts
+        const startedAt = Math.min(scheduledAt, performance.now());
+        const measured = i >= warmup;
+        pending.push(Promise.resolve()
+            .then(() => fn(i))
+            .then(() => {
+                if (!measured) return;
+                completed++;
+                latencies.push(performance.now() - startedAt);
+            }, (error) => {
+                if (!measured) return;
+                const key = String(error.status || (error.response && error.response.status) || error.code || 'error');
+                errors[key] = (errors[key] || 0) + 1;
+            }));
+    }
+
+    const sendEnd = performance.now();
+    await Promise.all(pending);
+    const elapsed = performance.now() - (start + warmup * interval);
+
+    const errorCount = Object.values(errors).reduce((acc, count) => acc + count, 0);
+    return {
+        targetRps: rate,
+        durationMs,
+        sent: total,
+        completed,
+        errors: errorCount,
+        errorsByStatus: errors,
+        achievedRps: +(completed / (elapsed / 1000)).toFixed(1),
+        schedulerLagMs: +Math.max(0, sendEnd - (start + (warmup + total - 1) * interval)).toFixed(3),
+        latencyMs: summarize(latencies)
+    };
+}
+
+module.exports = {
+    runOpenLoop,
+    summarize
+};
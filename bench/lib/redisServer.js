@@ -0,0 +1,80 @@
+// bench/lib/redisServer.js
+//
+// Starts a throwaway redis-server for benchmark runs (no persistence).
+// Set REDIS_HOST to use an existing server instead.
+
+const { spawn } = require('child_process');
+const net = require('net');
+
+function waitForPort(port, timeoutMs) {
+    const deadline = Date.now() + timeoutMs;
+    return new Promise((resolve, reject) => {
+        const attempt = () => {
+            const socket = net.connect(port, '127.0.0.1');
+            socket.once('connect', () => {
+                socket.end();
+                resolve();
+            });
+            socket.once('error', () => {
+                socket.destroy();
+                if (Date.now() > deadline) {
+                    reject(new Error(`redis-server did not start on port ${port}`));
+                } else {
+                    setTimeout(attempt, 50);
+                }
+            });
+        };
+        attempt();
+    });
+}
+
+function freePort() {
+    return new Promise((resolve, reject) => {
+        const server = net.createServer();
+        server.once('error', reject);
+        server.listen(0, '127.0.0.1', () => {
+            const { port } = server.address();
+            server.close(() => resolve(port));
+        });
+    });
+}
+
+// Resolves to { host, port, external, stop() }
+async function startRedis(options = {}) {
+    if (process.env.REDIS_HOST) {
+        return {
+            host: process.env.REDIS_HOST,
+            port: parseInt(process.env.REDIS_PORT) || 6379,
+            external: true,
+            stop: async () => {}
+        };
+    }
+
+    const port = options.port || await freePort();
+    const child = spawn(options.binary || 'redis-server', [
+        '--port', String(port),
+        '--bind', '127.0.0.1',
+        '--save', '',
+        '--appendonly', 'no'
+    ], { stdio: 'ignore' });
+
+    const exited = new Promise((resolve, reject) => {
+        child.once('error', error => reject(new Error(`Could not start redis-server: ${error.message}`)));
+        child.once('exit', code => reject(new Error(`redis-server exited with code ${code}`)));
+    });
+
+    await Promise.race([waitForPort(port, 5000), exited]);
+    exited.catch(() => {});
+
+    return {
+        host: '127.0.0.1',
+        port,
+        external: false,
+        stop: () => new Promise((resolve) => {
+            child.once('exit', resolve);
+            child.kill('SIGTERM');
+        })
+    };
+}
+
+module.exports = { startRedis };
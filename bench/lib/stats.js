@@ -0,0 +1,12 @@
+// bench/lib/stats.js
+//
+// Latency statistics shared by the benchmarks.
+
+// Nearest-rank percentile (p in 0..100) of an ascending array
+function percentile(sorted, p) {
+    if (sorted.length === 0) return 0;
+    const index = Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1);
+    return sorted[Math.max(0, index)];
+}
+
+module.exports = { percentile };
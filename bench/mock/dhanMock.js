@@ -0,0 +1,256 @@
+// bench/mock/dhanMock.js
+//
+// Local stand-in for the Dhan v2 endpoints the services call, with
+// configurable latency, error injection and a capacity limit.
+//
+//   node bench/mock/dhanMock.js [port]
+//
+// Environment / options:
+//   MOCK_LATENCY_MS      base response latency (default 5)
+//   MOCK_JITTER_MS       extra uniform random latency (default 0)
+//   MOCK_ERROR_RATE      fraction of requests answered with MOCK_ERROR_STATUS (default 0)
+//   MOCK_ERROR_STATUS    status used for injected errors (default 500)
+//   MOCK_RATE_LIMIT_RATE fraction of requests answered with 429 (default 0)
+//   MOCK_GZIP            gzip bodies for clients that accept it (default false)
+//   MOCK_CAPACITY        requests served at once; the rest queue, adding latency (default 0 = unlimited)
+//   MOCK_MAX_QUEUE       queued requests before the mock answers 429 (default 0 = unbounded)
+//   MOCK_RETRY_AFTER_S   Retry-After seconds sent with 429s (default 0 = none)
+//   MOCK_POSITIONS       rows returned by GET /positions (default 0)
+
+const http = require('http');
+const zlib = require('zlib');
+
+const DEFAULTS = {
+    latencyMs: parseFloat(process.env.MOCK_LATENCY_MS) || 5,
+    jitterMs: parseFloat(process.env.MOCK_JITTER_MS) || 0,
+    errorRate: parseFloat(process.env.MOCK_ERROR_RATE) || 0,
+    errorStatus: parseInt(process.env.MOCK_ERROR_STATUS) || 500,
+    rateLimitRate: parseFloat(process.env.MOCK_RATE_LIMIT_RATE) || 0,
+    gzip: process.env.MOCK_GZIP === 'true',
+    capacity: parseInt(process.env.MOCK_CAPACITY) || 0,
+    maxQueue: parseInt(process.env.MOCK_MAX_QUEUE) || 0,
+    retryAfterS: parseFloat(process.env.MOCK_RETRY_AFTER_S) || 0,
+    positions: parseInt(process.env.MOCK_POSITIONS) || 0
+};
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+let orderSequence = 0;
+function nextOrderId() {
+    orderSequence++;
+    return String(1000000 + orderSequence);
+}
+
+// Parallel-array candles between two dates; one per day, or one per
+// `interval` minutes over the 6.25 h session for intraday
+function candles(fromDate, toDate, interval) {
+    const from = Date.parse(`${fromDate}T00:00:00Z`);
+    const to = Date.parse(`${toDate}T00:00:00Z`);
+    const data = { open: [], high: [], low: [], close: [], volume: [], timestamp: [] };
+
+    for (let day = from; day < to; day += DAY_MS) {
+        const sessionStart = day + (3 * 60 + 45) * 60 * 1000;   // 09:15 IST
+        const steps = interval ? Math.floor(375 / interval) : 1;
+        for (let i = 0; i < steps; i++) {
+            const price = 1000 + ((day / DAY_MS + i) % 50);
+            data.open.push(price);
+            data.high.push(price + 2);
+            data.low.push(price - 2);
+            data.close.push(price + 1);
+            data.volume.push(1000 + i);
+            data.timestamp.push(Math.floor((sessionStart + i * (interval || 0) * 60000) / 1000));
+        }
+    }
+    return data;
+}
+
+// Mostly open INTRADAY positions, with some CNC and some CLOSED rows
+function positions(count) {
+    const rows = [];
+    for (let i = 0; i < count; i++) {
+        const closed = i % 7 === 6;
+        const netQty = closed ? 0 : (10 + (i % 50)) * (i % 2 === 0 ? 1 : -1);
+        rows.push({
+            dhanClientId: '1000000001',
+            tradingSymbol: `SYM${i}`,
+            securityId: String(1000 + i),
+            positionType: closed ? 'CLOSED' : netQty > 0 ? 'LONG' : 'SHORT',
+            exchangeSegment: 'NSE_EQ',
+            productType: i % 5 === 4 ? 'CNC' : 'INTRADAY',
+            buyQty: Math.max(0, netQty),
+            sellQty: Math.max(0, -netQty),
+            netQty
+        });
+    }
+    return rows;
+}
+
+function quote(symbol) {
+    return { symbol, lastPrice: 1000 + (symbol.length % 10), volume: 12345, timestamp: Date.now() };
+}
+
+// Market quote LTP: { segment: [securityId] } -> { data: { segment: { id: { last_price } } } }
+function lastPrices(body) {
+    const data = {};
+    for (const [segment, ids] of Object.entries(body || {})) {
+        data[segment] = {};
+        for (const id of ids) {
+            data[segment][id] = { last_price: 1000 + (Number(id) % 100) / 4 };
+        }
+    }
+    return { data, status: 'success' };
+}
+
+// [method, path pattern, handler(body, match, query, settings)] -> response body
+const ROUTES = [
+    ['POST', /^\/orders$/, () => ({ orderId: nextOrderId(), orderStatus: 'TRANSIT' })],
+    ['POST', /^\/orders\/slicing$/, () => ({ orderId: nextOrderId(), orderStatus: 'TRANSIT' })],
+    ['POST', /^\/forever\/orders$/, () => ({ orderId: nextOrderId(), orderStatus: 'PENDING' })],
+    ['GET', /^\/forever\/orders$/, () => []],
+    ['DELETE', /^\/forever\/orders\/([^/]+)$/, (body, match) => ({ orderId: match[1], orderStatus: 'CANCELLED' })],
+    ['POST', /^\/positions\/convert$/, () => ({ status: 'success' })],
+    ['GET', /^\/positions$/, (body, match, query, settings) => positions(settings.positions)],
+    ['GET', /^\/holdings$/, () => []],
+    ['GET', /^\/users\/profile$/, () => ({ dhanClientId: '1000000001' })],
+    ['POST', /^\/charts\/historical$/, body => candles(body.fromDate, body.toDate)],
+    ['POST', /^\/charts\/intraday$/, body => candles(body.fromDate, body.toDate, parseInt(body.interval) || 1)],
+    ['GET', /^\/trades$/, () => [
+        { orderId: '1000001', exchangeTradeId: 'T1', tradedQuantity: 10, tradedPrice: 1000, securityId: '1333' }
+    ]],
+    ['GET', /^\/trades\/([^/]+)$/, (body, match) => [
+        { orderId: match[1], exchangeTradeId: `T${match[1]}`, tradedQuantity: 10, tradedPrice: 1000, securityId: '1333' }
+    ]],
+    ['POST', /^\/margincalculator$/, body => ({
+        totalMargin: (body.quantity || 1) * (body.price || 1) * 0.2,
+        spanMargin: 0,
+        exposureMargin: 0,
+        availableBalance: 1000000
+    })],
+    ['POST', /^\/killswitch$/, () => ({ killSwitchStatus: 'ACTIVATE' })],
+    ['GET', /^\/killswitch$/, () => ({ killSwitchStatus: 'DEACTIVATE' })],
+    ['POST', /^\/edis\/form$/, () => ({ edisFormHtml: '<form></form>' })],
+    ['POST', /^\/edis\/bulkform$/, body => ({ edisFormHtml: '<form></form>', isins: (body.isin || []).length })],
+    ['POST', /^\/marketfeed\/ltp$/, body => lastPrices(body)],
+    ['POST', /^\/quotes\/bulk$/, body => Object.fromEntries((body.symbols || []).map(symbol => [symbol, quote(symbol)]))],
+    ['GET', /^\/quotes\/([^/]+)$/, (body, match) => quote(match[1])],
+    ['GET', /^\/data\/market\/([^/]+)$/, (body, match) => quote(match[1])],
+    ['GET', /^\/data\/historical\/([^/]+)$/, (body, match, query) => candles(
+        query.get('from') || '2024-01-01',
+        query.get('to') || '2024-01-31',
+        parseInt(query.get('interval')) || 0
+    )]
+];
+
+// Start the mock; resolves to { url, port, stats, settings, close() }.
+// settings can be changed while running to vary latency or errors.
+function startDhanMock(options = {}) {
+    const settings = { ...DEFAULTS, ...options };
+    const stats = { requests: 0, errors: 0, rateLimited: 0, overloaded: 0, maxQueued: 0, byPath: {} };
+
+    // Like an overloaded upstream: past capacity, requests wait for a slot,
+    // and the work is done even if the client has given up by then
+    let active = 0;
+    const waiting = [];
+    const serve = (respond) => {
+        if (!settings.capacity || active < settings.capacity) {
+            active++;
+            respond();
+        } else {
+            waiting.push(respond);
+            stats.maxQueued = Math.max(stats.maxQueued, waiting.length);
+        }
+    };
+    const done = () => {
+        active--;
+        if (waiting.length > 0 && (!settings.capacity || active < settings.capacity)) {
+            active++;
+            waiting.shift()();
+        }
+    };
+
+    const server = http.createServer((req, res) => {
+        let raw = '';
+        req.on('data', chunk => { raw += chunk; });
+        req.on('end', () => {
+            // Accept both /v2/orders and /orders
+            const url = new URL(req.url, 'http://mock');
+            const path = url.pathname.replace(/^\/v2/, '');
+            stats.requests++;
+
+            let status = 200;
+            let body;
+            const roll = Math.random();
+            const overloaded = settings.capacity > 0 && settings.maxQueue > 0 && waiting.length >= settings.maxQueue;
+            if (overloaded || roll < settings.rateLimitRate) {
+                status = 429;
+                stats.rateLimited++;
+                if (overloaded) stats.overloaded++;
+                body = { errorCode: 'DH-904', message: 'Too many requests' };
+            } else if (roll < settings.rateLimitRate + settings.errorRate) {
+                status = settings.errorStatus;
+                stats.errors++;
+                body = { errorCode: 'DH-908', message: 'Injected error' };
+            } else {
+                const route = ROUTES.find(([method, pattern]) => method === req.method && pattern.test(path));
+                if (route) {
+                    stats.byPath[path] = (stats.byPath[path] || 0) + 1;
+                    let parsed = {};
+                    try {
+                        parsed = raw ? JSON.parse(raw) : {};
+                    } catch (error) {
+                        parsed = {};
+                    }
+                    body = route[2](parsed, path.match(route[1]), url.searchParams, settings);
+                } else {
+                    status = 404;
+                    body = { message: `No mock for ${req.method} ${path}` };
+                }
+            }
+
+            const send = () => {
+                let payload = JSON.stringify(body);
+                const headers = { 'Content-Type': 'application/json' };
+                if (status === 429 && settings.retryAfterS > 0) {
+                    headers['Retry-After'] = String(settings.retryAfterS);
+                }
+                if (settings.gzip && /\bgzip\b/.test(req.headers['accept-encoding'] || '')) {
+                    payload = zlib.gzipSync(payload);
+                    headers['Content-Encoding'] = 'gzip';
+                }
+                res.writeHead(status, headers);
+                res.end(payload);
+            };
+
+            // Shedding is immediate; everything else takes a capacity slot
+            if (overloaded) return send();
+            serve(() => {
+                const delay = settings.latencyMs + Math.random() * settings.jitterMs;
+                setTimeout(() => {
+                    send();
+                    done();
+                }, delay);
+            });
+        });
+    });
+
+    return new Promise((resolve) => {
+        server.listen(options.port || 0, '127.0.0.1', () => {
+            const port = server.address().port;
+            resolve({
+                url: `http://127.0.0.1:${port}/v2`,
+                port,
+                stats,
+                settings,
+                close: () => new Promise(done => server.close(done))
+            });
+        });
+    });
+}
+
+module.exports = { startDhanMock };
+
+if (require.main === module) {
+    startDhanMock({ port: parseInt(process.argv[2], 10) || 8700 }).then(({ url }) => {
+        console.log(`Dhan mock listening on ${url}`);
+    });
+}
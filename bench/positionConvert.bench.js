@@ -0,0 +1,88 @@
+// bench/positionConvert.bench.js
+//
+// End-of-day conversion of every open INTRADAY position to CNC against the
+// Dhan mock: one convertPosition call after another, versus
+// convertPositions. Both go through an order scheduler with Dhan's
+// published order limits (25/s, 250/min, 1000/h, 7000/day) rather than the
+// more conservative budget in Config.js, so the numbers reflect what the
+// account could actually do.
+//
+//   node bench/positionConvert.bench.js [--positions 200] [--latency 150]
+
+const path = require('path');
+const { parseArgs } = require('util');
+const { startDhanMock } = require('./mock/dhanMock');
+
+const DHAN_ORDER_LIMITS = {
+    second: { limit: 25, cost: 1 },
+    minute: { limit: 250, cost: 1 },
+    hour: { limit: 1000, cost: 1 },
+    day: { limit: 7000, cost: 1 }
+};
+
+async function main() {
+    const { values } = parseArgs({
+        options: {
+            positions: { type: 'string', default: '200' },
+            latency: { type: 'string', default: '150' }
+        }
+    });
+    const args = {
+        positions: parseInt(values.positions, 10),
+        latency: parseInt(values.latency, 10)
+    };
+
+    const mock = await startDhanMock({ latencyMs: args.latency, positions: args.positions });
+    process.env.DHAN_API_URL = mock.url;
+    const orderScheduler = require('../src/service/orderScheduler');
+    const positionConverter = require('../src/service/positionConverter');
+    const dhanHttpClient = require('../src/config/dhanHttpClient');
+
+    const converter = () => new positionConverter.constructor({
+        accessToken: 'bench-token',
+        dhanClientId: '1000000001',
+        scheduler: new orderScheduler.constructor(DHAN_ORDER_LIMITS)
+    });
+
+    // Sequential: fetch, then convert each eligible row and wait for it
+    const sequential = converter();
+    let start = Date.now();
+    const plan = await sequential.convertPositions({ fromProductType: 'INTRADAY', toProductType: 'CNC', dryRun: true });
+    let converted = 0;
+    for (const entry of plan.results) {
+        if (entry.status !== 'planned') continue;
+        await sequential.convertPosition({
+            fromProductType: entry.fromProductType,
+            exchangeSegment: entry.exchangeSegment,
+            positionType: entry.positionType,
+            securityId: entry.securityId,
+            convertQty: entry.convertQty,
+            toProductType: entry.toProductType
+        });
+        converted++;
+    }
+    const sequentialMs = Date.now() - start;
+
+    // Bulk
+    start = Date.now();
+    const report = await converter().convertAllIntradayToCNC();
+    const bulkMs = Date.now() - start;
+
+    console.log(JSON.stringify({
+        script: path.basename(__filename),
+        ...args,
+        eligible: plan.eligible,
+        skipped: plan.skipped,
+        sequential: { converted, elapsedMs: sequentialMs },
+        bulk: { converted: report.converted, failed: report.failed, elapsedMs: bulkMs },
+        speedup: +(sequentialMs / bulkMs).toFixed(1)
+    }, null, 2));
+
+    dhanHttpClient.close();
+    await mock.close();
+}
+
+main().catch((error) => {
+    console.error(error);
+    process.exit(1);
+});
@@ -0,0 +1,163 @@
+// bench/proxyStream.bench.js
+//
+// CPU time and peak RSS per MB proxied (uncompressed payload) for /historical/:symbol-style
+// responses, buffered (axios parses, res.json re-serializes) versus
+// streamed (dhanHttpClient.proxy pipes the upstream body through).
+// Each mode runs in its own child process so RSS peaks don't mix; the
+// mock upstream and the load driver stay in this process.
+//
+//   node bench/proxyStream.bench.js [--requests 40] [--concurrency 4]
+//                                   [--days 60] [--gzip]
+
+const http = require('http');
+const path = require('path');
+const { fork } = require('child_process');
+const { parseArgs } = require('util');
+const { performance } = require('perf_hooks');
+const { startDhanMock } = require('./mock/dhanMock');
+
+const MB = 1024 * 1024;
+
+// ---- Child: the proxy under test ------------------------------------------
+
+function runProxy() {
+    const express = require('express');
+    const dhanHttpClient = require('../src/config/dhanHttpClient');
+
+    // The same two code paths as routes/dataApi.routes.js, without the limiter
+    const app = express();
+    app.get('/historical/:symbol', async (req, res) => {
+        const config = { method: 'get', url: `/data/historical/${req.params.symbol}`, params: req.query };
+        try {
+            if (process.env.DHAN_PROXY_STREAM !== 'false') {
+                return await dhanHttpClient.proxy(req, res, config);
+            }
+            const response = await dhanHttpClient.api.request(config);
+            res.json(response.data);
+        } catch (error) {
+            res.status(error.response?.status || 500).json({ error: error.message });
+        }
+    });
+
+    const server = app.listen(0, '127.0.0.1', () => {
+        let cpuStart = null;
+        process.on('message', (message) => {
+            if (message === 'start') {
+                cpuStart = process.cpuUsage();
+            } else if (message === 'stop') {
+                const cpu = process.cpuUsage(cpuStart);
+                process.send({
+                    cpuMs: (cpu.user + cpu.system) / 1000,
+                    maxRssMb: process.resourceUsage().maxRSS / 1024
+                });
+                server.close();
+                dhanHttpClient.close();
+            }
+        });
+        process.send({ port: server.address().port, baseRssMb: process.memoryUsage().rss / MB });
+    });
+}
+
+// ---- Parent: upstream mock and load driver --------------------------------
+
+function request(port, urlPath, gzip) {
+    return new Promise((resolve, reject) => {
+        const headers = gzip ? { 'Accept-Encoding': 'gzip' } : {};
+        http.get({ host: '127.0.0.1', port, path: urlPath, headers }, (res) => {
+            let bytes = 0;
+            res.on('data', (chunk) => { bytes += chunk.length; });
+            res.on('end', () => {
+                if (res.statusCode !== 200) return reject(new Error(`HTTP ${res.statusCode}`));
+                resolve(bytes);
+            });
+        }).on('error', reject);
+    });
+}
+
+function nextMessage(child) {
+    return new Promise(resolve => child.once('message', resolve));
+}
+
+async function runMode(mode, mock, args) {
+    const child = fork(__filename, ['--child'], {
+        env: {
+            ...process.env,
+            DHAN_API_URL: mock.url,
+            DHAN_ACCESS_TOKEN: 'bench-token',
+            DHAN_PROXY_STREAM: mode === 'stream' ? 'true' : 'false'
+        }
+    });
+    const { port, baseRssMb } = await nextMessage(child);
+
+    const to = new Date(Date.parse('2024-01-01') + args.days * 24 * 3600 * 1000).toISOString().slice(0, 10);
+    const urlPath = `/historical/1333?interval=1&from=2024-01-01&to=${to}`;
+
+    // Warm-up (module loading and JIT don't count); the uncompressed size is the per-MB basis
+    const payloadBytes = await request(port, urlPath, false);
+    await request(port, urlPath, args.gzip);
+
+    child.send('start');
+    const start = performance.now();
+    let sent = 0;
+    let bytes = 0;
+    const worker = async () => {
+        while (sent < args.requests) {
+            sent++;
+            const received = await request(port, urlPath, args.gzip);
+            bytes += received;
+        }
+    };
+    await Promise.all(Array.from({ length: args.concurrency }, worker));
+    const elapsedMs = performance.now() - start;
+
+    child.send('stop');
+    const { cpuMs, maxRssMb } = await nextMessage(child);
+    child.kill();
+
+    const payloadMb = (payloadBytes * args.requests) / MB;
+    return {
+        mode,
+        requests: args.requests,
+        payloadMb: +payloadMb.toFixed(2),
+        wireMb: +(bytes / MB).toFixed(2),
+        elapsedMs: +elapsedMs.toFixed(1),
+        cpuMs: +cpuMs.toFixed(1),
+        cpuMsPerMb: +(cpuMs / payloadMb).toFixed(2),
+        baseRssMb: +baseRssMb.toFixed(1),
+        peakRssMb: +maxRssMb.toFixed(1)
+    };
+}
+
+async function main() {
+    const { values } = parseArgs({
+        options: {
+            child: { type: 'boolean', default: false },
+            requests: { type: 'string', default: '40' },
+            concurrency: { type: 'string', default: '4' },
+            days: { type: 'string', default: '60' },
+            gzip: { type: 'boolean', default: false }
+        }
+    });
+    if (values.child) return runProxy();
+
+    const args = {
+        requests: parseInt(values.requests, 10),
+        concurrency: parseInt(values.concurrency, 10),
+        days: parseInt(values.days, 10),
+        gzip: values.gzip
+    };
+    const mock = await startDhanMock({ latencyMs: 0, gzip: args.gzip });
+
+    const results = [];
+    for (const mode of ['buffered', 'stream']) {
+        results.push(await runMode(mode, mock, args));
+    }
+
+    console.log(JSON.stringify({ script: path.basename(__filename), ...args, results }, null, 2));
+    await mock.close();
+}
+
+main().catch((error) => {
+    console.error(error);
+    process.exit(1);
+});
@@ -0,0 +1,130 @@
+// bench/rateLimiter.bench.js
+//
+// Compares the old multi-command rate limit check with the single Lua call.
+// Needs a local redis-server (REDIS_HOST / REDIS_PORT, defaults to localhost:6379).
+//
+//   node bench/rateLimiter.bench.js [requests] [concurrency]
+
+const util = require('util');
+const { performance } = require('perf_hooks');
+const TieredRateLimiter = require('../src/middleware/rateLimit/ApiRateLimiter');
+const { percentile } = require('./lib/stats');
+
+const REQUESTS = parseInt(process.argv[2], 10) || 5000;
+const CONCURRENCY = parseInt(process.argv[3], 10) || 1;
+
+// The previous implementation, kept here only as the baseline
+async function legacyCheckRateLimit(limiter, ip, category) {
+    const client = limiter.redisClient;
+    const getAsync = util.promisify(client.get).bind(client);
+    const setAsync = util.promisify(client.set).bind(client);
+    const expireAsync = util.promisify(client.expire).bind(client);
+    const incrByAsync = util.promisify(client.incrby).bind(client);
+    const limits = limiter.rateLimits[category];
+
+    for (const [window, duration] of Object.entries(limiter.timeWindows)) {
+        if (!limits[window]) continue;
+        const key = `ratelimit:${ip}:${category}:${window}`;
+        let count = await getAsync(key);
+        if (!count) {
+            count = 0;
+            await setAsync(key, 0);
+            await expireAsync(key, duration);
+        }
+        if (parseInt(count) + limits[window].cost > limits[window].limit) {
+            return { allowed: false };
+        }
+    }
+
+    const updates = [];
+    for (const window of Object.keys(limiter.timeWindows)) {
+        if (!limits[window]) continue;
+        updates.push(incrByAsync(`ratelimit:${ip}:${category}:${window}`, limits[window].cost));
+    }
+    await Promise.all(updates);
+
+    const remaining = {};
+    for (const window of Object.keys(limiter.timeWindows)) {
+        if (!limits[window]) continue;
+        const count = await getAsync(`ratelimit:${ip}:${category}:${window}`);
+        remaining[window] = Math.floor((limits[window].limit - count) / limits[window].cost);
+    }
+    return { allowed: true, remaining };
+}
+
+// Count every command the client sends
+function countCommands(client) {
+    const counter = { commands: 0 };
+    const send = client.internal_send_command.bind(client);
+    client.internal_send_command = (command) => {
+        counter.commands++;
+        return send(command);
+    };
+    return counter;
+}
+
+async function run(name, limiter, counter, check) {
+    // Every request uses a fresh ip so limits never trip and both paths do full work
+    const latencies = [];
+    const before = counter.commands;
+    let next = 0;
+
+    const worker = async () => {
+        while (next < REQUESTS) {
+            const i = next++;
+            const start = performance.now();
+            await check(`bench-${name}-${process.pid}-${i}`, 'order');
+            latencies.push(performance.now() - start);
+        }
+    };
+
+    const started = performance.now();
+    await Promise.all(Array.from({ length: CONCURRENCY }, worker));
+    const elapsed = performance.now() - started;
+
+    latencies.sort((a, b) => a - b);
+    return {
+        name,
+        requests: REQUESTS,
+        concurrency: CONCURRENCY,
+        commandsPerRequest: (counter.commands - before) / REQUESTS,
+        throughput: Math.round(REQUESTS / (elapsed / 1000)),
+        p50Ms: +percentile(latencies, 50).toFixed(3),
+        p99Ms: +percentile(latencies, 99).toFixed(3)
+    };
+}
+
+// Fire a burst of concurrent requests at one ip and count how many got through
+async function overshoot(name, check, limiter) {
+    const ip = `bench-burst-${name}-${process.pid}`;
+    const { limit, cost } = limiter.rateLimits.order.second;
+    const results = await Promise.all(Array.from({ length: 50 }, () => check(ip, 'order')));
+    return {
+        name,
+        allowedInBurst: results.filter(r => r.allowed).length,
+        expectedMax: Math.floor(limit / cost)
+    };
+}
+
+async function main() {
+    const limiter = new TieredRateLimiter();
+    const counter = countCommands(limiter.redisClient);
+
+    // Load the script up front so it isn't counted against the first request
+    await limiter.loadScript();
+
+    const results = [
+        await run('legacy', limiter, counter, (ip, category) => legacyCheckRateLimit(limiter, ip, category)),
+        await run('lua', limiter, counter, (ip, category) => limiter.checkRateLimit(ip, category)),
+        await overshoot('legacy', (ip, category) => legacyCheckRateLimit(limiter, ip, category), limiter),
+        await overshoot('lua', (ip, category) => limiter.checkRateLimit(ip, category), limiter)
+    ];
+
+    console.log(JSON.stringify(results, null, 2));
+    limiter.redisClient.quit();
+}
+
+main().catch((error) => {
+    console.error('Benchmark failed:', error);
+    process.exit(1);
+});
@@ -0,0 +1,245 @@
+// bench/run.js
+//
+// Load-test suite: starts the Dhan mock and a local redis-server, then drives
+// services and Express routes at a fixed request rate (open loop) and prints
+// one JSON report with throughput, latency percentiles and limiter overhead.
+//
+//   node bench/run.js [--scenario a,b] [--rate 200] [--duration 5000]
+//                     [--latency 5] [--jitter 0] [--error-rate 0]
+//                     [--no-redis] [--out results.json]
+
+const fs = require('fs');
+const http = require('http');
+const os = require('os');
+const { parseArgs } = require('util');
+const { startDhanMock } = require('./mock/dhanMock');
+const { startRedis } = require('./lib/redisServer');
+const { runOpenLoop } = require('./lib/loadGenerator');
+
+const { values: args } = parseArgs({
+    options: {
+        scenario: { type: 'string' },
+        rate: { type: 'string', default: '200' },
+        duration: { type: 'string', default: '5000' },
+        warmup: { type: 'string', default: '500' },
+        latency: { type: 'string', default: '5' },
+        jitter: { type: 'string', default: '0' },
+        'error-rate': { type: 'string', default: '0' },
+        'no-redis': { type: 'boolean', default: false },
+        out: { type: 'string' }
+    }
+});
+
+const VALID_ORDER = {
+    transactionType: 'BUY',
+    exchangeSegment: 'NSE_EQ',
+    productType: 'INTRADAY',
+    orderType: 'LIMIT',
+    validity: 'DAY',
+    securityId: '1333',
+    quantity: 10,
+    price: 1500
+};
+
+// name -> { needsRedis, setup(context) -> fn(i), teardown(context)? }
+const SCENARIOS = {
+    'order-service': {
+        setup: ({ require: load }) => {
+            const orderService = load('../src/service/placeOrder.js');
+            // Bypass the order scheduler: this measures the request path, not the budget
+            return () => orderService.placeOrder(VALID_ORDER, { schedule: false });
+        }
+    },
+    'margin-service': {
+        setup: ({ require: load }) => {
+            const marginCalculator = load('../src/service/marginCalculator.py');
+            // 20 distinct legs, so the run mixes cache hits and upstream calls
+            return i => marginCalculator.calculateMargin({
+                dhanClientId: '1000000001',
+                exchangeSegment: 'NSE_EQ',
+                transactionType: 'BUY',
+                quantity: 1 + (i % 20),
+                productType: 'CNC',
+                securityId: '1333',
+                price: 1500
+            });
+        }
+    },
+    'chart-service': {
+        setup: ({ require: load }) => {
+            const chartDataService = load('../src/service/ohlcDaily.py');
+            return () => chartDataService.getHistoricalData({
+                securityId: '1333',
+                exchangeSegment: 'NSE_EQ',
+                instrument: 'EQUITY',
+                fromDate: '2024-01-01',
+                toDate: '2024-03-01'
+            }, { cache: false });
+        }
+    },
+    'trades-service': {
+        setup: ({ require: load }) => {
+            const tradesService = load('../src/service/trades.py');
+            return () => tradesService.getAllTrades();
+        }
+    },
+    'quote-route': {
+        needsRedis: true,
+        setup: (context) => {
+            // The quote budget is per client IP and every request comes from here,
+            // so lift it well above the offered rate for this scenario: it measures
+            // the route (limiter check included), not 429s
+            const { limiter, appUrl, rate } = context;
+            context.quoteLimits = limiter.rateLimits.quote;
+            const cost = context.quoteLimits.second.cost;
+            limiter.rateLimits.quote = { ...context.quoteLimits, second: { limit: rate * cost * 10, cost } };
+
+            const agent = new http.Agent({ keepAlive: true, maxSockets: 256 });
+            return i => httpGet(`${appUrl}/quotes/SYM${i % 50}`, {}, agent);
+        },
+        teardown: ({ limiter, quoteLimits }) => {
+            limiter.settleAll();
+            limiter.rateLimits.quote = quoteLimits;
+        }
+    },
+    'ratelimiter-redis': {
+        needsRedis: true,
+        setup: ({ limiter }) => i => limiter.checkRateLimit(`bench:${i % 1000}`, 'data')
+    },
+    'ratelimiter-hybrid': {
+        needsRedis: true,
+        setup: ({ limiter }) => i => limiter.checkRateLimit(`bench:${i % 100}`, 'quote')
+    }
+};
+
+function httpGet(url, headers, agent) {
+    return new Promise((resolve, reject) => {
+        const req = http.get(url, { headers, agent }, (res) => {
+            res.resume();
+            res.on('end', () => {
+                if (res.statusCode >= 400) {
+                    const error = new Error(`HTTP ${res.statusCode}`);
+                    error.status = res.statusCode;
+                    reject(error);
+                } else {
+                    resolve();
+                }
+            });
+        });
+        req.on('error', reject);
+    });
+}
+
+function startApp() {
+    const express = require('express');
+    const app = express();
+    app.use(express.json());
+    app.use(require('../src/routes/quoteApi.routes'));
+    return new Promise((resolve) => {
+        const server = app.listen(0, '127.0.0.1', () => {
+            resolve({ server, url: `http://127.0.0.1:${server.address().port}` });
+        });
+    });
+}
+
+async function main() {
+    const selected = args.scenario ? args.scenario.split(',') : Object.keys(SCENARIOS);
+    for (const name of selected) {
+        if (!SCENARIOS[name]) throw new Error(`Unknown scenario: ${name}`);
+    }
+
+    const mock = await startDhanMock({
+        latencyMs: parseFloat(args.latency),
+        jitterMs: parseFloat(args.jitter),
+        errorRate: parseFloat(args['error-rate'])
+    });
+
+    const useRedis = !args['no-redis'] && selected.some(name => SCENARIOS[name].needsRedis);
+    const redis = useRedis ? await startRedis() : null;
+
+    // Services read these once at load time, so set them before requiring anything from src
+    process.env.DHAN_API_URL = mock.url;
+    process.env.DHAN_ACCESS_TOKEN = process.env.DHAN_ACCESS_TOKEN || 'bench-token';
+    process.env.DHAN_CLIENT_ID = process.env.DHAN_CLIENT_ID || '1000000001';
+    if (redis) {
+        process.env.REDIS_HOST = redis.host;
+        process.env.REDIS_PORT = String(redis.port);
+    }
+
+    const context = { require, rate: parseInt(args.rate, 10) };
+    let app = null;
+    if (redis) {
+        context.limiter = require('../src/middleware/rateLimit').getInstance();
+        await context.limiter.loadScript('checkAndIncrement');
+        app = await startApp();
+        context.appUrl = app.url;
+    }
+
+    const report = {
+        timestamp: new Date().toISOString(),
+        node: process.version,
+        cpus: os.cpus().length,
+        settings: {
+            rate: parseInt(args.rate, 10),
+            durationMs: parseInt(args.duration, 10),
+            warmupMs: parseInt(args.warmup, 10),
+            mockLatencyMs: parseFloat(args.latency),
+            mockJitterMs: parseFloat(args.jitter),
+            mockErrorRate: parseFloat(args['error-rate']),
+            redis: redis ? `${redis.host}:${redis.port}` : null
+        },
+        scenarios: {}
+    };
+
+    for (const name of selected) {
+        const scenario = SCENARIOS[name];
+        if (scenario.needsRedis && !redis) {
+            report.scenarios[name] = { skipped: 'requires redis' };
+            continue;
+        }
+
+        const upstreamBefore = mock.stats.requests;
+        const fn = scenario.setup(context);
+        const result = await runOpenLoop({
+            rate: report.settings.rate,
+            durationMs: report.settings.durationMs,
+            warmupMs: report.settings.warmupMs,
+            fn
+        });
+        result.upstreamRequests = mock.stats.requests - upstreamBefore;
+        report.scenarios[name] = result;
+        if (scenario.teardown) scenario.teardown(context);
+    }
+
+    // p50/p99 cost of a limiter check, the overhead every routed request pays
+    for (const name of ['ratelimiter-redis', 'ratelimiter-hybrid']) {
+        const result = report.scenarios[name];
+        if (result && result.latencyMs) {
+            report.rateLimiterOverheadMs = report.rateLimiterOverheadMs || {};
+            report.rateLimiterOverheadMs[name.replace('ratelimiter-', '')] = {
+                p50: result.latencyMs.p50,
+                p99: result.latencyMs.p99
+            };
+        }
+    }
+
+    const json = JSON.stringify(report, null, 2);
+    if (args.out) {
+        fs.writeFileSync(args.out, `${json}\n`);
+    }
+    console.log(json);
+
+    if (app) app.server.close();
+    if (context.limiter) {
+        context.limiter.settleAll();
+        await require('../src/config/redisConfig').closeSharedClient();
+    }
+    require('../src/config/dhanHttpClient').close();
+    await mock.close();
+    if (redis) await redis.stop();
+}
+
+main().catch((error) => {
+    console.error(error);
+    process.exit(1);
+});
@@ -0,0 +1,138 @@
+// bench/triggerBook.bench.js
+//
+// Trigger book with 100k resting GTT/OCO legs: load time, per-tick
+// "near the price" lookups, and batch price updates, next to a linear scan
+// over the same legs.
+//
+//   node bench/triggerBook.bench.js [legs] [securities]
+
+const { performance } = require('perf_hooks');
+const TriggerBook = require('../src/service/triggerBook');
+
+const LEGS = parseInt(process.argv[2], 10) || 100000;
+const SECURITIES = parseInt(process.argv[3], 10) || 2000;
+const TICKS = 200000;
+const BATCH_SIZE = 500;
+const NEAR_PERCENT = 1;
+
+// Deterministic pseudo-random numbers, so runs are comparable
+let seed = 42;
+function random() {
+    seed = (seed * 1103515245 + 12345) & 0x7fffffff;
+    return seed / 0x7fffffff;
+}
+
+function basePrice(securityId) {
+    return 100 + (securityId % 100) * 25;
+}
+
+// Half single GTTs, half OCOs (two legs each), triggers within +-10% of the base price
+function makeOrders(legCount) {
+    const orders = [];
+    let legs = 0;
+    for (let i = 0; legs < legCount; i++) {
+        const securityId = i % SECURITIES;
+        const base = basePrice(securityId);
+        const order = {
+            orderId: String(100000 + i),
+            orderStatus: 'PENDING',
+            securityId: String(securityId),
+            exchangeSegment: 'NSE_EQ',
+            transactionType: 'SELL',
+            orderFlag: i % 2 === 0 ? 'SINGLE' : 'OCO',
+            quantity: 10,
+            price: base,
+            triggerPrice: +(base * (1 + (random() - 0.5) * 0.2)).toFixed(2)
+        };
+        legs++;
+        if (order.orderFlag === 'OCO' && legs < legCount) {
+            order.price1 = base;
+            order.quantity1 = 10;
+            order.triggerPrice1 = +(base * (1 + (random() - 0.5) * 0.2)).toFixed(2);
+            legs++;
+        }
+        orders.push(order);
+    }
+    return orders;
+}
+
+function time(fn) {
+    const start = performance.now();
+    const result = fn();
+    return { ms: performance.now() - start, result };
+}
+
+function run() {
+    const orders = makeOrders(LEGS);
+    const book = new TriggerBook({ nearPercent: NEAR_PERCENT });
+
+    const load = time(() => book.load(orders));
+    // First query per security pays for its sort
+    const firstQuery = time(() => {
+        for (let s = 0; s < SECURITIES; s++) book.near(String(s), basePrice(s));
+    });
+
+    // Random ticks around each security's base price
+    const ticks = [];
+    for (let i = 0; i < TICKS; i++) {
+        const securityId = Math.floor(random() * SECURITIES);
+        ticks.push([String(securityId), basePrice(securityId) * (1 + (random() - 0.5) * 0.2)]);
+    }
+
+    let found = 0;
+    const indexed = time(() => {
+        for (const [securityId, price] of ticks) {
+            found += book.near(securityId, price).length;
+        }
+    });
+
+    // Linear scan baseline over a flat leg list
+    const flat = [];
+    for (const order of orders) {
+        for (const leg of book.legsOf(order)) flat.push(leg);
+    }
+    const scanTicks = ticks.slice(0, 2000);
+    let scanFound = 0;
+    const scan = time(() => {
+        for (const [securityId, price] of scanTicks) {
+            const band = price * NEAR_PERCENT / 100;
+            for (const leg of flat) {
+                if (leg.securityId === securityId && Math.abs(leg.triggerPrice - price) <= band) scanFound++;
+            }
+        }
+    });
+
+    const batches = [];
+    for (let i = 0; i + BATCH_SIZE <= ticks.length; i += BATCH_SIZE) {
+        batches.push(ticks.slice(i, i + BATCH_SIZE));
+    }
+    const batched = time(() => {
+        for (const batch of batches) book.updatePrices(batch);
+    });
+
+    console.log(JSON.stringify({
+        legs: book.size,
+        securities: SECURITIES,
+        nearPercent: NEAR_PERCENT,
+        loadMs: +load.ms.toFixed(1),
+        firstQueryAllSecuritiesMs: +firstQuery.ms.toFixed(1),
+        indexed: {
+            ticks: TICKS,
+            nsPerTick: Math.round((indexed.ms * 1e6) / TICKS),
+            avgLegsNear: +(found / TICKS).toFixed(2)
+        },
+        linearScan: {
+            ticks: scanTicks.length,
+            nsPerTick: Math.round((scan.ms * 1e6) / scanTicks.length),
+            avgLegsNear: +(scanFound / scanTicks.length).toFixed(2)
+        },
+        batchUpdates: {
+            batchSize: BATCH_SIZE,
+            batches: batches.length,
+            usPerBatch: +((batched.ms * 1000) / batches.length).toFixed(1),
+            nsPerPrice: Math.round((batched.ms * 1e6) / (batches.length * BATCH_SIZE))
+        }
+    }, null, 2));
+}
+
+run();
@@ -0,0 +1,139 @@
+// bench/upstreamGuard.bench.js
+//
+// Goodput against a degraded Dhan mock, with the upstream guard (adaptive
+// concurrency + circuit breaker) on and off:
+//   overload: the mock serves `capacity` requests at once with `latency` ms
+//             each and queues the rest; the offered rate is above what that
+//             can serve. Goodput = successful responses within the SLO per second.
+//   outage:   every request fails after `latency` ms for the first half of
+//             the run, then the mock recovers.
+// Each mode runs in its own child process (fresh dhanHttpClient and guard)
+// against a fresh mock in this process.
+//
+//   node bench/upstreamGuard.bench.js [--rate 1200] [--duration 5000]
+//                                     [--capacity 16] [--latency 20] [--slo 500]
+
+const path = require('path');
+const { fork } = require('child_process');
+const { parseArgs } = require('util');
+const { performance } = require('perf_hooks');
+const { startDhanMock } = require('./mock/dhanMock');
+
+// ---- Child: load driver through dhanHttpClient -----------------------------
+
+async function runDriver({ rate, durationMs, sloMs }) {
+    const { runOpenLoop } = require('./lib/loadGenerator');
+    const dhanHttpClient = require('../src/config/dhanHttpClient');
+
+    let withinSlo = 0;
+    const failureLatencies = [];
+    const result = await runOpenLoop({
+        rate,
+        durationMs,
+        fn: async (i) => {
+            const start = performance.now();
+            try {
+                await dhanHttpClient.api.get(`/quotes/${1000 + (i % 50)}`);
+            } catch (error) {
+                failureLatencies.push(performance.now() - start);
+                throw error;
+            }
+            if (performance.now() - start <= sloMs) withinSlo++;
+        }
+    });
+
+    failureLatencies.sort((a, b) => a - b);
+    process.send({
+        ...result,
+        withinSlo,
+        goodputRps: +(withinSlo / (durationMs / 1000)).toFixed(1),
+        failureP50Ms: failureLatencies.length > 0 ? +failureLatencies[Math.floor(failureLatencies.length / 2)].toFixed(1) : 0,
+        guard: dhanHttpClient.upstreamGuard ? dhanHttpClient.upstreamGuard.getStats().quote : null
+    });
+    dhanHttpClient.close();
+}
+
+// ---- Parent: mock upstream and one child per mode --------------------------
+
+async function runMode(scenario, guard, args) {
+    const mock = await startDhanMock({ latencyMs: args.latency, capacity: scenario === 'overload' ? args.capacity : 0 });
+    let recover = null;
+    if (scenario === 'outage') {
+        mock.settings.errorRate = 1;
+        mock.settings.errorStatus = 503;
+        recover = setTimeout(() => { mock.settings.errorRate = 0; }, args.duration / 2);
+    }
+
+    const child = fork(__filename, ['--child'], {
+        env: {
+            ...process.env,
+            DHAN_API_URL: mock.url,
+            DHAN_ACCESS_TOKEN: 'bench-token',
+            DHAN_UPSTREAM_GUARD: guard ? 'true' : 'false'
+        }
+    });
+    child.send({ rate: args.rate, durationMs: args.duration, sloMs: args.slo });
+    const result = await new Promise(resolve => child.once('message', resolve));
+    child.kill();
+    clearTimeout(recover);
+    await mock.close();
+
+    return {
+        scenario,
+        guard,
+        sent: result.sent,
+        ok: result.completed,
+        withinSlo: result.withinSlo,
+        goodputRps: result.goodputRps,
+        errorsByStatus: result.errorsByStatus,
+        okLatencyMs: { p50: result.latencyMs.p50, p99: result.latencyMs.p99 },
+        failureP50Ms: result.failureP50Ms,
+        upstreamRequests: mock.stats.requests,
+        upstreamMaxQueued: mock.stats.maxQueued,
+        guardStats: result.guard
+    };
+}
+
+async function main() {
+    const { values } = parseArgs({
+        options: {
+            child: { type: 'boolean', default: false },
+            rate: { type: 'string', default: '1200' },
+            duration: { type: 'string', default: '5000' },
+            capacity: { type: 'string', default: '16' },
+            latency: { type: 'string', default: '20' },
+            slo: { type: 'string', default: '500' }
+        }
+    });
+    if (values.child) {
+        process.once('message', runDriver);
+        return;
+    }
+
+    const args = {
+        rate: parseInt(values.rate, 10),
+        duration: parseInt(values.duration, 10),
+        capacity: parseInt(values.capacity, 10),
+        latency: parseInt(values.latency, 10),
+        slo: parseInt(values.slo, 10)
+    };
+
+    const results = [];
+    for (const scenario of ['overload', 'outage']) {
+        for (const guard of [false, true]) {
+            results.push(await runMode(scenario, guard, args));
+        }
+    }
+
+    console.log(JSON.stringify({
+        script: path.basename(__filename),
+        ...args,
+        upstreamCapacityRps: Math.round((args.capacity * 1000) / args.latency),
+        results
+    }, null, 2));
+}
+
+main().catch((error) => {
+    console.error(error);
+    process.exit(1);
+});
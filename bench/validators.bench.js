@@ -0,0 +1,89 @@
+// bench/validators.bench.js
+//
+// Validations per second for each compiled order schema, on valid input
+// (the hot path before every order POST) and on invalid input.
+//
+//   node bench/validators.bench.js [iterations]
+
+const { performance } = require('perf_hooks');
+const {
+    validatePlaceOrder,
+    validateSliceOrder,
+    validateForeverOrder,
+    validatePositionConversion,
+    validateMargin
+} = require('../src/validation/orderSchemas');
+
+const ITERATIONS = parseInt(process.argv[2], 10) || 2000000;
+
+const cases = {
+    placeOrder: {
+        validate: validatePlaceOrder,
+        valid: {
+            transactionType: 'BUY', exchangeSegment: 'NSE_EQ', productType: 'INTRADAY',
+            orderType: 'LIMIT', validity: 'DAY', securityId: '1333', quantity: 10, price: 1500.5
+        },
+        invalid: { transactionType: 'HOLD', exchangeSegment: 'NSE_EQ', orderType: 'LIMIT', quantity: 1.5 }
+    },
+    sliceOrder: {
+        validate: validateSliceOrder,
+        valid: {
+            transactionType: 'SELL', exchangeSegment: 'NSE_FNO', productType: 'MARGIN',
+            orderType: 'MARKET', validity: 'DAY', securityId: '52175', quantity: 1800
+        },
+        invalid: { transactionType: 'SELL', exchangeSegment: 'NSE_FNO', productType: 'BO', quantity: 10 }
+    },
+    foreverOrder: {
+        validate: validateForeverOrder,
+        valid: {
+            orderFlag: 'OCO', transactionType: 'SELL', exchangeSegment: 'NSE_EQ', productType: 'CNC',
+            orderType: 'LIMIT', validity: '365', securityId: '1333', quantity: 10, price: 1600,
+            triggerPrice: 1595, price1: 1400, triggerPrice1: 1405, quantity1: 10
+        },
+        invalid: { orderFlag: 'OCO', transactionType: 'SELL', quantity: 0 }
+    },
+    positionConversion: {
+        validate: validatePositionConversion,
+        valid: {
+            fromProductType: 'INTRADAY', toProductType: 'CNC', exchangeSegment: 'NSE_EQ',
+            positionType: 'LONG', securityId: '1333', convertQty: 40
+        },
+        invalid: { fromProductType: 'CNC', toProductType: 'CNC', positionType: 'LONG', convertQty: -1 }
+    },
+    margin: {
+        validate: validateMargin,
+        valid: {
+            dhanClientId: '1000000132', exchangeSegment: 'NSE_EQ', transactionType: 'BUY',
+            quantity: 5, productType: 'CNC', securityId: '1333', price: 1428
+        },
+        invalid: { exchangeSegment: 'NSE_FNO', transactionType: 'BUY', quantity: 0, productType: 'CNC' }
+    }
+};
+
+function measure(validate, params) {
+    // Warm up so the JIT has optimized the validator before timing
+    for (let i = 0; i < 10000; i++) validate(params);
+
+    let errors = 0;
+    const start = performance.now();
+    for (let i = 0; i < ITERATIONS; i++) {
+        errors += validate(params).length;
+    }
+    const elapsed = performance.now() - start;
+
+    return {
+        validationsPerSecond: Math.round(ITERATIONS / (elapsed / 1000)),
+        nsPerValidation: +((elapsed * 1e6) / ITERATIONS).toFixed(1),
+        errorsPerValidation: errors / ITERATIONS
+    };
+}
+
+const results = {};
+for (const [name, { validate, valid, invalid }] of Object.entries(cases)) {
+    results[name] = {
+        valid: measure(validate, valid),
+        invalid: measure(validate, invalid)
+    };
+}
+
+console.log(JSON.stringify({ iterations: ITERATIONS, results }, null, 2));
@@ -0,0 +1,71 @@
+// src/app.js
+
+const express = require('express');
+const metrics = require('./metrics');
+const rateLimiter = require('./middleware/rateLimit');
+const redisConfig = require('./config/redisConfig');
+const dhanHttpClient = require('./config/dhanHttpClient');
+const accountRegistry = require('./service/accountRegistry');
+const killswitchWatcher = require('./service/killswitchWatcher');
+const quoteBatcher = require('./service/quoteBatcher');
+const portfolioSnapshots = require('./service/portfolioSnapshot');
+require('dotenv').config();
+
+// Express app with every router mounted. Routers scope their own rate limits
+// by path, so they can share the root.
+function createApp() {
+    const app = express();
+    app.disable('x-powered-by');
+    app.use(express.json());
+
+    app.get('/health', (req, res) => {
+        res.json({ status: 'ok', pid: process.pid, uptime: process.uptime() });
+    });
+
+    app.use(require('./routes/metrics.routes'));
+    app.use(require('./routes/orderApi.routes'));
+    app.use(require('./routes/dataApi.routes'));
+    app.use(require('./routes/quoteApi.routes'));
+    app.use(require('./routes/nonTradingApi.routes'));
+
+    return app;
+}
+
+// Build everything the first request would otherwise pay for: account
+// services, the limiter's Redis connection and Lua scripts, and sockets to Dhan.
+async function warmUp() {
+    accountRegistry.defaultAccount.warmUp();
+    for (const dhanClientId of accountRegistry.list()) {
+        accountRegistry.get(dhanClientId).warmUp();
+    }
+
+    // A missing script is loaded again on first use, so Redis being slow to come up isn't fatal
+    const limiter = rateLimiter.getInstance();
+    const scripts = Promise.all(['checkAndIncrement', 'lease', 'settle'].map(name => limiter.loadScript(name)))
+        .catch((error) => {
+            console.error('Rate limiter script preload failed:', error.message);
+        });
+    await Promise.all([scripts, dhanHttpClient.warmUp()]);
+}
+
+// Release timers and connections once the HTTP server has stopped accepting
+async function shutdown() {
+    await quoteBatcher.flush();
+    killswitchWatcher.stop();
+    portfolioSnapshots.stop();
+    accountRegistry.defaultAccount.foreverOrders.stopSync();
+    for (const dhanClientId of accountRegistry.list()) {
+        accountRegistry.get(dhanClientId).close();
+    }
+
+    const limiter = rateLimiter.getInstance();
+    limiter.settleAll();
+    await redisConfig.closeSharedClient();
+    dhanHttpClient.close();
+}
+
+module.exports = {
+    createApp,
+    warmUp,
+    shutdown
+};
@@ -0,0 +1,358 @@
+// src/config/dhanHttpClient.js
+
+const http = require('http');
+const https = require('https');
+const http2 = require('http2');
+const { pipeline } = require('stream/promises');
+const axios = require('axios');
+const metrics = require('../metrics');
+const UpstreamGuard = require('./upstreamGuard');
+require('dotenv').config();
+
+// Per-endpoint timeouts in ms, matched by path prefix (first match wins)
+const ENDPOINT_TIMEOUTS = [
+    { prefix: '/orders', timeout: 5000 },
+    { prefix: '/forever', timeout: 5000 },
+    { prefix: '/positions/convert', timeout: 5000 },
+    { prefix: '/killswitch', timeout: 5000 },
+    { prefix: '/quotes', timeout: 3000 },
+    { prefix: '/margincalculator', timeout: 5000 },
+    { prefix: '/charts', timeout: 30000 },
+    { prefix: '/data', timeout: 30000 },
+    { prefix: '/edis', timeout: 15000 }
+];
+
+const DEFAULT_TIMEOUT = 10000;
+
+// Upstream response headers a streamed proxy response keeps
+const PASSTHROUGH_HEADERS = ['content-type', 'content-encoding', 'content-length', 'etag', 'last-modified', 'cache-control', 'vary'];
+
+class DhanHttpClient {
+    constructor() {
+        this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
+        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
+        this.useHttp2 = process.env.DHAN_HTTP2 === 'true';
+        // Proxy routes pipe upstream bodies through instead of parsing and re-serializing them
+        this.streamResponses = process.env.DHAN_PROXY_STREAM !== 'false';
+        // Adaptive concurrency limit and circuit breaker per endpoint category
+        this.upstreamGuard = process.env.DHAN_UPSTREAM_GUARD !== 'false' ? new UpstreamGuard() : null;
+
+        const agentOptions = {
+            keepAlive: true,
+            keepAliveMsecs: 30000,                                          // TCP keep-alive probe delay
+            maxSockets: parseInt(process.env.DHAN_HTTP_MAX_SOCKETS) || 64,  // Upper bound on concurrent sockets
+            maxFreeSockets: 16,                                             // Idle sockets kept warm
+            timeout: 60000,                                                 // Close sockets idle for a minute
+            scheduling: 'lifo'                                              // Reuse the most recently used socket
+        };
+
+        this.httpAgent = this.instrumentAgent(new http.Agent(agentOptions));
+        this.httpsAgent = this.instrumentAgent(new https.Agent(agentOptions));
+
+        // Shared HTTP/2 session, opened lazily when DHAN_HTTP2=true
+        this._http2Session = null;
+
+        this.metrics = {
+            requests: 0,
+            reusedSockets: 0,
+            socketsCreated: 0,
+            errors: 0
+        };
+
+        // Default instance for callers that don't need their own headers
+        this.api = this.createApi();
+    }
+
+    // Count every new socket the agent has to open
+    instrumentAgent(agent) {
+        const createConnection = agent.createConnection.bind(agent);
+        agent.createConnection = (...args) => {
+            this.metrics.socketsCreated++;
+            return createConnection(...args);
+        };
+
+        if (metrics.enabled) {
+            const addRequest = agent.addRequest.bind(agent);
+            agent.addRequest = (req, options) => {
+                this.timeRequest(req);
+                return addRequest(req, options);
+            };
+        }
+        return agent;
+    }
+
+    // Endpoint label for a request path: the matching ENDPOINT_TIMEOUTS prefix
+    endpointLabel(path = '') {
+        const basePath = new URL(this.baseURL).pathname.replace(/\/$/, '');
+        const relative = basePath && path.startsWith(basePath) ? path.slice(basePath.length) : path;
+        const match = ENDPOINT_TIMEOUTS.find(({ prefix }) => relative.startsWith(prefix));
+        return match ? match.prefix : 'other';
+    }
+
+    // Upstream phases of one request: DNS lookup, TCP connect and TLS handshake
+    // (new sockets only), time to first byte and total time
+    timeRequest(req) {
+        const start = metrics.now();
+        const endpoint = this.endpointLabel(req.path);
+        const phase = (name, from) => {
+            const at = metrics.now();
+            metrics.observe('upstream_phase_duration_ms', { endpoint, phase: name }, at - from,
+                'Dhan API request phases (dns, connect, tls, ttfb, total)');
+            return at;
+        };
+
+        req.once('socket', (socket) => {
+            if (!socket.connecting) return;
+            let last = start;
+            socket.once('lookup', () => { last = phase('dns', last); });
+            socket.once('connect', () => { last = phase('connect', last); });
+            socket.once('secureConnect', () => { phase('tls', last); });
+        });
+
+        req.once('response', (res) => {
+            phase('ttfb', start);
+            if (res.statusCode === 429) {
+                metrics.increment('upstream_rate_limited_total', { endpoint }, 1, 'Dhan API responses with status 429');
+            }
+            res.once('end', () => phase('total', start));
+        });
+    }
+
+    // Create an axios instance that shares the pooled agents
+    createApi(options = {}) {
+        const headers = {
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'access-token': options.accessToken || this.accessToken,
+            ...options.headers
+        };
+
+        const api = axios.create({
+            baseURL: options.baseURL || this.baseURL,
+            headers,
+            httpAgent: this.httpAgent,
+            httpsAgent: this.httpsAgent,
+            adapter: this.useHttp2 ? (config) => this.http2Adapter(config) : undefined
+        });
+
+        api.interceptors.request.use(async (config) => {
+            if (!config.timeout) {
+                config.timeout = this.getTimeout(config.url);
+            }
+            if (this.upstreamGuard) {
+                // Waits for a slot; rejects with status 503/429 and retryAfter when Dhan is unavailable
+                config.upstreamPermit = await this.upstreamGuard.acquire(this.requestPath(config.url));
+            }
+            this.metrics.requests++;
+            return config;
+        });
+
+        api.interceptors.response.use((response) => {
+            if (response.request && response.request.reusedSocket) {
+                this.metrics.reusedSockets++;
+            }
+            this.releasePermit(response.config, response.status, response.headers);
+            return response;
+        }, (error) => {
+            this.metrics.errors++;
+            if (error.request && error.request.reusedSocket) {
+                this.metrics.reusedSockets++;
+            }
+            if (error.config) {
+                const response = error.response;
+                const retryAfter = this.releasePermit(error.config, response && response.status,
+                    response && response.headers, ['ECONNABORTED', 'ETIMEDOUT'].includes(error.code));
+                if (retryAfter > 0) error.retryAfter = retryAfter;
+            }
+            return Promise.reject(error);
+        });
+
+        return api;
+    }
+
+    // Pipe a Dhan response straight into an Express response. The client's
+    // Accept-Encoding is sent upstream and the body comes back still encoded,
+    // so compression is negotiated end to end and nothing is parsed here.
+    // Upstream error statuses are passed through as they are.
+    async proxy(req, res, config, api = this.api) {
+        const response = await api.request({
+            ...config,
+            headers: { ...config.headers, 'Accept-Encoding': req.get('accept-encoding') || 'identity' },
+            responseType: 'stream',
+            decompress: false,
+            validateStatus: () => true
+        });
+
+        res.status(response.status);
+        for (const name of PASSTHROUGH_HEADERS) {
+            const value = response.headers[name];
+            if (value !== undefined) res.setHeader(name, value);
+        }
+
+        try {
+            await pipeline(response.data, res);
+        } catch (error) {
+            // The client went away or upstream broke off mid-body; both ends are closed by now
+            this.metrics.errors++;
+        }
+    }
+
+    // Answer a route whose Dhan call failed: the error's own status (e.g. an
+    // upstream guard rejection), else Dhan's, plus Retry-After when known
+    sendError(res, error, fallbackStatus = 500) {
+        if (error.retryAfter > 0) res.set('Retry-After', String(Math.ceil(error.retryAfter / 1000)));
+        res.status(error.status || error.response?.status || fallbackStatus).json({ error: error.message });
+    }
+
+    // Hand a request's slot back to the upstream guard with its outcome;
+    // returns the Retry-After delay in ms (0 without one)
+    releasePermit(config, status, headers = {}, timedOut = false) {
+        const retryAfter = UpstreamGuard.parseRetryAfter(headers['retry-after']);
+        const permit = config.upstreamPermit;
+        if (permit) {
+            config.upstreamPermit = null;
+            this.upstreamGuard.release(permit, { status, timedOut, retryAfter });
+        }
+        return retryAfter;
+    }
+
+    requestPath(url = '') {
+        return url.startsWith('http') ? new URL(url).pathname : url;
+    }
+
+    getTimeout(url = '') {
+        const path = this.requestPath(url);
+        for (const { prefix, timeout } of ENDPOINT_TIMEOUTS) {
+            if (path.startsWith(prefix)) {
+                return timeout;
+            }
+        }
+        return DEFAULT_TIMEOUT;
+    }
+
+    // Open sockets ahead of time so the first order doesn't pay for TCP/TLS setup
+    async warmUp(connections = 2) {
+        const requests = [];
+        for (let i = 0; i < connections; i++) {
+            requests.push(this.api.head('/', { timeout: 5000 }).catch(() => null));
+        }
+        await Promise.all(requests);
+    }
+
+    getHttp2Session(origin) {
+        if (!this._http2Session || this._http2Session.closed || this._http2Session.destroyed) {
+            this._http2Session = http2.connect(origin);
+            this._http2Session.on('error', (error) => {
+                console.error('Dhan HTTP/2 session error:', error);
+            });
+            this._http2Session.on('close', () => {
+                this._http2Session = null;
+            });
+            // Let the process exit when nothing else is pending
+            this._http2Session.unref();
+        }
+        return this._http2Session;
+    }
+
+    // Minimal axios adapter that multiplexes every request over one HTTP/2 session
+    http2Adapter(config) {
+        return new Promise((resolve, reject) => {
+            const url = new URL(axios.getUri(config));
+            const session = this.getHttp2Session(url.origin);
+            const headers = config.headers.toJSON ? config.headers.toJSON() : { ...config.headers };
+
+            const request = session.request({
+                ...headers,
+                ':method': config.method.toUpperCase(),
+                ':path': url.pathname + url.search
+            });
+
+            if (config.timeout) {
+                request.setTimeout(config.timeout, () => {
+                    request.close(http2.constants.NGHTTP2_CANCEL);
+                    reject(new axios.AxiosError(`timeout of ${config.timeout}ms exceeded`, 'ECONNABORTED', config, request));
+                });
+            }
+
+            let responseHeaders = {};
+            request.on('response', (h) => {
+                responseHeaders = h;
+                if (config.responseType === 'stream') {
+                    // Hand the HTTP/2 stream itself to the caller as the body
+                    const { ':status': status, ...headers } = h;
+                    const response = { data: request, status, statusText: http.STATUS_CODES[status] || '', headers, config, request };
+                    if (!config.validateStatus || config.validateStatus(status)) {
+                        resolve(response);
+                    } else {
+                        reject(new axios.AxiosError(`Request failed with status code ${status}`,
+                            status >= 500 ? 'ERR_BAD_RESPONSE' : 'ERR_BAD_REQUEST', config, request, response));
+                    }
+                }
+            });
+
+            if (config.responseType !== 'stream') {
+                const chunks = [];
+                request.on('data', (chunk) => chunks.push(chunk));
+                request.on('end', () => {
+                    const status = responseHeaders[':status'];
+                    const response = {
+                        data: Buffer.concat(chunks).toString('utf8'),
+                        status,
+                        statusText: http.STATUS_CODES[status] || '',
+                        headers: responseHeaders,
+                        config,
+                        request
+                    };
+
+                    if (!config.validateStatus || config.validateStatus(status)) {
+                        resolve(response);
+                    } else {
+                        reject(new axios.AxiosError(
+                            `Request failed with status code ${status}`,
+                            status >= 500 ? 'ERR_BAD_RESPONSE' : 'ERR_BAD_REQUEST',
+                            config,
+                            request,
+                            response
+                        ));
+                    }
+                });
+            }
+
+            request.on('error', (error) => {
+                reject(axios.AxiosError.from(error, error.code, config, request));
+            });
+
+            if (config.data !== undefined && config.data !== null) {
+                request.end(config.data);
+            } else {
+                request.end();
+            }
+        });
+    }
+
+    // Socket reuse metrics for the shared pool
+    getMetrics() {
+        const count = (sockets) => Object.values(sockets).reduce((sum, list) => sum + list.length, 0);
+
+        return {
+            ...this.metrics,
+            reuseRatio: this.metrics.requests > 0 ? this.metrics.reusedSockets / this.metrics.requests : 0,
+            activeSockets: count(this.httpsAgent.sockets) + count(this.httpAgent.sockets),
+            freeSockets: count(this.httpsAgent.freeSockets) + count(this.httpAgent.freeSockets),
+            http2: this.useHttp2,
+            upstream: this.upstreamGuard ? this.upstreamGuard.getStats() : null
+        };
+    }
+
+    close() {
+        this.httpAgent.destroy();
+        this.httpsAgent.destroy();
+        if (this._http2Session) {
+            this._http2Session.close();
+        }
+    }
+}
+
+// Export singleton instance
+const dhanHttpClient = new DhanHttpClient();
+module.exports = dhanHttpClient;
@@ -99,6 +99,26 @@ class RedisConfig {
         return client;
     }
 
+    // One client per process for request-path commands (rate limiter, caches).
+    // Redis pipelines commands over a single connection, so sharing it costs
+    // nothing and keeps connections at one per worker instead of one per service.
+    getSharedClient() {
+        if (!this.sharedClient) {
+            this.sharedClient = this.createClient();
+        }
+        return this.sharedClient;
+    }
+
+    // Flush pending commands and close the shared client, e.g. on shutdown
+    closeSharedClient() {
+        const client = this.sharedClient;
+        this.sharedClient = null;
+        if (!client) return Promise.resolve();
+        return new Promise((resolve) => {
+            client.quit(() => resolve());
+        });
+    }
+
     // Get configuration object
     getConfig() {
         return this.config;
@@ -0,0 +1,315 @@
+// src/config/upstreamGuard.js
+
+require('dotenv').config();
+
+const GUARD_DEFAULTS = {
+    initialLimit: 16,                                                  // Concurrent requests per category at start
+    minLimit: 1,
+    maxLimit: parseInt(process.env.DHAN_UPSTREAM_MAX_CONCURRENCY) || 64,
+    backoff: 0.9,                                                      // Multiplicative decrease on congestion
+    tolerance: 1.5,                                                    // Latency above tolerance x baseline is congestion
+    baselineWindowMs: 30000,                                           // How long the best latency stays the baseline
+    maxQueue: 1000,                                                    // Requests waiting for a slot per category
+    maxWaitMs: parseInt(process.env.DHAN_UPSTREAM_MAX_WAIT_MS) || 1000, // Longer (expected) waits fail fast instead
+    queueTargetMs: 50,                                                 // Wait budget once the queue stops emptying
+    queueIntervalMs: 100,                                              // How long a non-empty queue counts as a burst
+    windowSize: 20,                                                    // Recent outcomes the breaker looks at
+    minRequests: 10,                                                   // Outcomes needed before the breaker can trip
+    failureThreshold: 0.5,                                             // Failure rate that opens the breaker
+    openMs: 1000,                                                      // First open period; doubles while probes fail
+    maxOpenMs: 30000
+};
+
+// Upstream category of a Dhan path, matched by prefix (first match wins);
+// the same categories as the inbound rate limiter
+const ENDPOINT_CATEGORIES = [
+    { prefix: '/orders', category: 'order' },
+    { prefix: '/forever', category: 'order' },
+    { prefix: '/positions/convert', category: 'order' },
+    { prefix: '/quotes', category: 'quote' },
+    { prefix: '/marketfeed', category: 'quote' },
+    { prefix: '/charts', category: 'data' },
+    { prefix: '/data', category: 'data' }
+];
+
+const DEFAULT_CATEGORY = 'nontrading';
+
+// Retry-After is either delay-seconds or an HTTP date
+function parseRetryAfter(value, now = Date.now()) {
+    if (value === undefined || value === null || value === '') return 0;
+    const seconds = Number(value);
+    if (!Number.isNaN(seconds)) return Math.max(0, seconds * 1000);
+    const date = Date.parse(value);
+    return Number.isNaN(date) ? 0 : Math.max(0, date - now);
+}
+
+function guardError(message, status, code, retryAfter) {
+    const error = new Error(message);
+    error.status = status;
+    error.code = code;
+    error.retryAfter = retryAfter;
+    return error;
+}
+
+// Concurrency limit and circuit breaker for one endpoint category.
+//   limit:   AIMD. +1/limit per uncongested response while the limit is in
+//            use; x backoff (at most once per round trip) on a 429, a timeout
+//            or average latency above tolerance x the recent best latency.
+//   breaker: opens when failureThreshold of the last windowSize outcomes were
+//            5xx/network errors, fails fast while open, then lets one probe
+//            through (half-open); the probe closes it or reopens it for longer.
+//   queue:   requests beyond the limit wait FIFO up to maxWaitMs, or only
+//            queueTargetMs once the queue has not emptied for queueIntervalMs
+//            (CoDel-style: absorb bursts, don't sit on a standing queue).
+//   Retry-After on a 429/503 holds every request of the category until then.
+class CategoryGuard {
+    constructor(category, settings) {
+        this.category = category;
+        this.settings = settings;
+
+        this.limit = settings.initialLimit;
+        this.inFlight = 0;
+        this._queue = [];
+        this._queueEmptyAt = 0;
+        this._pumpTimer = null;
+
+        this.baseline = null;
+        this.baselineAt = 0;
+        this.averageLatency = 0;
+        this.lastDecreaseAt = 0;
+
+        this.state = 'closed';
+        this.openUntil = 0;
+        this.openMs = settings.openMs;
+        this.blockedUntil = 0;
+        this._outcomes = [];
+        this._probing = false;
+
+        this.stats = {
+            granted: 0,
+            shed: 0,
+            rejectedOpen: 0,
+            congestion: 0,
+            trips: 0
+        };
+    }
+
+    // Resolves with a permit once a slot is free; rejects when the breaker is
+    // open or the wait would exceed maxWaitMs
+    acquire() {
+        const now = Date.now();
+
+        if (this.state === 'open') {
+            if (now < this.openUntil || this._probing) {
+                this.stats.rejectedOpen++;
+                return Promise.reject(guardError(`Dhan ${this.category} API unavailable (circuit open)`,
+                    503, 'ECIRCUITOPEN', Math.max(0, this.openUntil - now)));
+            }
+            // Half-open: this request is the probe
+            this._probing = true;
+            return Promise.resolve(this.grant(true));
+        }
+
+        if (this.blockedUntil - now > this.settings.maxWaitMs) {
+            this.stats.shed++;
+            return Promise.reject(guardError(`Dhan ${this.category} API asked to retry later`,
+                429, 'ERETRYAFTER', this.blockedUntil - now));
+        }
+
+        if (this._queue.length === 0) {
+            this._queueEmptyAt = now;
+            if (this.inFlight < this.limit && this.blockedUntil <= now) {
+                return Promise.resolve(this.grant(false));
+            }
+        }
+        // Queued requests drain at about limit per average latency (after any
+        // Retry-After); one that would wait longer than the budget is turned away now
+        const standing = now - this._queueEmptyAt > this.settings.queueIntervalMs;
+        const budget = standing ? this.settings.queueTargetMs : this.settings.maxWaitMs;
+        const expectedWait = Math.max(0, this.blockedUntil - now) + ((this._queue.length + 1) * this.averageLatency) / this.limit;
+        if (this._queue.length >= this.settings.maxQueue || expectedWait > budget) {
+            this.stats.shed++;
+            return Promise.reject(guardError(`Dhan ${this.category} request queue is full`, 503, 'EQUEUEFULL', 0));
+        }
+
+        return new Promise((resolve, reject) => {
+            const waiter = { resolve, reject };
+            waiter.timer = setTimeout(() => {
+                this._queue.splice(this._queue.indexOf(waiter), 1);
+                this.stats.shed++;
+                reject(guardError(`Dhan ${this.category} request waited over ${this.settings.maxWaitMs}ms for a slot`,
+                    503, 'EQUEUETIMEOUT', 0));
+            }, this.settings.maxWaitMs);
+            this._queue.push(waiter);
+            this.pump();
+        });
+    }
+
+    grant(probe) {
+        this.inFlight++;
+        this.stats.granted++;
+        return { category: this.category, startedAt: Date.now(), limitAtStart: this.limit, inFlightAtStart: this.inFlight, probe };
+    }
+
+    // Hand free slots to waiting requests, or wait out a Retry-After
+    pump() {
+        const now = Date.now();
+        if (this.blockedUntil > now) {
+            if (!this._pumpTimer) {
+                this._pumpTimer = setTimeout(() => {
+                    this._pumpTimer = null;
+                    this.pump();
+                }, this.blockedUntil - now);
+            }
+            return;
+        }
+
+        while (this._queue.length > 0 && this.inFlight < this.limit) {
+            const waiter = this._queue.shift();
+            clearTimeout(waiter.timer);
+            waiter.resolve(this.grant(false));
+        }
+        if (this._queue.length === 0) this._queueEmptyAt = now;
+    }
+
+    // Record how a permitted request went: { status, timedOut, retryAfter }
+    release(permit, { status, timedOut = false, retryAfter = 0 }) {
+        const now = Date.now();
+        const latency = now - permit.startedAt;
+        this.inFlight--;
+
+        const failed = timedOut || !status || status >= 500;
+        const throttled = status === 429;
+
+        if (retryAfter > 0 && (throttled || status === 503)) {
+            this.blockedUntil = Math.max(this.blockedUntil, now + retryAfter);
+        }
+
+        this.adjustLimit(permit, latency, throttled || timedOut, now);
+        this.recordOutcome(permit, failed, now);
+        this.pump();
+    }
+
+    adjustLimit(permit, latency, congested, now) {
+        this.averageLatency = this.averageLatency === 0 ? latency : this.averageLatency * 0.9 + latency * 0.1;
+        if (this.baseline === null || latency < this.baseline || now - this.baselineAt > this.settings.baselineWindowMs) {
+            if (!congested) {
+                this.baseline = latency;
+                this.baselineAt = now;
+            }
+        }
+
+        // Judged on the moving average, so one slow response doesn't cut the limit
+        const slow = this.baseline !== null
+            && this.averageLatency > Math.max(this.baseline * this.settings.tolerance, this.baseline + 5);
+        if (congested || slow) {
+            this.stats.congestion++;
+            // Responses to requests sent before the last decrease don't count again
+            if (permit.startedAt >= this.lastDecreaseAt) {
+                this.limit = Math.max(this.settings.minLimit, this.limit * this.settings.backoff);
+                this.lastDecreaseAt = now;
+            }
+        } else if (permit.inFlightAtStart >= permit.limitAtStart / 2) {
+            // Only grow a limit that is actually being used
+            this.limit = Math.min(this.settings.maxLimit, this.limit + 1 / this.limit);
+        }
+    }
+
+    recordOutcome(permit, failed, now) {
+        if (permit.probe) {
+            this._probing = false;
+            if (failed) {
+                this.open(now, Math.min(this.openMs * 2, this.settings.maxOpenMs));
+            } else {
+                this.state = 'closed';
+                this.openMs = this.settings.openMs;
+                this._outcomes = [];
+            }
+            return;
+        }
+        if (this.state !== 'closed') return;
+
+        this._outcomes.push(failed);
+        if (this._outcomes.length > this.settings.windowSize) this._outcomes.shift();
+        if (this._outcomes.length < this.settings.minRequests) return;
+
+        const failures = this._outcomes.reduce((sum, outcome) => sum + (outcome ? 1 : 0), 0);
+        if (failures / this._outcomes.length >= this.settings.failureThreshold) {
+            this.open(now, this.settings.openMs);
+        }
+    }
+
+    open(now, openMs) {
+        this.state = 'open';
+        this.openMs = openMs;
+        this.openUntil = now + openMs;
+        this.stats.trips++;
+
+        // Nothing queued will get through before the breaker half-opens
+        for (const waiter of this._queue.splice(0)) {
+            clearTimeout(waiter.timer);
+            this.stats.rejectedOpen++;
+            waiter.reject(guardError(`Dhan ${this.category} API unavailable (circuit open)`, 503, 'ECIRCUITOPEN', openMs));
+        }
+    }
+
+    getStats() {
+        const now = Date.now();
+        return {
+            ...this.stats,
+            state: this.state === 'open' && now >= this.openUntil ? 'half-open' : this.state,
+            limit: +this.limit.toFixed(2),
+            inFlight: this.inFlight,
+            queued: this._queue.length,
+            baselineMs: this.baseline,
+            averageLatencyMs: +this.averageLatency.toFixed(1),
+            retryAfterMs: Math.max(0, this.blockedUntil - now),
+            openForMs: this.state === 'open' ? Math.max(0, this.openUntil - now) : 0
+        };
+    }
+}
+
+// Adaptive concurrency and circuit breaking at the Dhan boundary, one
+// CategoryGuard per endpoint category. dhanHttpClient calls acquire() before
+// each request and release() with the outcome.
+class UpstreamGuard {
+    constructor(options = {}) {
+        this.settings = { ...GUARD_DEFAULTS, ...options };
+        this._categories = new Map();
+    }
+
+    categoryOf(path = '') {
+        const match = ENDPOINT_CATEGORIES.find(({ prefix }) => path.startsWith(prefix));
+        return match ? match.category : DEFAULT_CATEGORY;
+    }
+
+    guard(category) {
+        let guard = this._categories.get(category);
+        if (!guard) {
+            guard = new CategoryGuard(category, this.settings);
+            this._categories.set(category, guard);
+        }
+        return guard;
+    }
+
+    acquire(path) {
+        return this.guard(this.categoryOf(path)).acquire();
+    }
+
+    // outcome: { status, timedOut, retryAfter (ms) }
+    release(permit, outcome) {
+        this.guard(permit.category).release(permit, outcome);
+    }
+
+    getStats() {
+        const stats = {};
+        for (const [category, guard] of this._categories) {
+            stats[category] = guard.getStats();
+        }
+        return stats;
+    }
+}
+
+UpstreamGuard.parseRetryAfter = parseRetryAfter;
+
+module.exports = UpstreamGuard;
@@ -0,0 +1,89 @@
+// src/metrics/histogram.js
+
+// Default bucket upper bounds, in ms for latencies (also fine for counts)
+const DEFAULT_BOUNDS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000];
+
+// Fixed-bucket histogram. Recording is a binary search over the bounds and a
+// counter increment, so it is cheap enough for per-request hot paths.
+// Percentiles are reported as the upper bound of the bucket they fall in.
+class Histogram {
+    constructor(bounds = DEFAULT_BOUNDS) {
+        this.bounds = bounds;
+        this.counts = new Float64Array(bounds.length + 1);  // Last slot counts values above every bound
+        this.reset();
+    }
+
+    reset() {
+        this.counts.fill(0);
+        this.count = 0;
+        this.sum = 0;
+        this.min = Infinity;
+        this.max = -Infinity;
+    }
+
+    // Bounds growing by `factor` from `start`; with a small factor this gives
+    // HDR-style constant relative precision across the whole range
+    static exponentialBounds(start, factor, count) {
+        const bounds = [];
+        for (let i = 0, bound = start; i < count; i++, bound *= factor) {
+            bounds.push(+bound.toPrecision(4));
+        }
+        return bounds;
+    }
+
+    record(value) {
+        // First bucket whose upper bound is >= value
+        let lo = 0;
+        let hi = this.bounds.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >>> 1;
+            if (this.bounds[mid] < value) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        this.counts[lo]++;
+        this.count++;
+        this.sum += value;
+        if (value < this.min) this.min = value;
+        if (value > this.max) this.max = value;
+    }
+
+    percentile(p) {
+        if (this.count === 0) return 0;
+        const rank = Math.ceil((p / 100) * this.count);
+        let seen = 0;
+        for (let i = 0; i < this.counts.length; i++) {
+            seen += this.counts[i];
+            if (seen >= rank) {
+                return i < this.bounds.length ? Math.min(this.bounds[i], this.max) : this.max;
+            }
+        }
+        return this.max;
+    }
+
+    snapshot() {
+        const buckets = {};
+        for (let i = 0; i < this.bounds.length; i++) {
+            buckets[this.bounds[i]] = this.counts[i];
+        }
+        buckets['+Inf'] = this.counts[this.bounds.length];
+
+        return {
+            count: this.count,
+            sum: this.sum,
+            min: this.count > 0 ? this.min : 0,
+            max: this.count > 0 ? this.max : 0,
+            mean: this.count > 0 ? this.sum / this.count : 0,
+            p50: this.percentile(50),
+            p90: this.percentile(90),
+            p99: this.percentile(99),
+            buckets
+        };
+    }
+}
+
+Histogram.DEFAULT_BOUNDS = DEFAULT_BOUNDS;
+
+module.exports = Histogram;
@@ -0,0 +1,178 @@
+// src/metrics/index.js
+
+const { performance } = require('perf_hooks');
+const Histogram = require('./histogram');
+require('dotenv').config();
+
+// 10 µs to ~75 s in 40 steps of 1.5x: every latency lands in a bucket within 50% of its value
+const LATENCY_BOUNDS_MS = Histogram.exponentialBounds(0.01, 1.5, 40);
+
+// Sample line; labels are omitted entirely when there are none
+function sample(name, key, value) {
+    return key ? `${name}{${key}} ${value}` : `${name} ${value}`;
+}
+
+function labelKey(labels) {
+    let key = '';
+    for (const name of Object.keys(labels).sort()) {
+        key += `${name}="${String(labels[name]).replace(/["\\\n]/g, '\\$&')}",`;
+    }
+    return key.slice(0, -1);
+}
+
+// Process-wide metrics registry. Turned on with METRICS_ENABLED=true; when
+// off, instrumented code checks `metrics.enabled` (or is never wrapped) and
+// pays nothing beyond that branch.
+class Metrics {
+    constructor() {
+        this.enabled = process.env.METRICS_ENABLED === 'true';
+
+        // name -> { help, series: Map(labelKey -> Histogram) }
+        this._histograms = new Map();
+        // name -> { help, series: Map(labelKey -> number) }
+        this._counters = new Map();
+        // Functions returning extra gauges: [{ name, help, labels, value }]
+        this._collectors = [];
+    }
+
+    // High-resolution timestamp in ms, for measuring durations
+    now() {
+        return performance.now();
+    }
+
+    family(store, name, help) {
+        let family = store.get(name);
+        if (!family) {
+            family = { help, series: new Map() };
+            store.set(name, family);
+        }
+        return family;
+    }
+
+    // Histogram for name + labels; hot paths with fixed labels resolve it once
+    histogram(name, labels, help = '') {
+        const family = this.family(this._histograms, name, help);
+        const key = labelKey(labels);
+        let histogram = family.series.get(key);
+        if (!histogram) {
+            histogram = new Histogram(LATENCY_BOUNDS_MS);
+            family.series.set(key, histogram);
+        }
+        return histogram;
+    }
+
+    // Record a duration (ms) into the histogram for name + labels
+    observe(name, labels, valueMs, help = '') {
+        if (!this.enabled) return;
+        this.histogram(name, labels, help).record(valueMs);
+    }
+
+    increment(name, labels, amount = 1, help = '') {
+        if (!this.enabled) return;
+        const family = this.family(this._counters, name, help);
+        const key = labelKey(labels);
+        family.series.set(key, (family.series.get(key) || 0) + amount);
+    }
+
+    // Wrap fn so each call is timed into `name`; returns fn itself when disabled
+    timed(fn, name, labels, help) {
+        if (!this.enabled) return fn;
+        const histogram = this.histogram(name, labels, help);
+        return function timedCall(...args) {
+            const start = performance.now();
+            try {
+                return fn.apply(this, args);
+            } finally {
+                histogram.record(performance.now() - start);
+            }
+        };
+    }
+
+    registerCollector(collect) {
+        this._collectors.push(collect);
+    }
+
+    // Express middleware: request duration and response serialization per route.
+    // Each router installs it; a request passing several routers is timed once.
+    middleware() {
+        return (req, res, next) => {
+            if (!this.enabled || req.metricsStart !== undefined) return next();
+
+            const start = this.now();
+            req.metricsStart = start;
+            const json = res.json;
+            res.json = (body) => {
+                const serializeStart = this.now();
+                const result = json.call(res, body);
+                this.observe('http_response_serialization_ms', { route: this.routeLabel(req) },
+                    this.now() - serializeStart, 'Time to serialize and write JSON responses');
+                return result;
+            };
+
+            res.on('finish', () => {
+                const labels = { route: this.routeLabel(req), method: req.method, status: res.statusCode };
+                this.observe('http_request_duration_ms', labels, this.now() - start, 'Inbound request duration');
+            });
+            next();
+        };
+    }
+
+    // Route pattern rather than the raw URL, to keep label cardinality bounded
+    routeLabel(req) {
+        return req.route ? `${req.baseUrl || ''}${req.route.path}` : 'unmatched';
+    }
+
+    // Prometheus text exposition format
+    toPrometheus() {
+        const lines = [];
+
+        for (const [name, { help, series }] of this._counters) {
+            if (help) lines.push(`# HELP ${name} ${help}`);
+            lines.push(`# TYPE ${name} counter`);
+            for (const [key, value] of series) {
+                lines.push(sample(name, key, value));
+            }
+        }
+
+        for (const [name, { help, series }] of this._histograms) {
+            if (help) lines.push(`# HELP ${name} ${help}`);
+            lines.push(`# TYPE ${name} histogram`);
+            for (const [key, histogram] of series) {
+                const prefix = key ? `${key},` : '';
+                let cumulative = 0;
+                for (let i = 0; i < histogram.bounds.length; i++) {
+                    cumulative += histogram.counts[i];
+                    lines.push(`${name}_bucket{${prefix}le="${histogram.bounds[i]}"} ${cumulative}`);
+                }
+                lines.push(`${name}_bucket{${prefix}le="+Inf"} ${histogram.count}`);
+                lines.push(sample(`${name}_sum`, key, histogram.sum));
+                lines.push(sample(`${name}_count`, key, histogram.count));
+            }
+        }
+
+        const gauges = new Map();
+        for (const collect of this._collectors) {
+            for (const { name, help, labels = {}, value } of collect()) {
+                if (!gauges.has(name)) gauges.set(name, { help, samples: [] });
+                gauges.get(name).samples.push(sample(name, labelKey(labels), value));
+            }
+        }
+        for (const [name, { help, samples }] of gauges) {
+            if (help) lines.push(`# HELP ${name} ${help}`);
+            lines.push(`# TYPE ${name} gauge`);
+            lines.push(...samples);
+        }
+
+        return `${lines.join('\n')}\n`;
+    }
+
+    // Zero every series; histograms handed out by histogram() stay valid
+    reset() {
+        for (const { series } of this._histograms.values()) {
+            for (const histogram of series.values()) histogram.reset();
+        }
+        this._counters.clear();
+    }
+}
+
+module.exports = new Metrics();
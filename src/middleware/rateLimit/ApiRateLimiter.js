@@ -1,21 +1,38 @@
-const Redis = require('redis');
 const util = require('util');
+const { CHECK_AND_INCREMENT, LEASE_TOKENS, SETTLE_TOKENS } = require('./luaScripts');
+const LocalTokenBucket = require('./LocalTokenBucket');
+const metrics = require('../../metrics');
+const sharedRedis = require('../../config/redisConfig');
+
+const SCRIPTS = {
+    checkAndIncrement: CHECK_AND_INCREMENT,
+    lease: LEASE_TOKENS,
+    settle: SETTLE_TOKENS
+};
+
+// Defaults for hybrid mode leases
+const DEFAULT_LEASE = {
+    requests: 10,   // Requests reserved from Redis per lease
+    ttl: 250        // Lease lifetime in ms before unused tokens are settled
+};
 
 class TieredRateLimiter {
-    constructor() {
-        this.redisClient = Redis.createClient({
-            host: process.env.REDIS_HOST || 'localhost',
-            port: process.env.REDIS_PORT || 6379
-        });
+    constructor(rateLimits, redisConfig, timeWindows) {
+        // The process-wide client from config/redisConfig (TLS, auth, db, retries, keep-alive)
+        this.redisClient = sharedRedis.getSharedClient();
 
         // Promisify Redis methods
-        this.getAsync = util.promisify(this.redisClient.get).bind(this.redisClient);
-        this.setAsync = util.promisify(this.redisClient.set).bind(this.redisClient);
-        this.expireAsync = util.promisify(this.redisClient.expire).bind(this.redisClient);
-        this.incrByAsync = util.promisify(this.redisClient.incrby).bind(this.redisClient);
+        this.scriptAsync = util.promisify(this.redisClient.script).bind(this.redisClient);
+        this.evalshaAsync = util.promisify(this.redisClient.evalsha).bind(this.redisClient);
+
+        // SHAs of the Lua scripts, loaded once on first use
+        this._scriptShas = {};
+
+        // Process-local token buckets for hybrid categories, keyed by ip:category
+        this.localBuckets = new Map();
 
         // Define rate limits for different time windows
-        this.rateLimits = {
+        this.rateLimits = rateLimits || {
             'order': {
                 second: { limit: 100, cost: 25 },    // 25 per request, buffer of 100
                 minute: { limit: 1000, cost: 250 },  // 250 per request, buffer of 1000
@@ -43,7 +60,7 @@ class TieredRateLimiter {
         };
 
         // Time windows in seconds
-        this.timeWindows = {
+        this.timeWindows = timeWindows || {
             second: 1,
             minute: 60,
             hour: 3600,
@@ -51,6 +68,75 @@ class TieredRateLimiter {
         };
     }
 
+    // Load a Lua script once and remember its SHA
+    async loadScript(name = 'checkAndIncrement', reload = false) {
+        if (!this._scriptShas[name] || reload) {
+            this._scriptShas[name] = this.scriptAsync('load', SCRIPTS[name]);
+        }
+        try {
+            return await this._scriptShas[name];
+        } catch (error) {
+            delete this._scriptShas[name];
+            throw error;
+        }
+    }
+
+    // Run a script by SHA, reloading it if Redis lost its script cache
+    async runScript(name, keys, args) {
+        const sha = await this.loadScript(name);
+        try {
+            return await this.evalshaAsync(sha, keys.length, ...keys, ...args);
+        } catch (error) {
+            if (!error.message || !error.message.startsWith('NOSCRIPT')) {
+                throw error;
+            }
+            const reloadedSha = await this.loadScript(name, true);
+            return this.evalshaAsync(reloadedSha, keys.length, ...keys, ...args);
+        }
+    }
+
+    // Limited windows of a category with their Redis keys
+    getWindows(ip, category, limits) {
+        const windows = [];
+        for (const [window, duration] of Object.entries(this.timeWindows)) {
+            if (!limits[window]) continue; // Skip unlimited windows
+
+            windows.push({
+                window,
+                duration,
+                key: `ratelimit:${ip}:${category}:${window}`,
+                cost: limits[window].cost,
+                limit: limits[window].limit
+            });
+        }
+        return windows;
+    }
+
+    getCosts(limits) {
+        return Object.keys(this.timeWindows).reduce((acc, window) => {
+            if (limits[window]) acc[window] = limits[window].cost;
+            return acc;
+        }, {});
+    }
+
+    buildRejection(category, limits, window, count, ttl) {
+        const duration = this.timeWindows[window];
+        const currentTime = Math.floor(Date.now() / 1000);
+        const windowStart = currentTime - (currentTime % duration);
+        const cost = limits[window].cost;
+        const limit = limits[window].limit;
+
+        return {
+            allowed: false,
+            category,
+            window,
+            costPerRequest: cost,
+            remaining: 0,
+            resetTime: ttl > 0 ? ttl : windowStart + duration - currentTime,
+            message: `Rate limit exceeded for ${window}. Each ${category} request costs ${cost} points, and you have used ${count} out of ${limit} points this ${window}.`
+        };
+    }
+
     async checkRateLimit(ip, category) {
         try {
             const limits = this.rateLimits[category];
@@ -58,76 +144,36 @@ class TieredRateLimiter {
                 throw new Error(`Unknown API category: ${category}`);
             }
 
-            // Check each time window
-            for (const [window, duration] of Object.entries(this.timeWindows)) {
-                if (!limits[window]) continue; // Skip unlimited windows
-
-                const key = `ratelimit:${ip}:${category}:${window}`;
-                const currentTime = Math.floor(Date.now() / 1000);
-                const windowStart = currentTime - (currentTime % duration);
-                const cost = limits[window].cost;
-                const limit = limits[window].limit;
-
-                // Get or create window counter
-                let count = await this.getAsync(key);
-                if (!count) {
-                    count = 0;
-                    await this.setAsync(key, 0);
-                    await this.expireAsync(key, duration);
-                }
+            if (limits.mode === 'hybrid') {
+                return await this.checkLocalRateLimit(ip, category, limits);
+            }
 
-                count = parseInt(count);
-
-                // Check if adding this request would exceed the limit
-                if (count + cost > limit) {
-                    return {
-                        allowed: false,
-                        category,
-                        window,
-                        costPerRequest: cost,
-                        remaining: 0,
-                        resetTime: windowStart + duration - currentTime,
-                        message: `Rate limit exceeded for ${window}. Each ${category} request costs ${cost} points, and you have used ${count} out of ${limit} points this ${window}.`
-                    };
-                }
+            // Collect every limited window so they are checked in one atomic call
+            const windows = this.getWindows(ip, category, limits);
+            const keys = windows.map(w => w.key);
+            const args = [];
+            for (const w of windows) {
+                args.push(w.cost, w.limit, w.duration);
             }
 
-            // If we get here, we haven't exceeded any limits
-            // Increment all counters
-            const updates = [];
-            for (const [window, duration] of Object.entries(this.timeWindows)) {
-                if (!limits[window]) continue;
+            const reply = await this.runScript('checkAndIncrement', keys, args);
 
-                const key = `ratelimit:${ip}:${category}:${window}`;
-                const cost = limits[window].cost;
-                updates.push(this.incrByAsync(key, cost));
+            if (reply[0] === 0) {
+                return this.buildRejection(category, limits, windows[reply[1] - 1].window, reply[2], reply[3]);
             }
 
-            await Promise.all(updates);
-
-            // Calculate remaining requests for each window
+            // Remaining requests for each window, as computed by the script
             const remaining = {};
-            for (const [window, duration] of Object.entries(this.timeWindows)) {
-                if (!limits[window]) {
-                    remaining[window] = 'unlimited';
-                    continue;
-                }
-
-                const key = `ratelimit:${ip}:${category}:${window}`;
-                const count = await this.getAsync(key);
-                const limit = limits[window].limit;
-                const cost = limits[window].cost;
-                remaining[window] = Math.floor((limit - count) / cost);
+            for (const window of Object.keys(this.timeWindows)) {
+                const index = windows.findIndex(w => w.window === window);
+                remaining[window] = index === -1 ? 'unlimited' : reply[index + 1];
             }
 
             return {
                 allowed: true,
                 category,
                 remaining,
-                costs: Object.entries(limits).reduce((acc, [window, config]) => {
-                    if (config) acc[window] = config.cost;
-                    return acc;
-                }, {})
+                costs: this.getCosts(limits)
             };
 
         } catch (error) {
@@ -136,11 +182,124 @@ class TieredRateLimiter {
         }
     }
 
-    // Express middleware
-    middleware(category) {
+    // Hybrid mode: serve requests from a process-local bucket and only go to
+    // Redis to lease the next batch, so the hot path makes no network hops
+    async checkLocalRateLimit(ip, category, limits) {
+        const bucketKey = `${ip}:${category}`;
+        let bucket = this.localBuckets.get(bucketKey);
+        if (!bucket) {
+            bucket = new LocalTokenBucket();
+            this.localBuckets.set(bucketKey, bucket);
+        }
+
+        for (;;) {
+            if (bucket.take()) {
+                const remaining = {};
+                for (const window of Object.keys(this.timeWindows)) {
+                    remaining[window] = limits[window] ? bucket.tokens : 'unlimited';
+                }
+
+                return {
+                    allowed: true,
+                    category,
+                    remaining,
+                    costs: this.getCosts(limits)
+                };
+            }
+
+            // Requests arriving while a lease is in flight share it
+            if (!bucket.leasing) {
+                bucket.leasing = this.leaseTokens(ip, category, limits, bucketKey, bucket)
+                    .finally(() => {
+                        bucket.leasing = null;
+                    });
+            }
+
+            const rejection = await bucket.leasing;
+            if (rejection) {
+                return rejection;
+            }
+        }
+    }
+
+    async leaseTokens(ip, category, limits, bucketKey, bucket) {
+        const lease = { ...DEFAULT_LEASE, ...limits.lease };
+        const windows = this.getWindows(ip, category, limits);
+
+        // Give back anything left over from an expired lease before taking a new one
+        this.settleBucket(ip, category, limits, bucket);
+
+        const args = [lease.requests];
+        for (const w of windows) {
+            args.push(w.cost, w.limit, w.duration);
+        }
+
+        const reply = await this.runScript('lease', windows.map(w => w.key), args);
+
+        if (reply[0] === 0) {
+            return this.buildRejection(category, limits, windows[reply[1] - 1].window, reply[2], reply[3]);
+        }
+
+        // The lease can't outlive the shortest window it was taken from
+        const ttl = Math.min(lease.ttl, reply[1]);
+        bucket.fill(reply[0], ttl, () => {
+            this.settleBucket(ip, category, limits, bucket);
+            if (!bucket.leasing && this.localBuckets.get(bucketKey) === bucket) {
+                this.localBuckets.delete(bucketKey);
+            }
+        });
+        return null;
+    }
+
+    // Return unused leased tokens to Redis
+    settleBucket(ip, category, limits, bucket) {
+        const unused = bucket.drain();
+        if (unused === 0) return;
+
+        const windows = this.getWindows(ip, category, limits);
+        this.runScript('settle', windows.map(w => w.key), [unused, ...windows.map(w => w.cost)])
+            .catch((error) => {
+                console.error('Rate limiter settle error:', error);
+            });
+    }
+
+    // Settle every outstanding lease, e.g. before shutting down
+    settleAll() {
+        for (const [bucketKey, bucket] of this.localBuckets) {
+            const separator = bucketKey.lastIndexOf(':');
+            const ip = bucketKey.slice(0, separator);
+            const category = bucketKey.slice(separator + 1);
+            this.settleBucket(ip, category, this.rateLimits[category], bucket);
+        }
+        this.localBuckets.clear();
+    }
+
+    // Express middleware. With options.resolveAccount (req -> account context,
+    // throwing for unknown accounts) budgets belong to the Dhan account the
+    // request is for; otherwise, or when the account has no id, to the client IP.
+    middleware(category, options = {}) {
         return async (req, res, next) => {
-            const ip = req.ip || req.connection.remoteAddress;
-            const result = await this.checkRateLimit(ip, category);
+            let key = req.ip || req.connection.remoteAddress;
+            if (options.resolveAccount) {
+                let account;
+                try {
+                    account = options.resolveAccount(req);
+                } catch (error) {
+                    // Unknown accounts are turned away before they are counted
+                    return res.status(error.status || 400).json({ error: error.message });
+                }
+                if (account.dhanClientId) key = `account:${account.dhanClientId}`;
+            }
+            const start = metrics.enabled ? metrics.now() : 0;
+            const result = await this.checkRateLimit(key, category);
+            if (metrics.enabled) {
+                metrics.observe('ratelimit_check_duration_ms', { category }, metrics.now() - start,
+                    'Rate limit check time, including Redis');
+                if (!result.allowed) {
+                    metrics.increment('ratelimit_rejections_total', { category, window: result.window },
+                        1, 'Requests rejected with 429 by the rate limiter');
+                }
+            }
 
             if (result.allowed) {
                 // Set rate limit headers
@@ -42,7 +42,14 @@ const rateLimitConfig = {
     },
     
     // Rate limits for Quote APIs (only per second limit)
+    // mode: 'redis' checks Redis on every request, 'hybrid' serves requests
+    // from a per-process token bucket that leases batches from Redis
     quote: {
+        mode: 'hybrid',
+        lease: {
+            requests: 10,  // Requests reserved per lease
+            ttl: 250       // Lease lifetime in ms
+        },
         second: { 
             limit: 100,    // Buffer
             cost: 1        // Cost per request
@@ -54,6 +61,11 @@ const rateLimitConfig = {
     
     // Rate limits for Non-Trading APIs (only per second limit)
     nontrading: {
+        mode: 'hybrid',
+        lease: {
+            requests: 2,   // Requests reserved per lease
+            ttl: 250       // Lease lifetime in ms
+        },
         second: { 
             limit: 100,    // Buffer
             cost: 20       // Cost per request
@@ -0,0 +1,49 @@
+// src/middleware/rateLimit/LocalTokenBucket.js
+
+// In-memory bucket of requests leased from Redis by the hybrid limiter.
+// Tokens are only valid until the lease expires; the expiry callback is
+// responsible for settling whatever is left.
+class LocalTokenBucket {
+    constructor() {
+        this.tokens = 0;
+        this.expiresAt = 0;
+        this.leasing = null;
+        this._timer = null;
+    }
+
+    take() {
+        if (this.tokens > 0 && Date.now() < this.expiresAt) {
+            this.tokens--;
+            return true;
+        }
+        return false;
+    }
+
+    fill(tokens, ttl, onExpire) {
+        this.tokens = tokens;
+        this.expiresAt = Date.now() + ttl;
+
+        if (this._timer) clearTimeout(this._timer);
+        this._timer = setTimeout(() => {
+            this._timer = null;
+            onExpire();
+        }, ttl);
+
+        // Don't keep the process alive just to settle a lease
+        if (this._timer.unref) this._timer.unref();
+    }
+
+    // Empty the bucket and return how many tokens were unused
+    drain() {
+        const unused = this.tokens;
+        this.tokens = 0;
+        this.expiresAt = 0;
+        if (this._timer) {
+            clearTimeout(this._timer);
+            this._timer = null;
+        }
+        return unused;
+    }
+}
+
+module.exports = LocalTokenBucket;
@@ -1,7 +1,12 @@
 // src/middleware/rateLimiter/index.js
 
 const TieredRateLimiter = require('./ApiRateLimiter');
-const { rateLimitConfig, redisConfig, timeWindows } = require('./config');
+const { rateLimitConfig, redisConfig, timeWindows } = require('./Config');
+const accountRegistry = require('../../service/accountRegistry');
+
+// Order and non-trading routes act for the account named by x-dhan-client-id,
+// so their budgets are keyed by the validated account
+const resolveAccount = req => accountRegistry.resolve(req);
 
 class RateLimiterService {
     constructor() {
@@ -34,7 +39,7 @@ class RateLimiterService {
 
     // Convenience methods for different API types
     orderApiLimiter() {
-        return this.getInstance().middleware('order');
+        return this.getInstance().middleware('order', { resolveAccount });
     }
 
     dataApiLimiter() {
@@ -46,7 +51,7 @@ class RateLimiterService {
     }
 
     nonTradingApiLimiter() {
-        return this.getInstance().middleware('nontrading');
+        return this.getInstance().middleware('nontrading', { resolveAccount });
     }
 }
 
@@ -0,0 +1,102 @@
+// src/middleware/rateLimit/luaScripts.js
+
+// Checks every window of a category, and only if all of them have room,
+// increments them and returns the remaining request count per window.
+// Runs atomically on the Redis server, so concurrent requests can't overshoot.
+//
+// KEYS: one counter key per limited window (in window order)
+// ARGV: cost, limit, duration (seconds) triplets, one per key
+//
+// Returns { 1, remaining_1, ..., remaining_n } when allowed,
+// or      { 0, index, count, ttl } for the first window that would be exceeded.
+const CHECK_AND_INCREMENT = `
+local n = #KEYS
+for i = 1, n do
+    local cost = tonumber(ARGV[(i - 1) * 3 + 1])
+    local limit = tonumber(ARGV[(i - 1) * 3 + 2])
+    local count = tonumber(redis.call('GET', KEYS[i]) or '0')
+    if count + cost > limit then
+        return { 0, i, count, redis.call('TTL', KEYS[i]) }
+    end
+end
+
+local result = { 1 }
+for i = 1, n do
+    local cost = tonumber(ARGV[(i - 1) * 3 + 1])
+    local limit = tonumber(ARGV[(i - 1) * 3 + 2])
+    local duration = tonumber(ARGV[(i - 1) * 3 + 3])
+    local count = redis.call('INCRBY', KEYS[i], cost)
+    if redis.call('TTL', KEYS[i]) == -1 then
+        redis.call('EXPIRE', KEYS[i], duration)
+    end
+    result[i + 1] = math.floor((limit - count) / cost)
+end
+return result
+`;
+
+// Reserves a batch of requests across every window of a category for a
+// process-local token bucket (hybrid mode). Grants as many requests as all
+// windows can still afford, up to the requested batch size.
+//
+// KEYS: one counter key per limited window (in window order)
+// ARGV: [1] batch size in requests, then cost, limit, duration triplets
+//
+// Returns { granted, pttl } with the shortest remaining window lifetime in ms,
+// or      { 0, index, count, ttl } for the first window that is exhausted.
+const LEASE_TOKENS = `
+local n = #KEYS
+local grant = tonumber(ARGV[1])
+for i = 1, n do
+    local cost = tonumber(ARGV[(i - 1) * 3 + 2])
+    local limit = tonumber(ARGV[(i - 1) * 3 + 3])
+    local count = tonumber(redis.call('GET', KEYS[i]) or '0')
+    local available = math.floor((limit - count) / cost)
+    if available <= 0 then
+        return { 0, i, count, redis.call('TTL', KEYS[i]) }
+    end
+    if available < grant then
+        grant = available
+    end
+end
+
+local pttl = -1
+for i = 1, n do
+    local cost = tonumber(ARGV[(i - 1) * 3 + 2])
+    local duration = tonumber(ARGV[(i - 1) * 3 + 4])
+    redis.call('INCRBY', KEYS[i], grant * cost)
+    local ttl = redis.call('PTTL', KEYS[i])
+    if ttl == -1 then
+        redis.call('PEXPIRE', KEYS[i], duration * 1000)
+        ttl = duration * 1000
+    end
+    if pttl == -1 or ttl < pttl then
+        pttl = ttl
+    end
+end
+return { grant, pttl }
+`;
+
+// Returns unused leased requests to every window that still exists.
+// Windows that already rolled over are left alone.
+//
+// KEYS: one counter key per limited window (in window order)
+// ARGV: [1] unused requests, then one cost per key
+const SETTLE_TOKENS = `
+local unused = tonumber(ARGV[1])
+for i = 1, #KEYS do
+    if redis.call('PTTL', KEYS[i]) > 0 then
+        local count = tonumber(redis.call('GET', KEYS[i]) or '0')
+        local refund = math.min(count, unused * tonumber(ARGV[i + 1]))
+        if refund > 0 then
+            redis.call('DECRBY', KEYS[i], refund)
+        end
+    end
+end
+return 1
+`;
+
+module.exports = {
+    CHECK_AND_INCREMENT,
+    LEASE_TOKENS,
+    SETTLE_TOKENS
+};
@@ -1,34 +1,49 @@
 // src/routes/dataApi.routes.js
 const express = require('express');
 const router = express.Router();
-const rateLimiter = require('../middleware/rateLimiter');
-const axios = require('axios');
+const rateLimiter = require('../middleware/rateLimit');
+const metrics = require('../metrics');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const readThroughCache = require('../service/readThroughCache');
+
+// Time every request (no-op unless METRICS_ENABLED=true)
+router.use(metrics.middleware());
 
 // Apply rate limiter for all data routes
-router.use(rateLimiter.dataApiLimiter());
+router.use(['/market-data', '/historical'], rateLimiter.dataApiLimiter());
 
-// Get market data
+// Get market data; concurrent and repeated requests share one upstream call
 router.get('/market-data/:symbol', async (req, res) => {
     try {
-        const response = await axios.get(`${process.env.DHAN_API_URL}/data/market/${req.params.symbol}`, {
-            headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
+        const symbol = req.params.symbol;
+        await readThroughCache.respond(res, 'market-data', symbol, async () => {
+            const response = await dhanHttpClient.api.get(`/data/market/${symbol}`, {
+                headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
+            });
+            return response.data;
         });
-        res.json(response.data);
     } catch (error) {
-        res.status(error.response?.status || 500).json({ error: error.message });
+        dhanHttpClient.sendError(res, error);
     }
 });
 
-// Get historical data
+// Get historical data; piped through unparsed in streaming mode
 router.get('/historical/:symbol', async (req, res) => {
     try {
-        const response = await axios.get(`${process.env.DHAN_API_URL}/data/historical/${req.params.symbol}`, {
+        const config = {
+            method: 'get',
+            url: `/data/historical/${req.params.symbol}`,
             headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN },
             params: req.query // interval, from, to
-        });
+        };
+        if (dhanHttpClient.streamResponses) {
+            return await dhanHttpClient.proxy(req, res, config);
+        }
+
+        const response = await dhanHttpClient.api.request(config);
         res.json(response.data);
     } catch (error) {
-        res.status(error.response?.status || 500).json({ error: error.message });
+        dhanHttpClient.sendError(res, error);
     }
 });
 
@@ -0,0 +1,54 @@
+// src/routes/metrics.routes.js
+const express = require('express');
+const router = express.Router();
+const metrics = require('../metrics');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const readThroughCache = require('../service/readThroughCache');
+const orderScheduler = require('../service/orderScheduler');
+const portfolioSnapshots = require('../service/portfolioSnapshot');
+
+// Point-in-time values from components that keep their own counters
+metrics.registerCollector(() => {
+    const pool = dhanHttpClient.getMetrics();
+    const samples = [
+        { name: 'upstream_requests', help: 'Requests sent through the shared Dhan HTTP pool', value: pool.requests },
+        { name: 'upstream_reused_sockets', help: 'Requests that reused a pooled socket', value: pool.reusedSockets },
+        { name: 'upstream_active_sockets', help: 'Sockets currently in use', value: pool.activeSockets },
+        { name: 'upstream_free_sockets', help: 'Idle sockets kept warm', value: pool.freeSockets },
+        { name: 'order_queue_depth', help: 'Orders waiting in the default account scheduler', value: orderScheduler.getStats().queued }
+    ];
+
+    for (const [category, stats] of Object.entries(pool.upstream || {})) {
+        const labels = { category };
+        samples.push({ name: 'upstream_concurrency_limit', help: 'Adaptive concurrency limit per endpoint category', labels, value: stats.limit });
+        samples.push({ name: 'upstream_in_flight', help: 'Dhan requests in flight per endpoint category', labels, value: stats.inFlight });
+        samples.push({ name: 'upstream_queued', help: 'Dhan requests waiting for a concurrency slot', labels, value: stats.queued });
+        samples.push({ name: 'upstream_shed', help: 'Dhan requests failed fast instead of queueing', labels, value: stats.shed + stats.rejectedOpen });
+        samples.push({ name: 'upstream_circuit_open', help: '1 while the circuit breaker is open or half-open', labels, value: stats.state === 'closed' ? 0 : 1 });
+    }
+
+    const caches = readThroughCache.getStats();
+    for (const [route, stats] of Object.entries(caches)) {
+        for (const result of ['hits', 'misses', 'coalesced', 'sharedHits']) {
+            samples.push({ name: 'proxy_cache_requests', help: 'Read-through cache lookups by result', labels: { route, result }, value: stats[result] });
+        }
+    }
+
+    for (const [account, stats] of Object.entries(portfolioSnapshots.getStats())) {
+        samples.push({ name: 'portfolio_upstream_requests', help: 'Holdings/positions refreshes sent to Dhan', labels: { account }, value: stats.upstreamRequests });
+        samples.push({ name: 'portfolio_reads', help: 'Holdings/positions requests served from the snapshot', labels: { account }, value: stats.reads });
+        samples.push({ name: 'portfolio_stream_clients', help: 'Open portfolio delta streams', labels: { account }, value: stats.subscribers });
+    }
+    return samples;
+});
+
+// Prometheus scrape endpoint
+router.get('/metrics', (req, res) => {
+    if (!metrics.enabled) {
+        return res.status(404).json({ error: 'Metrics are disabled. Set METRICS_ENABLED=true to enable them.' });
+    }
+    res.set('Content-Type', 'text/plain; version=0.0.4');
+    res.send(metrics.toPrometheus());
+});
+
+module.exports = router;
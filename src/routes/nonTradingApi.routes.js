@@ -1,45 +1,133 @@
 // src/routes/nonTradingApi.routes.js
 const express = require('express');
 const router = express.Router();
-const rateLimiter = require('../middleware/rateLimiter');
-const axios = require('axios');
+const rateLimiter = require('../middleware/rateLimit');
+const metrics = require('../metrics');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const accountRegistry = require('../service/accountRegistry');
+const portfolioSnapshots = require('../service/portfolioSnapshot');
 
-// Apply rate limiter for all non-trading routes
-router.use(rateLimiter.nonTradingApiLimiter());
+const STREAM_HEARTBEAT_MS = 15000;
 
-// Get user profile
+// Time every request (no-op unless METRICS_ENABLED=true)
+router.use(metrics.middleware());
+
+// Apply rate limiter for all non-trading routes, including the snapshot reads
+// and stream connects, which would otherwise be unbounded per account
+router.use(['/profile', '/holdings', '/positions', '/portfolio/stream'], rateLimiter.nonTradingApiLimiter());
+
+// Get user profile; piped through unparsed in streaming mode
 router.get('/profile', async (req, res) => {
     try {
-        const response = await axios.get(`${process.env.DHAN_API_URL}/users/profile`, {
-            headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
+        if (dhanHttpClient.streamResponses) {
+            return await dhanHttpClient.proxy(req, res, {
+                method: 'get',
+                url: '/users/profile',
+                headers: { 'access-token': accountRegistry.resolve(req).accessToken }
+            });
+        }
+
+        const response = await dhanHttpClient.api.get('/users/profile', {
+            headers: { 'access-token': accountRegistry.resolve(req).accessToken }
         });
         res.json(response.data);
     } catch (error) {
-        res.status(error.response?.status || 500).json({ error: error.message });
+        dhanHttpClient.sendError(res, error);
     }
 });
 
-// Get holdings
-router.get('/holdings', async (req, res) => {
+// Serve holdings or positions from the account's snapshot, refreshed once per
+// interval however many clients poll; unchanged data answers 304
+async function sendSnapshot(req, res, kind) {
     try {
-        const response = await axios.get(`${process.env.DHAN_API_URL}/holdings`, {
-            headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
-        });
-        res.json(response.data);
+        const snapshot = await portfolioSnapshots.get(accountRegistry.resolve(req), kind);
+        res.set('ETag', snapshot.etag);
+        res.set('Cache-Control', 'no-cache');
+
+        const ifNoneMatch = req.get('if-none-match');
+        if (ifNoneMatch && ifNoneMatch.split(',').some(tag => tag.trim() === snapshot.etag)) {
+            return res.status(304).end();
+        }
+        res.set('Content-Type', 'application/json');
+        res.send(snapshot.body);
     } catch (error) {
-        res.status(error.response?.status || 500).json({ error: error.message });
+        dhanHttpClient.sendError(res, error);
     }
-});
+}
+
+// Get holdings
+router.get('/holdings', (req, res) => sendSnapshot(req, res, 'holdings'));
 
 // Get positions
-router.get('/positions', async (req, res) => {
+router.get('/positions', (req, res) => sendSnapshot(req, res, 'positions'));
+
+// Server-sent events: a 'snapshot' event per kind, then 'delta' events with
+// only the changed rows ({ kind, version, etag, upserts, removed }). A kind
+// whose first snapshot failed gets a full snapshot with its next change.
+// ?kinds=holdings,positions (default both)
+router.get('/portfolio/stream', (req, res) => {
+    let account;
+    try {
+        account = accountRegistry.resolve(req);
+    } catch (error) {
+        return res.status(error.status || 500).json({ error: error.message });
+    }
+
+    const kinds = req.query && req.query.kinds
+        ? String(req.query.kinds).split(',').filter(kind => portfolioSnapshots.kinds.includes(kind))
+        : portfolioSnapshots.kinds;
+    if (kinds.length === 0) {
+        return res.status(400).json({ error: `kinds must be among ${portfolioSnapshots.kinds.join(', ')}` });
+    }
+
+    // Version each client has seen per kind (0: none yet); deltas older than its snapshot are skipped
+    const sentVersion = {};
+    const write = (event, data) => res.write(`event: ${event}\ndata: ${data}\n\n`);
+    // The body is already serialized; splice it in rather than parse and re-encode it
+    const writeSnapshot = (kind, snapshot) => {
+        sentVersion[kind] = snapshot.version;
+        write('snapshot', `{"kind":"${kind}","version":${snapshot.version},"etag":${JSON.stringify(snapshot.etag)},"rows":${snapshot.body}}`);
+    };
+
+    let unsubscribe;
     try {
-        const response = await axios.get(`${process.env.DHAN_API_URL}/positions`, {
-            headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
+        unsubscribe = portfolioSnapshots.subscribe(account, (delta) => {
+            if (!kinds.includes(delta.kind) || !(delta.version > sentVersion[delta.kind])) return;
+            if (sentVersion[delta.kind] === 0) {
+                // The client has no rows to apply a delta to
+                writeSnapshot(delta.kind, portfolioSnapshots.portfolio(account).snapshots[delta.kind]);
+                return;
+            }
+            sentVersion[delta.kind] = delta.version;
+            write('delta', JSON.stringify(delta));
+        }, (error) => {
+            write('error', JSON.stringify({ error: error.message }));
         });
-        res.json(response.data);
     } catch (error) {
-        res.status(error.response?.status || 500).json({ error: error.message });
+        return res.status(error.status || 500).json({ error: error.message });
+    }
+
+    res.writeHead(200, {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        'X-Accel-Buffering': 'no'
+    });
+
+    const heartbeat = setInterval(() => res.write(': ping\n\n'), STREAM_HEARTBEAT_MS);
+    res.on('close', () => {
+        clearInterval(heartbeat);
+        unsubscribe();
+    });
+
+    for (const kind of kinds) {
+        portfolioSnapshots.get(account, kind).then((snapshot) => {
+            // A delta may have brought a newer snapshot first
+            if (!(sentVersion[kind] >= snapshot.version)) writeSnapshot(kind, snapshot);
+        }, (error) => {
+            if (sentVersion[kind] === undefined) sentVersion[kind] = 0;
+            write('error', JSON.stringify({ kind, error: error.message }));
+        });
     }
 });
 
@@ -1,49 +1,88 @@
 // src/routes/orderApi.routes.js
 const express = require('express');
 const router = express.Router();
-const rateLimiter = require('../middleware/rateLimiter');
-const orderService = require('../services/orderService');
+const rateLimiter = require('../middleware/rateLimit');
+const metrics = require('../metrics');
+const accountRegistry = require('../service/accountRegistry');
 
-// Apply rate limiter for all order routes
-router.use(rateLimiter.orderApiLimiter());
+// Time every request (no-op unless METRICS_ENABLED=true)
+router.use(metrics.middleware());
 
-// Place new order
+// Outbound order queue depth, lanes and wait times. Registered ahead of the
+// limiter: polling it must not spend the account's order budget.
+router.get('/orders/queue/stats', (req, res) => {
+    try {
+        res.json(accountRegistry.resolve(req).scheduler.getStats());
+    } catch (error) {
+        res.status(error.status || 500).json({ error: error.message });
+    }
+});
+
+// Apply rate limiter for all order routes. Scoped by path: routers are mounted
+// side by side, so an unscoped limiter would also charge other categories' requests.
+router.use(['/orders', '/positions/convert'], rateLimiter.orderApiLimiter());
+
+// Place new order for the account named by x-dhan-client-id (default: the env account;
+// any other needs its token in access-token);
+// x-order-lane (kill, exit, entry) picks the scheduler lane
 router.post('/orders', async (req, res) => {
     try {
-        const order = await orderService.placeOrder(req.body);
+        const order = await accountRegistry.resolve(req).orders.placeOrder(req.body, { lane: req.get('x-order-lane') });
         res.json(order);
     } catch (error) {
-        res.status(400).json({ error: error.message });
+        res.status(error.status || 400).json({ error: error.message });
     }
 });
 
 // Place CNC order
 router.post('/orders/cnc', async (req, res) => {
     try {
-        const order = await orderService.placeCNCOrder(req.body);
+        const order = await accountRegistry.resolve(req).orders.placeCNCOrder(req.body);
         res.json(order);
     } catch (error) {
-        res.status(400).json({ error: error.message });
+        res.status(error.status || 400).json({ error: error.message });
     }
 });
 
 // Place Intraday order
 router.post('/orders/intraday', async (req, res) => {
     try {
-        const order = await orderService.placeIntradayOrder(req.body);
+        const order = await accountRegistry.resolve(req).orders.placeIntradayOrder(req.body);
         res.json(order);
     } catch (error) {
-        res.status(400).json({ error: error.message });
+        res.status(error.status || 400).json({ error: error.message });
     }
 });
 
 // Place AMO order
 router.post('/orders/amo', async (req, res) => {
     try {
-        const order = await orderService.placeAMOOrder(req.body);
+        const order = await accountRegistry.resolve(req).orders.placeAMOOrder(req.body);
         res.json(order);
     } catch (error) {
-        res.status(400).json({ error: error.message });
+        res.status(error.status || 400).json({ error: error.message });
+    }
+});
+
+// Convert open positions in bulk, e.g. INTRADAY to CNC before the close. Body:
+// { toProductType, fromProductType?, exchangeSegment?, securityIds?, dryRun? };
+// answers with a per-position report. Runs the order budget can't finish within
+// POSITION_CONVERT_MAX_WAIT_MS are refused with 429 before anything is converted;
+// a dry run reports expectedDurationMs.
+router.post('/positions/convert/bulk', async (req, res) => {
+    try {
+        const { toProductType, fromProductType, exchangeSegment, securityIds, dryRun } = req.body || {};
+        const report = await accountRegistry.resolve(req).positions.convertPositions({
+            toProductType,
+            fromProductType,
+            exchangeSegment,
+            securityIds,
+            dryRun: dryRun === true || req.query.dryRun === 'true',
+            lane: req.get('x-order-lane')
+        });
+        res.json(report);
+    } catch (error) {
+        res.status(error.status || 400).json({ error: error.message });
     }
 });
 
@@ -1,33 +1,64 @@
 // src/routes/quoteApi.routes.js
 const express = require('express');
 const router = express.Router();
-const rateLimiter = require('../middleware/rateLimiter');
-const axios = require('axios');
+const rateLimiter = require('../middleware/rateLimit');
+const metrics = require('../metrics');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const readThroughCache = require('../service/readThroughCache');
+const quoteBatcher = require('../service/quoteBatcher');
+
+// Time every request (no-op unless METRICS_ENABLED=true)
+router.use(metrics.middleware());
 
 // Apply rate limiter for all quote routes
-router.use(rateLimiter.quoteApiLimiter());
+router.use('/quotes', rateLimiter.quoteApiLimiter());
+
+// Hit/miss/coalesced counters of the proxy route caches
+router.get('/cache/stats', (req, res) => {
+    res.json({ ...readThroughCache.getStats(), quoteBatcher: quoteBatcher.getStats() });
+});
 
-// Get quote for a symbol
+// Get quote for a symbol; concurrent and repeated requests share one upstream call.
+// Instruments given as NSE_EQ:11536 (or 11536?exchangeSegment=NSE_EQ) are
+// batched into /marketfeed/ltp on a cache miss (QUOTE_BATCH_ENABLED=false to turn off)
 router.get('/quotes/:symbol', async (req, res) => {
     try {
-        const response = await axios.get(`${process.env.DHAN_API_URL}/quotes/${req.params.symbol}`, {
-            headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
+        const instrument = quoteBatcher.settings.enabled
+            ? quoteBatcher.parseInstrument(req.params.symbol, req.query && req.query.exchangeSegment)
+            : null;
+        const symbol = instrument ? `${instrument.exchangeSegment}:${instrument.securityId}` : req.params.symbol;
+        await readThroughCache.respond(res, 'quotes', symbol, async () => {
+            if (instrument) {
+                return quoteBatcher.get(instrument.exchangeSegment, instrument.securityId);
+            }
+            const response = await dhanHttpClient.api.get(`/quotes/${symbol}`, {
+                headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
+            });
+            return response.data;
         });
-        res.json(response.data);
     } catch (error) {
-        res.status(error.response?.status || 500).json({ error: error.message });
+        dhanHttpClient.sendError(res, error);
     }
 });
 
-// Get multiple quotes
+// Get multiple quotes; piped through unparsed in streaming mode
 router.post('/quotes/bulk', async (req, res) => {
     try {
-        const response = await axios.post(`${process.env.DHAN_API_URL}/quotes/bulk`, req.body, {
+        if (dhanHttpClient.streamResponses) {
+            return await dhanHttpClient.proxy(req, res, {
+                method: 'post',
+                url: '/quotes/bulk',
+                data: req.body,
+                headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
+            });
+        }
+
+        const response = await dhanHttpClient.api.post('/quotes/bulk', req.body, {
             headers: { 'access-token': process.env.DHAN_ACCESS_TOKEN }
         });
         res.json(response.data);
     } catch (error) {
-        res.status(error.response?.status || 500).json({ error: error.message });
+        dhanHttpClient.sendError(res, error);
     }
 });
 
@@ -0,0 +1,189 @@
+// src/server.js
+//
+// Production entry point. The primary forks one worker per core; workers
+// share the listening port, so connections are spread across event loops.
+// Limiter state lives in Redis, which every worker reaches through one
+// shared client, so budgets hold across the whole cluster.
+//
+//   SIGHUP           rolling restart: replace workers one at a time
+//   SIGTERM / SIGINT graceful shutdown: finish in-flight requests, then exit
+
+const cluster = require('cluster');
+const os = require('os');
+require('dotenv').config();
+
+const SERVER_SETTINGS = {
+    port: parseInt(process.env.PORT) || 3000,
+    host: process.env.HOST || '0.0.0.0',
+    workers: parseInt(process.env.WEB_CONCURRENCY) || os.availableParallelism(),
+    shutdownTimeout: parseInt(process.env.SHUTDOWN_TIMEOUT_MS) || 10000,  // Grace period for in-flight requests
+    readyTimeout: parseInt(process.env.WORKER_READY_TIMEOUT_MS) || 30000, // Warm-up allowance for a new worker
+    restartDelay: 1000                                                    // Before replacing a crashed worker
+};
+
+// ---- Primary --------------------------------------------------------------
+
+class ClusterPrimary {
+    constructor(settings = SERVER_SETTINGS) {
+        this.settings = settings;
+        this.stopping = false;
+        this.restarting = false;
+        // Workers being retired on purpose; their exit must not trigger a respawn
+        this.retiring = new Set();
+    }
+
+    start() {
+        console.log(`Primary ${process.pid} starting ${this.settings.workers} workers`);
+        for (let i = 0; i < this.settings.workers; i++) {
+            this.fork();
+        }
+
+        cluster.on('exit', (worker, code, signal) => {
+            if (this.retiring.delete(worker.id) || this.stopping) return;
+            console.error(`Worker ${worker.process.pid} died (${signal || code}), replacing it`);
+            setTimeout(() => {
+                if (!this.stopping) this.fork();
+            }, this.settings.restartDelay);
+        });
+
+        process.on('SIGHUP', () => this.rollingRestart());
+        process.on('SIGTERM', () => this.stop());
+        process.on('SIGINT', () => this.stop());
+    }
+
+    // Workers take each order from the account budget in Redis (see
+    // orderScheduler), so they need nothing from the primary to share it
+    fork() {
+        return cluster.fork();
+    }
+
+    // Resolves once the worker has warmed up and is accepting connections
+    waitForReady(worker) {
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                cleanup();
+                reject(new Error(`Worker ${worker.process.pid} not ready after ${this.settings.readyTimeout}ms`));
+            }, this.settings.readyTimeout);
+            const onMessage = (message) => {
+                if (message && message.type === 'ready') {
+                    cleanup();
+                    resolve(worker);
+                }
+            };
+            const onExit = () => {
+                cleanup();
+                reject(new Error(`Worker ${worker.process.pid} exited during startup`));
+            };
+            const cleanup = () => {
+                clearTimeout(timer);
+                worker.off('message', onMessage);
+                worker.off('exit', onExit);
+            };
+            worker.on('message', onMessage);
+            worker.once('exit', onExit);
+        });
+    }
+
+    // Ask a worker to drain and exit; kill it if it takes longer than the grace period
+    retire(worker) {
+        this.retiring.add(worker.id);
+        return new Promise((resolve) => {
+            if (worker.isDead()) return resolve();
+            const timer = setTimeout(() => worker.kill('SIGKILL'), this.settings.shutdownTimeout + 1000);
+            worker.once('exit', () => {
+                clearTimeout(timer);
+                resolve();
+            });
+            worker.send({ type: 'shutdown' });
+        });
+    }
+
+    // Start a replacement before retiring each old worker, so capacity never drops
+    async rollingRestart() {
+        if (this.restarting || this.stopping) return;
+        this.restarting = true;
+        console.log('Rolling restart started');
+
+        try {
+            for (const worker of Object.values(cluster.workers)) {
+                if (this.retiring.has(worker.id)) continue;
+                await this.waitForReady(this.fork());
+                await this.retire(worker);
+            }
+            console.log('Rolling restart finished');
+        } catch (error) {
+            console.error('Rolling restart aborted:', error.message);
+        } finally {
+            this.restarting = false;
+        }
+    }
+
+    async stop() {
+        if (this.stopping) return;
+        this.stopping = true;
+        console.log('Shutting down workers');
+        await Promise.all(Object.values(cluster.workers).map(worker => this.retire(worker)));
+        process.exit(0);
+    }
+}
+
+// ---- Worker ---------------------------------------------------------------
+
+async function startWorker(settings = SERVER_SETTINGS) {
+    const { createApp, warmUp, shutdown } = require('./app');
+
+    const app = createApp();
+    await warmUp();
+
+    const server = app.listen(settings.port, settings.host, () => {
+        console.log(`Worker ${process.pid} listening on ${settings.host}:${settings.port}`);
+        if (process.send) process.send({ type: 'ready' });
+    });
+
+    let closing = false;
+    const close = async () => {
+        if (closing) return;
+        closing = true;
+
+        // Stop accepting, drop idle keep-alive sockets, and let in-flight requests finish
+        const forceExit = setTimeout(() => process.exit(1), settings.shutdownTimeout);
+        forceExit.unref();
+        await new Promise((resolve) => {
+            server.close(resolve);
+            server.closeIdleConnections();
+        });
+
+        try {
+            await shutdown();
+        } catch (error) {
+            console.error('Worker shutdown error:', error);
+        }
+        process.exit(0);
+    };
+
+    process.on('message', (message) => {
+        if (message && message.type === 'shutdown') close();
+    });
+    // Signals from the terminal reach every process in the group; the primary coordinates
+    process.on('SIGINT', cluster.isWorker ? () => {} : close);
+    process.on('SIGTERM', close);
+    // The primary went away without telling us
+    process.on('disconnect', close);
+}
+
+if (require.main === module) {
+    if (cluster.isPrimary && SERVER_SETTINGS.workers > 1) {
+        new ClusterPrimary().start();
+    } else {
+        startWorker().catch((error) => {
+            console.error('Worker failed to start:', error);
+            process.exit(1);
+        });
+    }
+}
+
+module.exports = {
+    ClusterPrimary,
+    startWorker,
+    SERVER_SETTINGS
+};
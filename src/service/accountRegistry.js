@@ -0,0 +1,231 @@
+// src/service/accountRegistry.js
+
+const crypto = require('crypto');
+require('dotenv').config();
+
+// Services available on an account context, by property name. Each module
+// exports a default (env-configured) instance; per-account instances are
+// built from its constructor.
+const ACCOUNT_SERVICES = {
+    orders: './placeOrder.js',
+    sliceOrders: './sliceOrder.js',
+    foreverOrders: './foreverOrder.js',
+    positions: './positionConverter.js',
+    margin: './marginCalculator.py',
+    killswitch: './killSwitch.js',
+    edis: './edis.js',
+    bulkEdis: './edisBulk.js',
+    trades: './trades.py',
+    charts: './ohlcDaily.py',
+    intradayCharts: './ohlcMinute.py'
+};
+
+const ACCOUNT_HEADER = 'x-dhan-client-id';
+// Callers prove they may act for a non-default account with its Dhan token
+const TOKEN_HEADER = 'access-token';
+
+// Constant-time comparison of two secrets of any length
+function sameSecret(a, b) {
+    const digest = value => crypto.createHash('sha256').update(String(value)).digest();
+    return crypto.timingSafeEqual(digest(a), digest(b));
+}
+
+// Per-account state: the token plus lazily created services. Services share
+// the process-wide connection pool, compiled validators and market data
+// caches; only the order budget, kill-switch watcher and trigger book are
+// per account.
+class AccountContext {
+    constructor({ dhanClientId, accessToken }, isDefault = false) {
+        this.dhanClientId = dhanClientId;
+        this.accessToken = accessToken;
+        this.isDefault = isDefault;
+        this._services = {};
+        this._scheduler = null;
+        this._watcher = null;
+        this._triggerBook = null;
+
+        for (const name of Object.keys(ACCOUNT_SERVICES)) {
+            Object.defineProperty(this, name, {
+                get: () => this.service(name),
+                enumerable: true
+            });
+        }
+    }
+
+    get scheduler() {
+        if (!this._scheduler) {
+            const orderScheduler = require('./orderScheduler');
+            this._scheduler = this.isDefault
+                ? orderScheduler
+                : new orderScheduler.constructor(undefined, undefined, { account: this.dhanClientId });
+        }
+        return this._scheduler;
+    }
+
+    get watcher() {
+        if (!this._watcher) {
+            const killswitchWatcher = require('./killswitchWatcher');
+            this._watcher = this.isDefault
+                ? killswitchWatcher
+                : new killswitchWatcher.constructor({
+                    channel: `killswitch:status:${this.dhanClientId}`,
+                    leaderKey: `killswitch:poller:${this.dhanClientId}`
+                });
+        }
+        return this._watcher;
+    }
+
+    get triggerBook() {
+        if (!this._triggerBook) {
+            const TriggerBook = require('./triggerBook');
+            this._triggerBook = this.isDefault
+                ? require('./foreverOrder.js').triggerBook
+                : new TriggerBook();
+        }
+        return this._triggerBook;
+    }
+
+    service(name) {
+        if (!this._services[name]) {
+            const defaultInstance = require(ACCOUNT_SERVICES[name]);
+            this._services[name] = this.isDefault
+                ? defaultInstance
+                : new defaultInstance.constructor({
+                    dhanClientId: this.dhanClientId,
+                    accessToken: this.accessToken,
+                    scheduler: this.scheduler,
+                    watcher: name === 'killswitch' ? this.watcher : undefined,
+                    triggerBook: name === 'foreverOrders' ? this.triggerBook : undefined
+                });
+        }
+        return this._services[name];
+    }
+
+    // Create every service now instead of on the account's first request,
+    // and start keeping the trigger book in step with Dhan
+    warmUp() {
+        for (const name of Object.keys(ACCOUNT_SERVICES)) {
+            this.service(name);
+        }
+        this.foreverOrders.startSync();
+    }
+
+    // Release per-account timers and connections
+    close() {
+        if (this.isDefault) return;
+        if (this._watcher) this._watcher.stop();
+        if (this._services.foreverOrders) this._services.foreverOrders.stopSync();
+        if (this._triggerBook) this._triggerBook.detach();
+    }
+}
+
+// Account contexts by dhanClientId. Accounts come from register() or from
+// DHAN_ACCOUNTS ("clientId:accessToken,clientId:accessToken"); the env
+// account (DHAN_CLIENT_ID / DHAN_ACCESS_TOKEN) is the default. Requests for
+// any other account must carry that account's token in the access-token header.
+class AccountRegistry {
+    constructor() {
+        this._accounts = new Map();
+        this.defaultAccount = new AccountContext({
+            dhanClientId: process.env.DHAN_CLIENT_ID,
+            accessToken: process.env.DHAN_ACCESS_TOKEN
+        }, true);
+
+        if (this.defaultAccount.dhanClientId) {
+            this._accounts.set(this.defaultAccount.dhanClientId, this.defaultAccount);
+        }
+        for (const account of this.parseAccounts(process.env.DHAN_ACCOUNTS)) {
+            this.register(account);
+        }
+    }
+
+    parseAccounts(accountString) {
+        if (!accountString) return [];
+        return accountString.split(',')
+            .map(entry => entry.trim())
+            .filter(Boolean)
+            .map((entry) => {
+                const separator = entry.indexOf(':');
+                return { dhanClientId: entry.slice(0, separator), accessToken: entry.slice(separator + 1) };
+            });
+    }
+
+    register({ dhanClientId, accessToken }) {
+        if (!dhanClientId || !accessToken) {
+            throw new Error('dhanClientId and accessToken are required to register an account');
+        }
+
+        const existing = this._accounts.get(dhanClientId);
+        if (existing && existing.isDefault) {
+            // One context (and one order budget) per Dhan account
+            if (existing.accessToken !== accessToken) {
+                throw new Error(`Account registration failed: ${dhanClientId} is the default account; change its token in DHAN_ACCESS_TOKEN`);
+            }
+            return existing;
+        }
+        if (existing && existing.accessToken === accessToken) {
+            return existing;
+        }
+
+        const context = new AccountContext({ dhanClientId, accessToken });
+        if (existing) {
+            // New token: rebuild the services so they pick it up, but keep the order budget
+            context._scheduler = existing._scheduler;
+            existing.close();
+        }
+        this._accounts.set(dhanClientId, context);
+        return context;
+    }
+
+    unregister(dhanClientId) {
+        const context = this._accounts.get(dhanClientId);
+        if (!context || context.isDefault) return false;
+        context.close();
+        return this._accounts.delete(dhanClientId);
+    }
+
+    get(dhanClientId) {
+        if (!dhanClientId) return this.defaultAccount;
+        const context = this._accounts.get(dhanClientId);
+        if (!context) {
+            const error = new Error(`Unknown account: ${dhanClientId}`);
+            error.status = 404;
+            throw error;
+        }
+        return context;
+    }
+
+    // Account key for an inbound request (header), or null for the default account
+    accountId(req) {
+        return req.get(ACCOUNT_HEADER) || null;
+    }
+
+    // Account context for an inbound request. Only the default account is
+    // served without proof; any other needs its own token (401/403 otherwise).
+    resolve(req) {
+        const context = this.get(this.accountId(req));
+        if (context.isDefault) return context;
+
+        const token = req.get(TOKEN_HEADER);
+        if (!token) {
+            const error = new Error(`Account ${context.dhanClientId} requires the ${TOKEN_HEADER} header`);
+            error.status = 401;
+            throw error;
+        }
+        if (!sameSecret(token, context.accessToken)) {
+            const error = new Error(`Access token does not match account ${context.dhanClientId}`);
+            error.status = 403;
+            throw error;
+        }
+        return context;
+    }
+
+    list() {
+        return [...this._accounts.keys()];
+    }
+}
+
+AccountRegistry.ACCOUNT_HEADER = ACCOUNT_HEADER;
+AccountRegistry.TOKEN_HEADER = TOKEN_HEADER;
+
+module.exports = new AccountRegistry();
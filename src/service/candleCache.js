@@ -0,0 +1,352 @@
+// src/service/candleCache.js
+
+const fs = require('fs');
+const path = require('path');
+require('dotenv').config();
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+const IST_OFFSET_MS = 330 * 60 * 1000;   // Candles are bucketed by Indian trading day
+
+// Rough in-memory cost of one candle, used for eviction accounting
+const BYTES_PER_CANDLE = {
+    columns: 6 * 8,
+    rows: 160
+};
+
+const CACHE_DEFAULTS = {
+    maxBytes: parseInt(process.env.CANDLE_CACHE_MAX_BYTES) || 256 * 1024 * 1024,
+    sessionTtl: parseInt(process.env.CANDLE_CACHE_SESSION_TTL) || 60000,  // Refresh today's candles after this many ms
+    persistDir: process.env.CANDLE_CACHE_DIR || null                       // Completed days are written here when set
+};
+
+// Day index (days since epoch) of a yyyy-MM-dd string
+function toDayIndex(dateString) {
+    return Math.floor(Date.parse(`${dateString}T00:00:00Z`) / DAY_MS);
+}
+
+function toDateString(dayIndex) {
+    return new Date(dayIndex * DAY_MS).toISOString().slice(0, 10);
+}
+
+function timestampToMs(timestamp) {
+    if (typeof timestamp === 'number') {
+        return timestamp < 1e12 ? timestamp * 1000 : timestamp;
+    }
+    return new Date(timestamp).getTime();
+}
+
+function candleDay(timestamp) {
+    return Math.floor((timestampToMs(timestamp) + IST_OFFSET_MS) / DAY_MS);
+}
+
+// Dhan returns candles either as parallel arrays or as an array of objects
+function detectFormat(data) {
+    return Array.isArray(data) ? 'rows' : 'columns';
+}
+
+function countCandles(chunk, format) {
+    return format === 'rows' ? chunk.length : (chunk.timestamp || []).length;
+}
+
+// Split an upstream response into per-day chunks
+function splitByDay(data, format) {
+    const days = new Map();
+
+    if (format === 'rows') {
+        for (const item of data) {
+            const day = candleDay(item.timestamp);
+            if (!days.has(day)) days.set(day, []);
+            days.get(day).push(item);
+        }
+        return days;
+    }
+
+    const timestamps = data.timestamp || [];
+    const fields = Object.keys(data).filter(field => Array.isArray(data[field]));
+    let start = 0;
+    for (let i = 1; i <= timestamps.length; i++) {
+        if (i < timestamps.length && candleDay(timestamps[i]) === candleDay(timestamps[start])) continue;
+
+        const chunk = {};
+        for (const field of fields) {
+            chunk[field] = data[field].slice(start, i);
+        }
+        days.set(candleDay(timestamps[start]), chunk);
+        start = i;
+    }
+    return days;
+}
+
+// Join per-day chunks (already in day order) back into one response
+function mergeChunks(chunks, format) {
+    if (format === 'rows') {
+        return [].concat(...chunks);
+    }
+
+    const merged = {};
+    for (const chunk of chunks) {
+        for (const [field, values] of Object.entries(chunk)) {
+            if (!merged[field]) merged[field] = [];
+            for (const value of values) merged[field].push(value);
+        }
+    }
+    if (!merged.timestamp) merged.timestamp = [];
+    return merged;
+}
+
+// Parts of [from, to) not covered by the sorted, non-overlapping intervals
+function subtractIntervals(from, to, intervals) {
+    const missing = [];
+    let cursor = from;
+    for (const [start, end] of intervals) {
+        if (end <= cursor) continue;
+        if (start >= to) break;
+        if (start > cursor) missing.push([cursor, start]);
+        cursor = Math.max(cursor, end);
+        if (cursor >= to) break;
+    }
+    if (cursor < to) missing.push([cursor, to]);
+    return missing;
+}
+
+function addInterval(intervals, from, to) {
+    const merged = [];
+    let current = [from, to];
+    for (const interval of intervals) {
+        if (interval[1] < current[0] || interval[0] > current[1]) {
+            merged.push(interval);
+        } else {
+            current = [Math.min(current[0], interval[0]), Math.max(current[1], interval[1])];
+        }
+    }
+    merged.push(current);
+    return merged.sort((a, b) => a[0] - b[0]);
+}
+
+class CandleCache {
+    constructor(options = {}) {
+        this.options = { ...CACHE_DEFAULTS, ...options };
+
+        // key -> { format, covered, days, bytes, sessionFetchedAt, pending }
+        // Map order doubles as LRU order (oldest first)
+        this.entries = new Map();
+        this.totalBytes = 0;
+
+        this.stats = {
+            hits: 0,          // Served entirely from cache
+            partialHits: 0,   // Some days cached, the rest fetched
+            misses: 0,        // Nothing cached for the range
+            fetches: 0,       // Upstream calls made
+            evictions: 0
+        };
+    }
+
+    buildKey(params, interval) {
+        return [
+            params.securityId,
+            params.exchangeSegment,
+            params.instrument,
+            interval,
+            params.expiryCode !== undefined ? params.expiryCode : ''
+        ].join('|');
+    }
+
+    // Return candles for [fromDate, toDate) (Dhan treats toDate as non-inclusive),
+    // fetching only the sub-ranges that aren't cached yet
+    async getRange(params, interval, fetchRange) {
+        const from = toDayIndex(params.fromDate);
+        const to = toDayIndex(params.toDate);
+        if (to <= from) {
+            return fetchRange(params.fromDate, params.toDate);
+        }
+
+        const key = this.buildKey(params, interval);
+        const entry = this.getEntry(key);
+
+        // Serialize work per key so overlapping requests don't fetch the same days twice
+        const run = (entry.pending || Promise.resolve())
+            .catch(() => null)
+            .then(() => this.fillRange(key, entry, from, to, fetchRange));
+        entry.pending = run;
+
+        try {
+            return await run;
+        } finally {
+            if (entry.pending === run) entry.pending = null;
+        }
+    }
+
+    async fillRange(key, entry, from, to, fetchRange) {
+        const today = Math.floor((Date.now() + IST_OFFSET_MS) / DAY_MS);
+
+        // Completed days are immutable once covered; today is refreshed after sessionTtl
+        const missing = subtractIntervals(from, Math.min(to, today), entry.covered);
+        const sessionStale = Date.now() - entry.sessionFetchedAt >= this.options.sessionTtl;
+        if (to > today && sessionStale) {
+            const last = missing[missing.length - 1];
+            const sessionStart = Math.max(from, today);
+            if (last && last[1] === sessionStart) {
+                last[1] = to;
+            } else {
+                missing.push([sessionStart, to]);
+            }
+        }
+
+        const wasEmpty = missing.length === 1 && missing[0][0] === from && missing[0][1] === to;
+        if (missing.length === 0) {
+            this.stats.hits++;
+        } else if (wasEmpty) {
+            this.stats.misses++;
+        } else {
+            this.stats.partialHits++;
+        }
+
+        for (const [start, end] of missing) {
+            this.stats.fetches++;
+            const data = await fetchRange(toDateString(start), toDateString(end));
+            this.storeRange(entry, data, start, end, today);
+        }
+
+        this.touch(key, entry);
+        if (missing.length > 0) {
+            this.persist(key, entry);
+            this.evict();
+        }
+
+        const chunks = [];
+        for (let day = from; day < to; day++) {
+            if (entry.days.has(day)) chunks.push(entry.days.get(day));
+        }
+        return mergeChunks(chunks, entry.format || detectFormat([]));
+    }
+
+    storeRange(entry, data, start, end, today) {
+        if (!entry.format) entry.format = detectFormat(data);
+
+        // Replace whatever was cached for the fetched days
+        for (let day = start; day < end; day++) {
+            this.removeDay(entry, day);
+        }
+
+        for (const [day, chunk] of splitByDay(data, entry.format)) {
+            if (day < start || day >= end) continue;
+            const bytes = countCandles(chunk, entry.format) * BYTES_PER_CANDLE[entry.format];
+            entry.days.set(day, chunk);
+            entry.dayBytes.set(day, bytes);
+            entry.bytes += bytes;
+            this.totalBytes += bytes;
+        }
+
+        if (Math.min(end, today) > start) {
+            entry.covered = addInterval(entry.covered, start, Math.min(end, today));
+        }
+        if (end > today) {
+            entry.sessionFetchedAt = Date.now();
+        }
+    }
+
+    removeDay(entry, day) {
+        if (!entry.days.has(day)) return;
+        const bytes = entry.dayBytes.get(day);
+        entry.days.delete(day);
+        entry.dayBytes.delete(day);
+        entry.bytes -= bytes;
+        this.totalBytes -= bytes;
+    }
+
+    getEntry(key) {
+        let entry = this.entries.get(key);
+        if (entry) return entry;
+
+        entry = {
+            format: null,
+            covered: [],
+            days: new Map(),
+            dayBytes: new Map(),
+            bytes: 0,
+            sessionFetchedAt: 0,
+            pending: null
+        };
+        this.entries.set(key, entry);
+
+        // Requests for this key queue behind the disk load
+        entry.pending = this.load(key, entry);
+        return entry;
+    }
+
+    touch(key, entry) {
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+    }
+
+    // Drop least recently used keys until the cache fits in maxBytes
+    evict() {
+        for (const [key, entry] of this.entries) {
+            if (this.totalBytes <= this.options.maxBytes) break;
+            if (entry.pending) continue;
+            this.entries.delete(key);
+            this.totalBytes -= entry.bytes;
+            this.stats.evictions++;
+        }
+    }
+
+    filePath(key) {
+        return path.join(this.options.persistDir, `${encodeURIComponent(key)}.json`);
+    }
+
+    // Load completed days written by an earlier process
+    async load(key, entry) {
+        if (!this.options.persistDir) return;
+
+        try {
+            const stored = JSON.parse(await fs.promises.readFile(this.filePath(key), 'utf8'));
+            entry.format = stored.format;
+            entry.covered = stored.covered;
+            for (const [day, chunk] of stored.days) {
+                const bytes = countCandles(chunk, entry.format) * BYTES_PER_CANDLE[entry.format];
+                entry.days.set(day, chunk);
+                entry.dayBytes.set(day, bytes);
+                entry.bytes += bytes;
+                this.totalBytes += bytes;
+            }
+        } catch (error) {
+            if (error.code !== 'ENOENT') {
+                console.error('Candle cache load error:', error);
+            }
+        }
+    }
+
+    // Write completed days only; the current session is always refetched
+    persist(key, entry) {
+        if (!this.options.persistDir) return;
+
+        const today = Math.floor((Date.now() + IST_OFFSET_MS) / DAY_MS);
+        const days = [...entry.days].filter(([day]) => day < today);
+        const body = JSON.stringify({ format: entry.format, covered: entry.covered, days });
+
+        fs.promises.mkdir(this.options.persistDir, { recursive: true })
+            .then(() => fs.promises.writeFile(this.filePath(key), body))
+            .catch((error) => {
+                console.error('Candle cache persist error:', error);
+            });
+    }
+
+    getStats() {
+        const lookups = this.stats.hits + this.stats.partialHits + this.stats.misses;
+        return {
+            ...this.stats,
+            hitRate: lookups > 0 ? this.stats.hits / lookups : 0,
+            entries: this.entries.size,
+            bytes: this.totalBytes,
+            maxBytes: this.options.maxBytes
+        };
+    }
+
+    clear() {
+        this.entries.clear();
+        this.totalBytes = 0;
+    }
+}
+
+// Shared by the historical and intraday chart services
+module.exports = new CandleCache();
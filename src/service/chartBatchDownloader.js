@@ -0,0 +1,281 @@
+// src/service/chartBatchDownloader.js
+
+const fs = require('fs');
+const path = require('path');
+const { EventEmitter } = require('events');
+const chartDataService = require('./ohlcDaily.py');
+const OHLCVColumns = require('./ohlcColumns');
+const { getDataConcurrency } = require('./chartRange');
+const { mapWithConcurrency } = require('../utils/concurrency');
+const { retryWithBackoff } = require('../utils/retry');
+const { rateLimitConfig } = require('../middleware/rateLimit/Config');
+
+// Binary files start with this magic followed by a uint32 LE candle count,
+// then the six Float64 columns (timestamp, open, high, low, close, volume)
+const BINARY_MAGIC = 'OHLC';
+
+class ChartBatchDownloader extends EventEmitter {
+    constructor(chartService = chartDataService) {
+        super();
+        this.chartService = chartService;
+
+        // Start times of recent requests, used to pace against the per-second budget
+        this._recentStarts = [];
+    }
+
+    instrumentKey(item) {
+        return [
+            item.securityId,
+            item.exchangeSegment,
+            item.instrument,
+            item.interval || 'D',
+            item.expiryCode !== undefined ? item.expiryCode : ''
+        ].join('_');
+    }
+
+    // Wait until starting another request keeps us within the per-second data budget
+    async pace() {
+        const second = rateLimitConfig.data.second;
+        const perSecond = Math.max(1, Math.floor(second.limit / second.cost));
+
+        for (;;) {
+            const now = Date.now();
+            while (this._recentStarts.length > 0 && now - this._recentStarts[0] >= 1000) {
+                this._recentStarts.shift();
+            }
+            if (this._recentStarts.length < perSecond) {
+                this._recentStarts.push(now);
+                return;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000 - (now - this._recentStarts[0])));
+        }
+    }
+
+    async fetchInstrument(item, options) {
+        const params = {
+            securityId: item.securityId,
+            exchangeSegment: item.exchangeSegment,
+            instrument: item.instrument,
+            expiryCode: item.expiryCode,
+            interval: item.interval,
+            fromDate: item.fromDate || options.fromDate,
+            toDate: item.toDate || options.toDate
+        };
+        if (params.expiryCode === undefined) delete params.expiryCode;
+        if (params.interval === undefined) delete params.interval;
+
+        // Chunks of one instrument run one at a time; the pool provides the parallelism.
+        // Every chunk is its own upstream request, so each one is paced.
+        const rangeOptions = { concurrency: 1, cache: options.cache, beforeChunk: () => this.pace() };
+
+        return retryWithBackoff(async () => {
+            return params.interval
+                ? this.chartService.getIntradayDataRange(params, rangeOptions)
+                : this.chartService.getHistoricalDataRange(params, rangeOptions);
+        }, {
+            retries: options.retries,
+            baseDelay: options.retryDelay,
+            onRetry: (error, attempt, delay) => {
+                this.emit('retry', { key: this.instrumentKey(item), attempt, delay, error: error.message });
+            }
+        });
+    }
+
+    // Completed keys, plus the NDJSON length they cover (absent in old checkpoints)
+    async loadCheckpoint(checkpointPath) {
+        if (!checkpointPath) return { completed: new Set(), outputBytes: undefined };
+        try {
+            const stored = JSON.parse(await fs.promises.readFile(checkpointPath, 'utf8'));
+            return { completed: new Set(stored.completed), outputBytes: stored.outputBytes };
+        } catch (error) {
+            if (error.code === 'ENOENT') return { completed: new Set(), outputBytes: undefined };
+            throw error;
+        }
+    }
+
+    // Write data to file durably: temp file, fsync, rename
+    async writeFileDurably(file, data) {
+        const tmp = `${file}.tmp`;
+        const handle = await fs.promises.open(tmp, 'w');
+        try {
+            await handle.writeFile(data);
+            await handle.sync();
+        } finally {
+            await handle.close();
+        }
+        await fs.promises.rename(tmp, file);
+    }
+
+    // Write the checkpoint atomically; writes are serialized and coalesced.
+    // The NDJSON lines it covers are fsynced first, so a checkpoint never
+    // claims a security whose line could still be lost.
+    saveCheckpoint(state) {
+        if (!state.checkpointPath) return Promise.resolve();
+        if (state.checkpointWrite) {
+            state.checkpointDirty = true;
+            return state.checkpointWrite;
+        }
+
+        const write = async () => {
+            do {
+                state.checkpointDirty = false;
+                const checkpoint = { completed: [...state.completed], outputBytes: state.outputBytes };
+                if (state.output) await state.output.datasync();
+                await this.writeFileDurably(state.checkpointPath, JSON.stringify(checkpoint));
+            } while (state.checkpointDirty);
+        };
+
+        state.checkpointWrite = write().finally(() => {
+            state.checkpointWrite = null;
+        });
+        return state.checkpointWrite;
+    }
+
+    // Open the NDJSON file. On resume it is cut back to the length the
+    // checkpoint covers (or, for older checkpoints, to its last complete
+    // line), dropping a torn last line and lines of securities that were
+    // never checkpointed; those are downloaded again.
+    async openOutput(outputPath, checkpoint) {
+        if (checkpoint.completed.size === 0) {
+            return { handle: await fs.promises.open(outputPath, 'w'), bytes: 0 };
+        }
+
+        const handle = await fs.promises.open(outputPath, 'a+');
+        const { size } = await handle.stat();
+        const end = checkpoint.outputBytes !== undefined
+            ? Math.min(checkpoint.outputBytes, size)
+            : await this.lastLineEnd(handle, size);
+        if (end < size) await handle.truncate(end);
+        return { handle, bytes: end };
+    }
+
+    // Offset just past the last newline in the first `size` bytes
+    async lastLineEnd(handle, size) {
+        const buffer = Buffer.alloc(64 * 1024);
+        let end = size;
+        while (end > 0) {
+            const start = Math.max(0, end - buffer.length);
+            const { bytesRead } = await handle.read(buffer, 0, end - start, start);
+            const index = buffer.subarray(0, bytesRead).lastIndexOf(0x0a);
+            if (index !== -1) return start + index + 1;
+            end = start;
+        }
+        return 0;
+    }
+
+    // Append one NDJSON line and mark key completed. Appends are serialized,
+    // so the file is exactly state.outputBytes long whenever a checkpoint
+    // takes its snapshot, and every key in it has its line before that offset.
+    appendRecord(state, key, record) {
+        const line = Buffer.from(`${JSON.stringify(record)}\n`);
+        const append = state.outputQueue.then(async () => {
+            await state.output.appendFile(line);
+            state.outputBytes += line.length;
+            state.completed.add(key);
+        });
+        state.outputQueue = append.catch(() => {});
+        return append;
+    }
+
+    async writeBinary(outputDir, key, data) {
+        const columns = OHLCVColumns.fromDhan(data);
+        const header = Buffer.alloc(8);
+        header.write(BINARY_MAGIC, 0, 'ascii');
+        header.writeUInt32LE(columns.length, 4);
+        await this.writeFileDurably(path.join(outputDir, `${key}.ohlcv`),
+            Buffer.concat([header, Buffer.from(columns.buffer)]));
+        return columns.length;
+    }
+
+    async download(instruments, options = {}) {
+        const settings = {
+            format: 'ndjson',          // 'ndjson' (one line per security) or 'binary' (one file per security)
+            outputPath: null,          // NDJSON file
+            outputDir: null,           // Directory for binary files
+            checkpointPath: null,      // Completed securities are recorded here for resume
+            concurrency: getDataConcurrency(),
+            retries: 5,
+            retryDelay: 1000,
+            cache: false,              // Keep memory flat: don't retain candles after writing them
+            ...options
+        };
+
+        const checkpoint = await this.loadCheckpoint(settings.checkpointPath);
+        const state = {
+            checkpointPath: settings.checkpointPath,
+            completed: checkpoint.completed,
+            checkpointWrite: null,
+            checkpointDirty: false,
+            output: null,                 // NDJSON file handle
+            outputBytes: undefined,
+            outputQueue: Promise.resolve()
+        };
+
+        if (settings.format === 'ndjson') {
+            if (!settings.outputPath) throw new Error('outputPath is required for ndjson output');
+            const { handle, bytes } = await this.openOutput(settings.outputPath, checkpoint);
+            state.output = handle;
+            state.outputBytes = bytes;
+        } else if (settings.format === 'binary') {
+            if (!settings.outputDir) throw new Error('outputDir is required for binary output');
+            await fs.promises.mkdir(settings.outputDir, { recursive: true });
+        } else {
+            throw new Error(`Unknown output format: ${settings.format}`);
+        }
+
+        const pending = instruments.filter(item => !state.completed.has(this.instrumentKey(item)));
+        const progress = {
+            total: instruments.length,
+            skipped: instruments.length - pending.length,
+            completed: 0,
+            failed: 0,
+            candles: 0
+        };
+        const failures = [];
+        const startedAt = Date.now();
+
+        const report = () => {
+            const elapsed = (Date.now() - startedAt) / 1000;
+            return {
+                ...progress,
+                elapsedMs: Date.now() - startedAt,
+                securitiesPerSecond: elapsed > 0 ? progress.completed / elapsed : 0,
+                candlesPerSecond: elapsed > 0 ? progress.candles / elapsed : 0
+            };
+        };
+
+        try {
+            await mapWithConcurrency(pending, settings.concurrency, async (item) => {
+                const key = this.instrumentKey(item);
+                try {
+                    const data = await this.fetchInstrument(item, settings);
+
+                    let count;
+                    if (state.output) {
+                        count = Array.isArray(data) ? data.length : (data.timestamp || []).length;
+                        await this.appendRecord(state, key, { key, ...item, candles: data });
+                    } else {
+                        count = await this.writeBinary(settings.outputDir, key, data);
+                        state.completed.add(key);
+                    }
+
+                    progress.completed++;
+                    progress.candles += count;
+                    await this.saveCheckpoint(state);
+                } catch (error) {
+                    progress.failed++;
+                    failures.push({ key, error: error.message });
+                    this.emit('failed', { key, error: error.message });
+                }
+                this.emit('progress', report());
+            });
+        } finally {
+            await this.saveCheckpoint(state);
+            if (state.output) await state.output.close();
+        }
+
+        return { ...report(), failures };
+    }
+}
+
+module.exports = new ChartBatchDownloader();
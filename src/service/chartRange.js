@@ -0,0 +1,82 @@
+// src/service/chartRange.js
+
+const { rateLimitConfig } = require('../middleware/rateLimit/Config');
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+function toDateString(ms) {
+    return new Date(ms).toISOString().slice(0, 10);
+}
+
+function timestampToMs(timestamp) {
+    if (typeof timestamp === 'number') {
+        return timestamp < 1e12 ? timestamp * 1000 : timestamp;
+    }
+    return new Date(timestamp).getTime();
+}
+
+// Split [fromDate, toDate] into consecutive chunks no longer than maxDays.
+// Neighbouring chunks share their boundary date; stitchCandles drops the overlap.
+function splitDateRange(fromDate, toDate, maxDays) {
+    const end = Date.parse(`${toDate}T00:00:00Z`);
+    const chunks = [];
+    let start = Date.parse(`${fromDate}T00:00:00Z`);
+
+    do {
+        const chunkEnd = Math.min(start + maxDays * DAY_MS, end);
+        chunks.push([toDateString(start), toDateString(chunkEnd)]);
+        start = chunkEnd;
+    } while (start < end);
+
+    return chunks;
+}
+
+// How many chart requests may run at once within the per-second data budget
+function getDataConcurrency() {
+    const second = rateLimitConfig.data.second;
+    return Math.max(1, Math.floor(second.limit / second.cost));
+}
+
+// Concatenate chunk responses in order, skipping candles at or before the last
+// timestamp already taken (the boundary candles repeated between chunks)
+function stitchCandles(results) {
+    const rows = results.find(Array.isArray) !== undefined;
+    let last = -Infinity;
+
+    if (rows) {
+        const stitched = [];
+        for (const result of results) {
+            for (const item of result || []) {
+                const ms = timestampToMs(item.timestamp);
+                if (ms <= last) continue;
+                stitched.push(item);
+                last = ms;
+            }
+        }
+        return stitched;
+    }
+
+    const stitched = { timestamp: [] };
+    for (const result of results) {
+        if (!result || !result.timestamp) continue;
+        const fields = Object.keys(result).filter(field => Array.isArray(result[field]));
+        for (const field of fields) {
+            if (!stitched[field]) stitched[field] = [];
+        }
+        for (let i = 0; i < result.timestamp.length; i++) {
+            const ms = timestampToMs(result.timestamp[i]);
+            if (ms <= last) continue;
+            for (const field of fields) {
+                stitched[field].push(result[field][i]);
+            }
+            last = ms;
+        }
+    }
+    return stitched;
+}
+
+module.exports = {
+    splitDateRange,
+    getDataConcurrency,
+    stitchCandles
+};
@@ -1,4 +1,4 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
 require('dotenv').config();
 
 // Validation constants
@@ -8,17 +8,13 @@ const EDIS_CONSTANTS = {
 };
 
 class EDISService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
     }
 
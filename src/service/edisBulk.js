@@ -1,4 +1,6 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const { mapWithConcurrency } = require('../utils/concurrency');
+const { retryWithBackoff } = require('../utils/retry');
 require('dotenv').config();
 
 // Validation constants
@@ -7,24 +9,29 @@ const BULK_EDIS_CONSTANTS = {
     SEGMENTS: ['EQ', 'COMM', 'FNO']
 };
 
+const ISIN_PATTERN = /^[A-Z]{2}[0-9A-Z]{10}$/;
+
+// Pipeline settings for account-wide transfers
+const BULK_EDIS_PIPELINE = {
+    CHUNK_SIZE: parseInt(process.env.EDIS_BULK_CHUNK_SIZE) || 50,    // ISINs per /edis/bulkform call
+    CONCURRENCY: parseInt(process.env.EDIS_BULK_CONCURRENCY) || 4,   // Chunks submitted at once
+    RETRIES: 3
+};
+
 class BulkEDISService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
     }
 
     validateISIN(isin) {
         // ISIN format validation
-        return typeof isin === 'string' && /^[A-Z]{2}[0-9A-Z]{10}$/.test(isin);
+        return typeof isin === 'string' && ISIN_PATTERN.test(isin);
     }
 
     validateBulkEDISParams(params) {
@@ -90,6 +97,110 @@ class BulkEDISService {
         }
     }
 
+    // One pass over the ISIN list: drop duplicates and split off invalid entries
+    partitionISINs(isins) {
+        const seen = new Set();
+        const valid = [];
+        const invalid = [];
+        let duplicates = 0;
+
+        for (const isin of isins) {
+            if (seen.has(isin)) {
+                duplicates++;
+            } else {
+                seen.add(isin);
+                if (typeof isin === 'string' && ISIN_PATTERN.test(isin)) {
+                    valid.push(isin);
+                } else {
+                    invalid.push(isin);
+                }
+            }
+        }
+        return { valid, invalid, duplicates };
+    }
+
+    // Run an account-wide EDIS transfer. items are ISIN strings (using
+    // options.exchange / options.segment) or { isin, exchange, segment }.
+    // ISINs are de-duplicated and validated, grouped by exchange/segment,
+    // split into CHUNK_SIZE chunks and submitted concurrently with retry.
+    // Failed chunks are reported rather than failing the whole run.
+    async runBulkEDISPipeline(items, options = {}) {
+        const settings = {
+            exchange: 'NSE',
+            segment: 'EQ',
+            chunkSize: BULK_EDIS_PIPELINE.CHUNK_SIZE,
+            concurrency: BULK_EDIS_PIPELINE.CONCURRENCY,
+            retries: BULK_EDIS_PIPELINE.RETRIES,
+            retryDelay: 500,
+            ...options
+        };
+        const startedAt = Date.now();
+
+        // exchange:segment -> ISINs
+        const groups = new Map();
+        const report = {
+            total: items.length,
+            submitted: 0,
+            duplicates: 0,
+            invalid: [],
+            chunks: 0,
+            succeeded: 0,
+            failed: 0,
+            results: []
+        };
+
+        for (const item of items) {
+            const isin = typeof item === 'string' ? item : item.isin;
+            const exchange = (typeof item === 'object' && item.exchange) || settings.exchange;
+            const segment = (typeof item === 'object' && item.segment) || settings.segment;
+
+            if (!this.isValidExchangeSegmentCombination(exchange, segment)) {
+                report.invalid.push({ isin, exchange, segment, error: 'Invalid exchange and segment combination' });
+                continue;
+            }
+            const key = `${exchange}:${segment}`;
+            if (!groups.has(key)) groups.set(key, []);
+            groups.get(key).push(isin);
+        }
+
+        const chunks = [];
+        for (const [key, isins] of groups) {
+            const [exchange, segment] = key.split(':');
+            const { valid, invalid, duplicates } = this.partitionISINs(isins);
+            report.duplicates += duplicates;
+            invalid.forEach(isin => report.invalid.push({ isin, exchange, segment, error: 'Invalid ISIN format' }));
+
+            for (let i = 0; i < valid.length; i += settings.chunkSize) {
+                chunks.push({ exchange, segment, isin: valid.slice(i, i + settings.chunkSize) });
+            }
+        }
+        report.chunks = chunks.length;
+
+        report.results = await mapWithConcurrency(chunks, settings.concurrency, async (chunk) => {
+            let attempts = 0;
+            try {
+                const data = await retryWithBackoff(async () => {
+                    attempts++;
+                    const response = await this.api.post('/edis/bulkform', chunk);
+                    return response.data;
+                }, { retries: settings.retries, baseDelay: settings.retryDelay });
+
+                report.succeeded++;
+                report.submitted += chunk.isin.length;
+                return { ...chunk, status: 'success', attempts, data };
+            } catch (error) {
+                report.failed++;
+                const message = error.response
+                    ? (error.response.data && error.response.data.message) || error.response.statusText
+                    : error.message;
+                return { ...chunk, status: 'failed', attempts, error: message };
+            }
+        });
+
+        report.durationMs = Date.now() - startedAt;
+        return report;
+    }
+
     // Helper methods for common bulk EDIS form generation scenarios
     async generateBulkEquityEDISForm(isins, exchange = 'NSE') {
         return this.generateBulkEDISForm({
@@ -1,104 +1,48 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const orderScheduler = require('./orderScheduler');
+const quoteBatcher = require('./quoteBatcher');
+const TriggerBook = require('./triggerBook');
+const { validateForeverOrder } = require('../validation/orderSchemas');
 require('dotenv').config();
 
-// Validation constants
-const FOREVER_ORDER_TYPES = {
-    ORDER_FLAGS: ['SINGLE', 'OCO'],
-    TRANSACTION_TYPES: ['BUY', 'SELL'],
-    EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO'],
-    PRODUCT_TYPES: ['CNC', 'MTF', 'MARGIN'],
-    ORDER_TYPES: ['LIMIT', 'MARKET']
+const FOREVER_DEFAULTS = {
+    syncIntervalMs: parseInt(process.env.FOREVER_SYNC_INTERVAL_MS) || 60000   // Between trigger book reloads from Dhan
 };
 
 class ForeverOrderService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
-        this.dhanClientId = process.env.DHAN_CLIENT_ID;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
+        this.dhanClientId = account.dhanClientId || process.env.DHAN_CLIENT_ID;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
-    }
-
-    validateForeverOrderParams(params) {
-        const errors = [];
-
-        // Required field validations
-        if (!params.orderFlag || !FOREVER_ORDER_TYPES.ORDER_FLAGS.includes(params.orderFlag)) {
-            errors.push('Invalid or missing orderFlag. Must be SINGLE or OCO');
-        }
-
-        if (!params.transactionType || !FOREVER_ORDER_TYPES.TRANSACTION_TYPES.includes(params.transactionType)) {
-            errors.push('Invalid or missing transactionType. Must be BUY or SELL');
-        }
-
-        if (!params.exchangeSegment || !FOREVER_ORDER_TYPES.EXCHANGE_SEGMENTS.includes(params.exchangeSegment)) {
-            errors.push('Invalid or missing exchangeSegment');
-        }
-
-        if (!params.productType || !FOREVER_ORDER_TYPES.PRODUCT_TYPES.includes(params.productType)) {
-            errors.push('Invalid or missing productType');
-        }
-
-        if (!params.orderType || !FOREVER_ORDER_TYPES.ORDER_TYPES.includes(params.orderType)) {
-            errors.push('Invalid or missing orderType');
-        }
-
-        if (!params.validity) {
-            errors.push('Missing validity');
-        }
 
-        if (!params.securityId) {
-            errors.push('Missing securityId');
-        }
-
-        // Numeric validations
-        if (!Number.isInteger(params.quantity) || params.quantity <= 0) {
-            errors.push('Quantity must be a positive integer');
-        }
-
-        if (params.disclosedQuantity && !Number.isInteger(params.disclosedQuantity)) {
-            errors.push('Disclosed quantity must be an integer');
-        }
-
-        if (params.price && typeof params.price !== 'number') {
-            errors.push('Price must be a number');
-        }
-
-        if (params.triggerPrice && typeof params.triggerPrice !== 'number') {
-            errors.push('Trigger price must be a number');
-        }
-
-        // OCO specific validations
-        if (params.orderFlag === 'OCO') {
-            if (typeof params.price1 !== 'number') {
-                errors.push('price1 must be a number for OCO orders');
-            }
-            if (typeof params.triggerPrice1 !== 'number') {
-                errors.push('triggerPrice1 must be a number for OCO orders');
-            }
-            if (!Number.isInteger(params.quantity1) || params.quantity1 <= 0) {
-                errors.push('quantity1 must be a positive integer for OCO orders');
+        // Orders of one account share one budget
+        this.scheduler = account.scheduler || orderScheduler;
+
+        // Resting GTT/OCO triggers of this account, priced from the quote path
+        this.triggerBook = account.triggerBook || new TriggerBook();
+        this.triggerBook.setQuoteFeed(quoteBatcher);
+        // A crossed leg has fired (an OCO's other leg is cancelled with it);
+        // drop the order now rather than at the next reload
+        this.triggerBook.on('triggers', (results) => {
+            for (const { crossed } of results) {
+                for (const leg of crossed) this.triggerBook.removeOrder(leg.orderId);
             }
-        }
+        });
 
-        // Validate disclosed quantity (30% rule)
-        if (params.disclosedQuantity) {
-            if (params.disclosedQuantity < (params.quantity * 0.3)) {
-                errors.push('Disclosed quantity must be at least 30% of the total quantity');
-            }
-        }
+        this.settings = { ...FOREVER_DEFAULTS, ...account.settings };
+        this._syncTimer = null;
+    }
 
-        return errors;
+    validateForeverOrderParams(params) {
+        return validateForeverOrder(params);
     }
 
-    async placeForeverOrder(orderParams) {
+    async placeForeverOrder(orderParams, options = {}) {
         try {
             // Generate correlation ID if not provided
             const correlationId = orderParams.correlationId || `GTT_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
@@ -116,7 +60,10 @@ class ForeverOrderService {
             }
 
             // Make API call to place forever order
-            const response = await this.api.post('/forever/orders', params);
+            const response = await this.scheduler.schedule(() => this.api.post('/forever/orders', params), options);
+            if (response.data && response.data.orderId) {
+                this.triggerBook.addOrder({ ...params, ...response.data });
+            }
             return response.data;
 
         } catch (error) {
@@ -127,6 +74,59 @@ class ForeverOrderService {
         }
     }
 
+    // List forever orders and rebuild the trigger book from them
+    async getAllForeverOrders() {
+        try {
+            const response = await this.api.get('/forever/orders');
+            const orders = Array.isArray(response.data) ? response.data : [];
+            this.triggerBook.load(orders);
+            return response.data;
+        } catch (error) {
+            if (error.response) {
+                throw new Error(`Forever order list failed: ${error.response.data.message || error.response.statusText}`);
+            }
+            throw error;
+        }
+    }
+
+    // Cancel a forever order and take its legs out of the trigger book
+    async cancelForeverOrder(orderId, options = {}) {
+        try {
+            const response = await this.scheduler.schedule(() => this.api.delete(`/forever/orders/${orderId}`), options);
+            this.triggerBook.removeOrder(orderId);
+            return response.data;
+        } catch (error) {
+            if (error.response) {
+                throw new Error(`Forever order cancellation failed: ${error.response.data.message || error.response.statusText}`);
+            }
+            throw error;
+        }
+    }
+
+    // Reload the trigger book now and every syncIntervalMs, so orders placed,
+    // cancelled or triggered elsewhere (web, mobile, another process) show up
+    startSync() {
+        if (this._syncTimer) return;
+        const sync = () => this.getAllForeverOrders().catch((error) => {
+            console.error('Forever order sync error:', error.message);
+        });
+        this._syncTimer = setInterval(sync, this.settings.syncIntervalMs);
+        this._syncTimer.unref();
+        sync();
+    }
+
+    stopSync() {
+        if (this._syncTimer) {
+            clearInterval(this._syncTimer);
+            this._syncTimer = null;
+        }
+    }
+
+    // Resting legs that trigger within `percent` of price
+    getTriggersNear(securityId, price, percent) {
+        return this.triggerBook.near(securityId, price, percent);
+    }
+
     // Helper methods for common forever order types
     async placeSingleGTTOrder(params) {
         return this.placeForeverOrder({
@@ -1,24 +1,29 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const killswitchWatcher = require('./killswitchWatcher');
 require('dotenv').config();
 
 class KillswitchService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
 
         // Status tracking
         this._killswitchStatus = null;
         this._lastStatusCheck = null;
         this._statusCheckInterval = 60000; // 1 minute in milliseconds
+
+        // The watcher polls through us and keeps our cached status current
+        this.watcher = account.watcher || killswitchWatcher;
+        this.watcher.setFetcher(() => this.fetchKillswitchStatus());
+        this.watcher.on('status', ({ status, checkedAt }) => {
+            this._killswitchStatus = status;
+            this._lastStatusCheck = checkedAt;
+        });
     }
 
     validateAccessToken() {
@@ -34,6 +39,9 @@ class KillswitchService {
             const response = await this.api.post('/killswitch');
             this._killswitchStatus = 'ACTIVE';
             this._lastStatusCheck = Date.now();
+
+            // Tell subscribers (and other instances) now, then poll quickly for confirmation
+            this.watcher.notify('ACTIVE');
             
             return {
                 status: 'success',
@@ -82,27 +90,37 @@ class KillswitchService {
         }
     }
 
+    // Current status straight from Dhan, used by the shared watcher
+    async fetchKillswitchStatus() {
+        this.validateAccessToken();
+        const response = await this.api.get('/killswitch');
+        return response.data.killSwitchStatus;
+    }
+
+    // Subscribe to the shared watcher. All monitors in the process share one
+    // adaptive poll, so `interval` is no longer per caller and is ignored.
     async monitorKillswitch(callback, interval = 60000) {
-        let monitoring = true;
-        
-        const monitor = async () => {
-            try {
-                while (monitoring) {
-                    const status = await this.getKillswitchStatus();
-                    callback(null, status);
-                    await new Promise(resolve => setTimeout(resolve, interval));
-                }
-            } catch (error) {
-                callback(error);
-                monitoring = false;
-            }
+        let unsubscribe = null;
+
+        const onStatus = ({ status, checkedAt, source }) => {
+            callback(null, {
+                status,
+                lastChecked: new Date(checkedAt).toISOString(),
+                cached: source !== 'poll'
+            });
+        };
+
+        const onError = (error) => {
+            const errorMessage = error.response?.data?.message || error.message;
+            callback(new Error(`Failed to get killswitch status: ${errorMessage}`));
+            if (unsubscribe) unsubscribe();
         };
 
-        monitor();
+        unsubscribe = this.watcher.subscribe(onStatus, onError);
 
         return {
             stop: () => {
-                monitoring = false;
+                unsubscribe();
             }
         };
     }
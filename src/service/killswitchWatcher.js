@@ -0,0 +1,209 @@
+// src/service/killswitchWatcher.js
+
+const crypto = require('crypto');
+const util = require('util');
+const { EventEmitter } = require('events');
+require('dotenv').config();
+
+const WATCHER_DEFAULTS = {
+    minInterval: parseInt(process.env.KILLSWITCH_POLL_MIN_MS) || 1000,   // Poll interval right after a change or activation
+    maxInterval: parseInt(process.env.KILLSWITCH_POLL_MAX_MS) || 60000,  // Poll interval once nothing has changed for a while
+    backoff: 2,                                                          // Interval multiplier after each unchanged poll
+    redis: process.env.KILLSWITCH_REDIS === 'true',                      // Share status between instances
+    channel: 'killswitch:status',
+    leaderKey: 'killswitch:poller'
+};
+
+// Deletes the poller lease only while this instance still holds it, so a
+// stopping instance can't remove a lease another one has taken over since.
+// KEYS: leaderKey  ARGV: instanceId
+const RELEASE_LEASE = `
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+`;
+
+// One kill-switch poller per process, fanned out to subscribers as events:
+//   'status' { status, checkedAt, source }   every poll result or shared update
+//   'change' { status, previous, checkedAt } when the status differs from the last one
+//   'error'  Error                           when a poll fails
+// With Redis enabled only the instance holding the poller lease calls Dhan,
+// and every result is published so other instances learn of it at once.
+class KillswitchWatcher extends EventEmitter {
+    constructor(options = {}) {
+        super();
+        this.settings = { ...WATCHER_DEFAULTS, ...options };
+        this.instanceId = crypto.randomBytes(8).toString('hex');
+
+        this.fetchStatus = null;
+        this.status = null;
+        this.checkedAt = null;
+        this.interval = this.settings.minInterval;
+
+        this._subscribers = 0;
+        this._timer = null;
+        this._polling = false;
+
+        this.redisClient = null;
+        this.subscriberClient = null;
+    }
+
+    // Register the function that reads the status from Dhan
+    setFetcher(fetchStatus) {
+        this.fetchStatus = fetchStatus;
+    }
+
+    // Add a listener for 'status' events and start watching.
+    // Returns a function that removes the listener again.
+    subscribe(listener, onError) {
+        this.on('status', listener);
+        if (onError) this.on('error', onError);
+        this._subscribers++;
+
+        if (this._subscribers === 1) {
+            this.start();
+        } else if (this.status !== null) {
+            listener({ status: this.status, checkedAt: this.checkedAt, source: 'cache' });
+        }
+
+        let subscribed = true;
+        return () => {
+            if (!subscribed) return;
+            subscribed = false;
+            this.removeListener('status', listener);
+            if (onError) this.removeListener('error', onError);
+            this._subscribers--;
+            if (this._subscribers === 0) this.stop();
+        };
+    }
+
+    start() {
+        if (this.settings.redis) this.connectRedis();
+        this.schedule(0);
+    }
+
+    stop() {
+        clearTimeout(this._timer);
+        this._timer = null;
+        if (this.subscriberClient) {
+            // Hand the lease back so another instance can poll on its next turn
+            // instead of after the TTL; commands run in order before QUIT
+            this.redisClient.eval(RELEASE_LEASE, 1, this.settings.leaderKey, this.instanceId, (error) => {
+                if (error) this.reportError(error);
+            });
+            this.subscriberClient.quit();
+            this.redisClient.quit();
+            this.subscriberClient = null;
+            this.redisClient = null;
+        }
+    }
+
+    schedule(delay) {
+        clearTimeout(this._timer);
+        this._timer = setTimeout(() => this.poll(), delay);
+    }
+
+    // Poll quickly again, e.g. right after the kill switch was activated
+    boost() {
+        this.interval = this.settings.minInterval;
+        if (this._subscribers > 0) this.schedule(this.settings.minInterval);
+    }
+
+    connectRedis() {
+        const redisConfig = require('../config/redisConfig');
+        this.redisClient = redisConfig.createClient();
+        this.subscriberClient = redisConfig.createClient();
+        this.redis = {
+            set: util.promisify(this.redisClient.set).bind(this.redisClient),
+            get: util.promisify(this.redisClient.get).bind(this.redisClient),
+            pexpire: util.promisify(this.redisClient.pexpire).bind(this.redisClient),
+            publish: util.promisify(this.redisClient.publish).bind(this.redisClient)
+        };
+
+        this.subscriberClient.on('message', (channel, message) => {
+            if (channel !== this.settings.channel) return;
+            try {
+                const update = JSON.parse(message);
+                if (update.instanceId === this.instanceId) return;
+                this.update(update.status, update.checkedAt, 'shared');
+                // A fresh shared result counts as our poll
+                if (this._subscribers > 0) this.schedule(this.interval);
+            } catch (error) {
+                this.reportError(error);
+            }
+        });
+        this.subscriberClient.subscribe(this.settings.channel);
+    }
+
+    // Whether this instance should call Dhan: it holds (or just took) the poller lease
+    async isLeader() {
+        if (!this.redisClient) return true;
+        const ttl = this.settings.maxInterval * 2;
+        try {
+            if (await this.redis.set(this.settings.leaderKey, this.instanceId, 'PX', ttl, 'NX')) {
+                return true;
+            }
+            if (await this.redis.get(this.settings.leaderKey) === this.instanceId) {
+                await this.redis.pexpire(this.settings.leaderKey, ttl);
+                return true;
+            }
+            return false;
+        } catch (error) {
+            // Without Redis every instance polls for itself
+            return true;
+        }
+    }
+
+    async poll() {
+        if (this._polling || !this.fetchStatus) return;
+        this._polling = true;
+        try {
+            if (await this.isLeader()) {
+                const status = await this.fetchStatus();
+                this.update(status, Date.now(), 'poll');
+                this.publish();
+            }
+        } catch (error) {
+            this.reportError(error);
+        } finally {
+            this._polling = false;
+            if (this._subscribers > 0) this.schedule(this.interval);
+        }
+    }
+
+    // Record a status from any source and adapt the poll interval
+    update(status, checkedAt = Date.now(), source = 'poll') {
+        const previous = this.status;
+        this.status = status;
+        this.checkedAt = checkedAt;
+
+        if (previous !== null && previous !== status) {
+            this.interval = this.settings.minInterval;
+            this.emit('change', { status, previous, checkedAt });
+        } else {
+            this.interval = Math.min(this.interval * this.settings.backoff, this.settings.maxInterval);
+        }
+        this.emit('status', { status, checkedAt, source });
+    }
+
+    publish() {
+        if (!this.redisClient) return;
+        const message = JSON.stringify({ status: this.status, checkedAt: this.checkedAt, instanceId: this.instanceId });
+        this.redis.publish(this.settings.channel, message).catch(error => this.reportError(error));
+    }
+
+    // 'error' without listeners would throw, so only emit when someone listens
+    reportError(error) {
+        if (this.listenerCount('error') > 0) this.emit('error', error);
+    }
+
+    // Apply a status we caused ourselves (e.g. activation) and share it right away
+    notify(status) {
+        this.update(status, Date.now(), 'local');
+        this.publish();
+        this.boost();
+    }
+}
+
+module.exports = new KillswitchWatcher();
@@ -1,86 +1,82 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const { validateMargin } = require('../validation/orderSchemas');
+const { mapWithConcurrency } = require('../utils/concurrency');
 require('dotenv').config();
 
-// Constants for validation
-const MARGIN_CONSTANTS = {
-    EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO', 'MCX_COMM'],
-    TRANSACTION_TYPES: ['BUY', 'SELL'],
-    PRODUCT_TYPES: ['CNC', 'INTRADAY', 'MARGIN', 'MTF', 'CO', 'BO']
+// Margin cache settings
+const MARGIN_CACHE = {
+    TTL: parseInt(process.env.MARGIN_CACHE_TTL) || 1000,   // Results are reused for this many ms
+    SWEEP_SIZE: 1000,                                      // Drop expired entries once the cache grows past this
+    BATCH_CONCURRENCY: 5                                   // Unique legs calculated at once by calculateMargins
 };
 
 class MarginCalculatorService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
+
+        // key -> { value, expiresAt } and key -> in-flight promise
+        this._marginCache = new Map();
+        this._inFlight = new Map();
+        this._marginStats = {
+            hits: 0,
+            misses: 0,
+            coalesced: 0,     // Served by an identical request already in flight
+            deduplicated: 0,  // Repeated legs within one calculateMargins batch
+            upstreamCalls: 0
+        };
     }
 
     validateMarginParams(params) {
-        const errors = [];
-
-        // Validate required fields
-        if (!params.dhanClientId) {
-            errors.push('dhanClientId is required');
-        }
-
-        // Exchange segment validation
-        if (!params.exchangeSegment || !MARGIN_CONSTANTS.EXCHANGE_SEGMENTS.includes(params.exchangeSegment)) {
-            errors.push(`Invalid exchangeSegment. Must be one of: ${MARGIN_CONSTANTS.EXCHANGE_SEGMENTS.join(', ')}`);
-        }
-
-        // Transaction type validation
-        if (!params.transactionType || !MARGIN_CONSTANTS.TRANSACTION_TYPES.includes(params.transactionType)) {
-            errors.push(`Invalid transactionType. Must be either BUY or SELL`);
-        }
-
-        // Quantity validation
-        if (typeof params.quantity !== 'number' || params.quantity <= 0) {
-            errors.push('Quantity must be a positive number');
-        }
-
-        // Product type validation
-        if (params.productType && !MARGIN_CONSTANTS.PRODUCT_TYPES.includes(params.productType)) {
-            errors.push(`Invalid productType. Must be one of: ${MARGIN_CONSTANTS.PRODUCT_TYPES.join(', ')}`);
-        }
-
-        // Security ID validation
-        if (!params.securityId) {
-            errors.push('securityId is required');
-        }
-
-        // Price validation
-        if (typeof params.price !== 'number' || params.price <= 0) {
-            errors.push('Price must be a positive number');
-        }
-
-        // Trigger price validation (optional)
-        if (params.triggerPrice !== undefined && (typeof params.triggerPrice !== 'number' || params.triggerPrice < 0)) {
-            errors.push('Trigger price must be a non-negative number');
-        }
+        return validateMargin(params);
+    }
 
-        // Product type compatibility checks
-        if (params.productType) {
-            if (['CO', 'BO'].includes(params.productType) && params.triggerPrice === undefined) {
-                errors.push('Trigger price is required for CO and BO orders');
-            }
+    // Normalized tuple of everything that affects the margin requirement
+    marginCacheKey(params) {
+        return [
+            params.dhanClientId,
+            params.exchangeSegment,
+            params.transactionType,
+            params.quantity,
+            params.productType || '',
+            params.securityId,
+            params.price,
+            params.triggerPrice !== undefined ? params.triggerPrice : ''
+        ].join('|');
+    }
 
-            if (params.productType === 'CNC' && !params.exchangeSegment.includes('EQ')) {
-                errors.push('CNC product type is only valid for equity segments');
-            }
+    sweepMarginCache(now) {
+        if (this._marginCache.size < MARGIN_CACHE.SWEEP_SIZE) return;
+        for (const [key, entry] of this._marginCache) {
+            if (entry.expiresAt <= now) this._marginCache.delete(key);
         }
+    }
 
-        return errors;
+    async fetchMargin(key, params) {
+        this._marginStats.misses++;
+        this._marginStats.upstreamCalls++;
+
+        const request = this.api.post('/margincalculator', params)
+            .then((response) => {
+                const now = Date.now();
+                this.sweepMarginCache(now);
+                this._marginCache.set(key, { value: response.data, expiresAt: now + MARGIN_CACHE.TTL });
+                return response.data;
+            })
+            .finally(() => {
+                this._inFlight.delete(key);
+            });
+
+        this._inFlight.set(key, request);
+        return request;
     }
 
-    async calculateMargin(params) {
+    async calculateMargin(params, options = {}) {
         try {
             // Validate margin parameters
             const validationErrors = this.validateMarginParams(params);
@@ -88,9 +84,27 @@ class MarginCalculatorService {
                 throw new Error(`Validation failed: ${validationErrors.join(', ')}`);
             }
 
-            // Make API call to calculate margin
-            const response = await this.api.post('/margincalculator', params);
-            return response.data;
+            if (options.cache === false) {
+                this._marginStats.upstreamCalls++;
+                const response = await this.api.post('/margincalculator', params);
+                return response.data;
+            }
+
+            // Reuse a fresh result or an identical request already in flight
+            const key = this.marginCacheKey(params);
+            const cached = this._marginCache.get(key);
+            if (cached && cached.expiresAt > Date.now()) {
+                this._marginStats.hits++;
+                return cached.value;
+            }
+
+            const inFlight = this._inFlight.get(key);
+            if (inFlight) {
+                this._marginStats.coalesced++;
+                return await inFlight;
+            }
+
+            return await this.fetchMargin(key, params);
 
         } catch (error) {
             if (error.response) {
@@ -100,6 +114,50 @@ class MarginCalculatorService {
         }
     }
 
+    // Calculate margins for many legs at once. Identical legs are calculated
+    // once and unique legs run concurrently under a bounded pool. Results are
+    // aligned with legs as { status: 'fulfilled', value } or { status: 'rejected', reason }.
+    async calculateMargins(legs, options = {}) {
+        const unique = new Map();
+        const keys = legs.map((leg) => {
+            const key = this.marginCacheKey(leg);
+            if (unique.has(key)) {
+                this._marginStats.deduplicated++;
+            } else {
+                unique.set(key, leg);
+            }
+            return key;
+        });
+
+        const entries = [...unique.entries()];
+        const settled = await mapWithConcurrency(entries, options.concurrency || MARGIN_CACHE.BATCH_CONCURRENCY,
+            async ([, leg]) => {
+                try {
+                    return { status: 'fulfilled', value: await this.calculateMargin(leg, options) };
+                } catch (error) {
+                    return { status: 'rejected', reason: error };
+                }
+            });
+
+        const byKey = new Map(entries.map(([key], index) => [key, settled[index]]));
+        return keys.map(key => byKey.get(key));
+    }
+
+    getMarginCacheStats() {
+        const { hits, misses, coalesced, deduplicated } = this._marginStats;
+        const lookups = hits + misses + coalesced;
+        return {
+            ...this._marginStats,
+            savedCalls: hits + coalesced + deduplicated,
+            hitRate: lookups > 0 ? (hits + coalesced) / lookups : 0,
+            cachedEntries: this._marginCache.size
+        };
+    }
+
+    clearMarginCache() {
+        this._marginCache.clear();
+    }
+
     // Helper methods for common margin calculation scenarios
     async calculateEquityMargin(params) {
         return this.calculateMargin({
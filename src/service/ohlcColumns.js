@@ -0,0 +1,126 @@
+// src/service/ohlcColumns.js
+
+// Column order inside the shared buffer
+const FIELDS = ['timestamp', 'open', 'high', 'low', 'close', 'volume'];
+const BYTES = Float64Array.BYTES_PER_ELEMENT;
+
+function toMs(timestamp) {
+    if (typeof timestamp === 'number') {
+        return timestamp < 1e12 ? timestamp * 1000 : timestamp;
+    }
+    return new Date(timestamp).getTime();
+}
+
+// OHLCV candles stored as Float64Array columns over one ArrayBuffer.
+// Slices are views into the same buffer, and the buffer can be handed to a
+// worker_thread in a transfer list without being cloned.
+// Volume is Float64 rather than Int32 on purpose: daily volumes of index
+// constituents and F&O contracts can pass 2^31 - 1, which Int32 would wrap,
+// and every integer below 2^53 is exact in a double. One element type also
+// keeps the columns evenly laid out in the buffer and in the binary files.
+class OHLCVColumns {
+    constructor(buffer, capacity, start = 0, length = capacity) {
+        this.buffer = buffer;
+        this.capacity = capacity;
+        this.start = start;
+        this.length = length;
+
+        for (let i = 0; i < FIELDS.length; i++) {
+            this[FIELDS[i]] = new Float64Array(buffer, (i * capacity + start) * BYTES, length);
+        }
+    }
+
+    static allocate(length) {
+        return new OHLCVColumns(new ArrayBuffer(FIELDS.length * length * BYTES), length);
+    }
+
+    // Build columns straight from a Dhan chart response. Accepts the parallel
+    // array format ({ open: [], ..., timestamp: [] }) or an array of candles.
+    static fromDhan(data) {
+        if (Array.isArray(data)) {
+            const columns = OHLCVColumns.allocate(data.length);
+            for (let i = 0; i < data.length; i++) {
+                const item = data[i];
+                columns.timestamp[i] = toMs(item.timestamp);
+                columns.open[i] = +item.open;
+                columns.high[i] = +item.high;
+                columns.low[i] = +item.low;
+                columns.close[i] = +item.close;
+                columns.volume[i] = +item.volume;
+            }
+            return columns;
+        }
+
+        const timestamps = (data && data.timestamp) || [];
+        const columns = OHLCVColumns.allocate(timestamps.length);
+        for (let i = 0; i < timestamps.length; i++) {
+            columns.timestamp[i] = toMs(timestamps[i]);
+        }
+        for (const field of ['open', 'high', 'low', 'close', 'volume']) {
+            const source = data[field] || [];
+            const target = columns[field];
+            for (let i = 0; i < timestamps.length; i++) {
+                target[i] = +source[i];
+            }
+        }
+        return columns;
+    }
+
+    // Rebuild columns on the receiving side of a worker_threads postMessage
+    static fromTransferable({ buffer, capacity, start, length }) {
+        return new OHLCVColumns(buffer, capacity, start, length);
+    }
+
+    // First index with timestamp >= ms
+    lowerBound(ms) {
+        let lo = 0;
+        let hi = this.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >>> 1;
+            if (this.timestamp[mid] < ms) {
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+        return lo;
+    }
+
+    // Zero-copy view of candles with fromMs <= timestamp < toMs
+    sliceByTime(fromMs, toMs) {
+        const from = this.lowerBound(fromMs);
+        const to = Math.max(from, this.lowerBound(toMs));
+        return new OHLCVColumns(this.buffer, this.capacity, this.start + from, to - from);
+    }
+
+    // Payload and transfer list for worker.postMessage(payload, transferList)
+    toTransferable() {
+        return {
+            payload: {
+                buffer: this.buffer,
+                capacity: this.capacity,
+                start: this.start,
+                length: this.length
+            },
+            transferList: [this.buffer]
+        };
+    }
+
+    // Row objects in the same shape as transformToOHLCV
+    toRows() {
+        const rows = new Array(this.length);
+        for (let i = 0; i < this.length; i++) {
+            rows[i] = {
+                timestamp: this.timestamp[i],
+                open: this.open[i],
+                high: this.high[i],
+                low: this.low[i],
+                close: this.close[i],
+                volume: this.volume[i]
+            };
+        }
+        return rows;
+    }
+}
+
+module.exports = OHLCVColumns;
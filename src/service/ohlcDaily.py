@@ -1,4 +1,8 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const candleCache = require('./candleCache');
+const OHLCVColumns = require('./ohlcColumns');
+const { splitDateRange, getDataConcurrency, stitchCandles } = require('./chartRange');
+const { mapWithConcurrency } = require('../utils/concurrency');
 require('dotenv').config();
 
 // Constants for validation
@@ -8,23 +12,23 @@ const CHART_CONSTANTS = {
     INTERVALS: ['1', '5', '15', '25', '60'],
     // Maximum allowed date range for historical data (in days)
     MAX_HISTORICAL_DAYS: 365,
+    // Maximum date range Dhan serves per intraday request (in days)
+    MAX_INTRADAY_DAYS: 90,
     // Instruments that require expiry code
     EXPIRY_REQUIRED_INSTRUMENTS: ['FUTIDX', 'OPTIDX', 'FUTSTK', 'OPTSTK', 'FUTCOM', 'OPTFUT']
 };
 
 class ChartDataService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
+
+        this.candleCache = candleCache;
     }
 
     validateDate(dateString) {
@@ -57,7 +61,7 @@ class ChartDataService {
         return { valid: true };
     }
 
-    validateCommonParams(params) {
+    validateCommonParams(params, maxDays = CHART_CONSTANTS.MAX_HISTORICAL_DAYS) {
         const errors = [];
 
         // Security ID validation
@@ -85,7 +89,7 @@ class ChartDataService {
         }
 
         if (params.fromDate && params.toDate) {
-            const dateRangeValidation = this.validateDateRange(params.fromDate, params.toDate);
+            const dateRangeValidation = this.validateDateRange(params.fromDate, params.toDate, maxDays);
             if (!dateRangeValidation.valid) {
                 errors.push(dateRangeValidation.message);
             }
@@ -99,8 +103,8 @@ class ChartDataService {
         return errors;
     }
 
-    validateHistoricalParams(params) {
-        const errors = this.validateCommonParams(params);
+    validateHistoricalParams(params, maxDays) {
+        const errors = this.validateCommonParams(params, maxDays);
 
         // Expiry code validation for relevant instruments
         if (CHART_CONSTANTS.EXPIRY_REQUIRED_INSTRUMENTS.includes(params.instrument)) {
@@ -112,8 +116,8 @@ class ChartDataService {
         return errors;
     }
 
-    validateIntradayParams(params) {
-        const errors = this.validateCommonParams(params);
+    validateIntradayParams(params, maxDays) {
+        const errors = this.validateCommonParams(params, maxDays);
 
         // Interval validation for intraday
         if (!params.interval || !CHART_CONSTANTS.INTERVALS.includes(params.interval)) {
@@ -123,7 +127,7 @@ class ChartDataService {
         return errors;
     }
 
-    async getHistoricalData(params) {
+    async getHistoricalData(params, options = {}) {
         try {
             // Validate historical parameters
             const validationErrors = this.validateHistoricalParams(params);
@@ -131,19 +135,30 @@ class ChartDataService {
                 throw new Error(`Validation failed: ${validationErrors.join(', ')}`);
             }
 
-            // Make API call to fetch historical data
-            const response = await this.api.post('/charts/historical', params);
-            return response.data;
+            const fetchRange = async (fromDate, toDate) => {
+                const response = await this.api.post('/charts/historical', { ...params, fromDate, toDate });
+                return response.data;
+            };
+
+            // Serve cached days and fetch only the missing sub-ranges
+            const data = options.cache === false
+                ? await fetchRange(params.fromDate, params.toDate)
+                : await this.candleCache.getRange(params, 'D', fetchRange);
+
+            // Typed-array columns avoid one object per candle on long series
+            return options.columnar ? OHLCVColumns.fromDhan(data) : data;
 
         } catch (error) {
             if (error.response) {
-                throw new Error(`Failed to fetch historical data: ${error.response.data.message || error.response.statusText}`);
+                const apiError = new Error(`Failed to fetch historical data: ${error.response.data.message || error.response.statusText}`);
+                apiError.status = error.response.status;
+                throw apiError;
             }
             throw error;
         }
     }
 
-    async getIntradayData(params) {
+    async getIntradayData(params, options = {}) {
         try {
             // Validate intraday parameters
             const validationErrors = this.validateIntradayParams(params);
@@ -151,18 +166,63 @@ class ChartDataService {
                 throw new Error(`Validation failed: ${validationErrors.join(', ')}`);
             }
 
-            // Make API call to fetch intraday data
-            const response = await this.api.post('/charts/intraday', params);
-            return response.data;
+            const fetchRange = async (fromDate, toDate) => {
+                const response = await this.api.post('/charts/intraday', { ...params, fromDate, toDate });
+                return response.data;
+            };
+
+            const data = options.cache === false
+                ? await fetchRange(params.fromDate, params.toDate)
+                : await this.candleCache.getRange(params, params.interval, fetchRange);
+
+            return options.columnar ? OHLCVColumns.fromDhan(data) : data;
 
         } catch (error) {
             if (error.response) {
-                throw new Error(`Failed to fetch intraday data: ${error.response.data.message || error.response.statusText}`);
+                const apiError = new Error(`Failed to fetch intraday data: ${error.response.data.message || error.response.statusText}`);
+                apiError.status = error.response.status;
+                throw apiError;
             }
             throw error;
         }
     }
 
+    // Fetch any date range by splitting it into the largest chunks Dhan allows,
+    // fetching them concurrently within the data rate-limit budget and stitching
+    // the results back together in order. options.beforeChunk is awaited before
+    // each chunk request, e.g. to pace requests.
+    async fetchRangeInChunks(params, maxDays, fetchChunk, options) {
+        const chunks = splitDateRange(params.fromDate, params.toDate, maxDays);
+        const results = await mapWithConcurrency(chunks, options.concurrency || getDataConcurrency(),
+            async ([fromDate, toDate]) => {
+                if (options.beforeChunk) await options.beforeChunk();
+                return fetchChunk({ ...params, fromDate, toDate }, { cache: options.cache });
+            });
+
+        const data = stitchCandles(results);
+        return options.columnar ? OHLCVColumns.fromDhan(data) : data;
+    }
+
+    async getHistoricalDataRange(params, options = {}) {
+        const validationErrors = this.validateHistoricalParams(params, Infinity);
+        if (validationErrors.length > 0) {
+            throw new Error(`Validation failed: ${validationErrors.join(', ')}`);
+        }
+
+        return this.fetchRangeInChunks(params, CHART_CONSTANTS.MAX_HISTORICAL_DAYS,
+            (chunk, chunkOptions) => this.getHistoricalData(chunk, chunkOptions), options);
+    }
+
+    async getIntradayDataRange(params, options = {}) {
+        const validationErrors = this.validateIntradayParams(params, Infinity);
+        if (validationErrors.length > 0) {
+            throw new Error(`Validation failed: ${validationErrors.join(', ')}`);
+        }
+
+        return this.fetchRangeInChunks(params, CHART_CONSTANTS.MAX_INTRADAY_DAYS,
+            (chunk, chunkOptions) => this.getIntradayData(chunk, chunkOptions), options);
+    }
+
     // Helper methods for historical data
     async getEquityHistoricalData(securityId, fromDate, toDate) {
         return this.getHistoricalData({
@@ -207,7 +267,11 @@ class ChartDataService {
     }
 
     // Data transformation helper
-    transformToOHLCV(data) {
+    transformToOHLCV(data, options = {}) {
+        if (options.columnar) {
+            return OHLCVColumns.fromDhan(data);
+        }
+
         return data.map(item => ({
             timestamp: new Date(item.timestamp).getTime(),
             open: parseFloat(item.open),
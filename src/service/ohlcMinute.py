@@ -1,26 +1,30 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const candleCache = require('./candleCache');
+const OHLCVColumns = require('./ohlcColumns');
+const { splitDateRange, getDataConcurrency, stitchCandles } = require('./chartRange');
+const { mapWithConcurrency } = require('../utils/concurrency');
 require('dotenv').config();
 
 // Constants for validation
 const CHART_CONSTANTS = {
     EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO', 'MCX_COMM', 'IDX_I'],
     INSTRUMENTS: ['INDEX', 'FUTIDX', 'OPTIDX', 'EQUITY', 'FUTSTK', 'OPTSTK', 'FUTCOM', 'OPTFUT'],
-    INTERVALS: ['1', '5', '15', '25', '60']
+    INTERVALS: ['1', '5', '15', '25', '60'],
+    // Maximum date range Dhan serves per intraday request (in days)
+    MAX_INTRADAY_DAYS: 90
 };
 
 class ChartDataService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
+
+        this.candleCache = candleCache;
     }
 
     validateDate(dateString) {
@@ -35,7 +39,7 @@ class ChartDataService {
         return date instanceof Date && !isNaN(date);
     }
 
-    validateDateRange(fromDate, toDate) {
+    validateDateRange(fromDate, toDate, maxMs = 365 * 24 * 60 * 60 * 1000) {
         const from = new Date(fromDate);
         const to = new Date(toDate);
         
@@ -44,12 +48,11 @@ class ChartDataService {
             return false;
         }
 
-        // Check if date range is within reasonable limits (e.g., 1 year)
-        const yearInMs = 365 * 24 * 60 * 60 * 1000;
-        return (to - from) <= yearInMs;
+        // Check if date range is within reasonable limits (1 year by default)
+        return (to - from) <= maxMs;
     }
 
-    validateChartParams(params) {
+    validateChartParams(params, maxMs) {
         const errors = [];
 
         // Security ID validation
@@ -81,7 +84,7 @@ class ChartDataService {
             errors.push('Invalid toDate format. Use yyyy-MM-dd');
         }
 
-        if (params.fromDate && params.toDate && !this.validateDateRange(params.fromDate, params.toDate)) {
+        if (params.fromDate && params.toDate && !this.validateDateRange(params.fromDate, params.toDate, maxMs)) {
             errors.push('Invalid date range. Ensure fromDate is before toDate and within 1 year');
         }
 
@@ -93,7 +96,7 @@ class ChartDataService {
         return errors;
     }
 
-    async getIntradayData(params) {
+    async getIntradayData(params, options = {}) {
         try {
             // Validate chart parameters
             const validationErrors = this.validateChartParams(params);
@@ -101,18 +104,49 @@ class ChartDataService {
                 throw new Error(`Validation failed: ${validationErrors.join(', ')}`);
             }
 
-            // Make API call to fetch intraday data
-            const response = await this.api.post('/charts/intraday', params);
-            return response.data;
+            const fetchRange = async (fromDate, toDate) => {
+                const response = await this.api.post('/charts/intraday', { ...params, fromDate, toDate });
+                return response.data;
+            };
+
+            // Serve cached days and fetch only the missing sub-ranges
+            const data = options.cache === false
+                ? await fetchRange(params.fromDate, params.toDate)
+                : await this.candleCache.getRange(params, params.interval, fetchRange);
+
+            // Typed-array columns avoid one object per candle on long series
+            return options.columnar ? OHLCVColumns.fromDhan(data) : data;
 
         } catch (error) {
             if (error.response) {
-                throw new Error(`Failed to fetch chart data: ${error.response.data.message || error.response.statusText}`);
+                const apiError = new Error(`Failed to fetch chart data: ${error.response.data.message || error.response.statusText}`);
+                apiError.status = error.response.status;
+                throw apiError;
             }
             throw error;
         }
     }
 
+    // Fetch a range of any length as concurrent intraday-sized chunks, bounded
+    // by the data rate-limit budget, and stitch them back together in order.
+    // options.beforeChunk is awaited before each chunk request.
+    async getIntradayDataRange(params, options = {}) {
+        const validationErrors = this.validateChartParams(params, Infinity);
+        if (validationErrors.length > 0) {
+            throw new Error(`Validation failed: ${validationErrors.join(', ')}`);
+        }
+
+        const chunks = splitDateRange(params.fromDate, params.toDate, CHART_CONSTANTS.MAX_INTRADAY_DAYS);
+        const results = await mapWithConcurrency(chunks, options.concurrency || getDataConcurrency(),
+            async ([fromDate, toDate]) => {
+                if (options.beforeChunk) await options.beforeChunk();
+                return this.getIntradayData({ ...params, fromDate, toDate }, { cache: options.cache });
+            });
+
+        const data = stitchCandles(results);
+        return options.columnar ? OHLCVColumns.fromDhan(data) : data;
+    }
+
     // Helper methods for common chart data scenarios
     async getEquityIntradayData(securityId, interval = '5', fromDate, toDate) {
         return this.getIntradayData({
@@ -0,0 +1,273 @@
+// src/service/orderScheduler.js
+
+const cluster = require('cluster');
+const { EventEmitter } = require('events');
+const Histogram = require('../metrics/histogram');
+const { rateLimitConfig, timeWindows } = require('../middleware/rateLimit/Config');
+require('dotenv').config();
+
+// Lanes in dispatch order: kill-switch related orders, then exits, then new entries
+const LANES = ['kill', 'exit', 'entry'];
+
+const SCHEDULER_DEFAULTS = {
+    maxQueue: parseInt(process.env.ORDER_QUEUE_MAX) || 1000,  // Orders waiting across all lanes
+    retries429: 3,                                            // Requeue an order this often when Dhan still answers 429
+    account: process.env.DHAN_CLIENT_ID || 'default',         // Whose budget this is (Redis key)
+    // Also take every order from the account budget in Redis, so all processes
+    // of a cluster share it; on by default in cluster workers
+    shared: process.env.ORDER_BUDGET_REDIS ? process.env.ORDER_BUDGET_REDIS === 'true' : cluster.isWorker
+};
+
+const QUEUE_DEPTH_BOUNDS = [0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000];
+
+// Outbound order queue. Orders are released no faster than the order budget
+// in Config.js allows (limit / cost requests per window, the same budget the
+// middleware enforces), so callers wait for a slot instead of getting a 429.
+// In shared mode each dispatch also takes a slot from a per-account counter
+// in Redis (the limiter's check-and-increment script), so the budget holds
+// across cluster workers and restarts.
+class OrderScheduler extends EventEmitter {
+    constructor(limits = rateLimitConfig.order, windows = timeWindows, options = {}) {
+        super();
+        this.settings = { ...SCHEDULER_DEFAULTS, ...options };
+
+        // Requests allowed per window, e.g. { durationMs: 1000, capacity: 4 }
+        this.windows = Object.keys(windows)
+            .filter(name => limits[name])
+            .map(name => ({
+                name,
+                durationMs: windows[name] * 1000,
+                capacity: Math.max(1, Math.floor(limits[name].limit / limits[name].cost))
+            }));
+
+        // Recent dispatch times, oldest first; long enough for the largest window
+        this._dispatched = [];
+        this._historySize = Math.max(...this.windows.map(window => window.capacity));
+
+        this._lanes = new Map(LANES.map(lane => [lane, []]));
+        this._size = 0;
+        this._timer = null;
+        this._reserving = false;
+
+        this.stats = {
+            scheduled: 0,
+            dispatched: 0,
+            requeued: 0,
+            rejected: 0,
+            deferred: 0     // Shared budget said no although this process had room
+        };
+        this.queueDepth = new Histogram(QUEUE_DEPTH_BOUNDS);
+        this.waitTime = new Histogram();
+    }
+
+    // Earliest time a request may go out if `ahead` others are sent before it
+    slotTime(now, ahead = 0) {
+        let slot = now;
+        for (const window of this.windows) {
+            // Count dispatches that are still inside the window at `now`
+            let inWindow = 0;
+            for (let i = this._dispatched.length - 1; i >= 0; i--) {
+                if (this._dispatched[i] <= now - window.durationMs) break;
+                inWindow++;
+            }
+
+            const position = inWindow + ahead;
+            if (position < window.capacity) continue;
+
+            // The slot frees up when the dispatch `capacity` places earlier leaves the window
+            const index = this._dispatched.length - inWindow + (position - window.capacity);
+            if (index < this._dispatched.length) {
+                slot = Math.max(slot, this._dispatched[index] + window.durationMs);
+            } else {
+                // Past our history: assume the queue keeps running at capacity
+                const rounds = Math.floor(position / window.capacity);
+                slot = Math.max(slot, now + rounds * window.durationMs);
+            }
+        }
+        return slot;
+    }
+
+    // Run fn once the order budget allows. The returned promise settles with
+    // fn's result and carries expectedDispatchAt (ms since epoch), which is
+    // also passed to options.onScheduled for callers that only see a wrapper.
+    schedule(fn, options = {}) {
+        if (options.schedule === false) {
+            return Promise.resolve().then(fn);
+        }
+
+        const lane = options.lane || 'entry';
+        if (!this._lanes.has(lane)) {
+            return Promise.reject(new Error(`Unknown order lane: ${lane}`));
+        }
+        if (this._size >= this.settings.maxQueue) {
+            this.stats.rejected++;
+            const error = new Error('Order queue is full');
+            error.status = 429;
+            return Promise.reject(error);
+        }
+
+        const now = Date.now();
+        const ahead = this.queuedAhead(lane);
+        const job = {
+            fn,
+            lane,
+            label: options.label,
+            enqueuedAt: now,
+            expectedDispatchAt: this.slotTime(now, ahead),
+            attempts: 0
+        };
+
+        const promise = new Promise((resolve, reject) => {
+            job.resolve = resolve;
+            job.reject = reject;
+        });
+        promise.expectedDispatchAt = job.expectedDispatchAt;
+        if (options.onScheduled) {
+            options.onScheduled({ lane, expectedDispatchAt: job.expectedDispatchAt, queuedAhead: ahead });
+        }
+
+        this._lanes.get(lane).push(job);
+        this._size++;
+        this.stats.scheduled++;
+        this.queueDepth.record(this._size);
+
+        this.drain();
+        return promise;
+    }
+
+    // Orders that will be dispatched before a new order in lane
+    queuedAhead(lane) {
+        let ahead = 0;
+        for (const name of LANES) {
+            ahead += this._lanes.get(name).length;
+            if (name === lane) break;
+        }
+        return ahead;
+    }
+
+    nextJob() {
+        for (const lane of LANES) {
+            const queue = this._lanes.get(lane);
+            if (queue.length > 0) {
+                this._size--;
+                return queue.shift();
+            }
+        }
+        return null;
+    }
+
+    drain() {
+        if (this._timer || this._reserving) return;
+
+        while (this._size > 0) {
+            const now = Date.now();
+            const slot = this.slotTime(now);
+            if (slot > now) {
+                this.wait(slot - now);
+                return;
+            }
+            if (this.settings.shared) {
+                this.drainShared();
+                return;
+            }
+            this.dispatchNext(now);
+        }
+    }
+
+    wait(delay) {
+        this._timer = setTimeout(() => {
+            this._timer = null;
+            this.drain();
+        }, delay);
+    }
+
+    dispatchNext(now) {
+        this._dispatched.push(now);
+        if (this._dispatched.length > this._historySize) this._dispatched.shift();
+        this.dispatch(this.nextJob(), now);
+    }
+
+    // The local windows have room; take the slot from the shared budget too,
+    // one reservation at a time so the queue order is kept
+    async drainShared() {
+        this._reserving = true;
+        let delay = 0;
+        try {
+            delay = await this.reserveShared();
+        } catch (error) {
+            // Like the limiter middleware, fail open: the local windows still apply
+            console.error('Order scheduler budget error:', error.message);
+        } finally {
+            this._reserving = false;
+        }
+
+        if (delay > 0) {
+            this.stats.deferred++;
+            this.wait(delay);
+            return;
+        }
+        this.dispatchNext(Date.now());
+        this.drain();
+    }
+
+    // Count one order against the account's windows in Redis. Resolves with 0
+    // when granted, else with the ms until the full window starts over.
+    async reserveShared() {
+        const rateLimiter = require('../middleware/rateLimit').getInstance();
+        const keys = this.windows.map(window => `orderbudget:${this.settings.account}:${window.name}`);
+        const args = [];
+        for (const window of this.windows) {
+            args.push(1, window.capacity, window.durationMs / 1000);
+        }
+
+        const reply = await rateLimiter.runScript('checkAndIncrement', keys, args);
+        if (reply[0] === 1) return 0;
+        // reply: [0, window index, count, ttl in seconds]
+        return Math.max(1, reply[3]) * 1000;
+    }
+
+    dispatch(job, now) {
+        job.attempts++;
+        this.stats.dispatched++;
+        this.waitTime.record(now - job.enqueuedAt);
+        this.emit('dispatch', { lane: job.lane, label: job.label, waitMs: now - job.enqueuedAt });
+
+        Promise.resolve()
+            .then(() => job.fn())
+            .then(job.resolve, (error) => {
+                const status = error.status || (error.response && error.response.status);
+                if (status === 429 && job.attempts <= this.settings.retries429) {
+                    // Our view of the budget was off; go again at the head of the lane,
+                    // after the Retry-After delay if Dhan gave one
+                    this.stats.requeued++;
+                    setTimeout(() => {
+                        this._lanes.get(job.lane).unshift(job);
+                        this._size++;
+                        this.drain();
+                    }, error.retryAfter || 0);
+                    return;
+                }
+                job.reject(error);
+            });
+    }
+
+    getStats() {
+        const lanes = {};
+        for (const [lane, queue] of this._lanes) {
+            lanes[lane] = queue.length;
+        }
+        return {
+            ...this.stats,
+            queued: this._size,
+            lanes,
+            shared: this.settings.shared,
+            nextSlotAt: this.slotTime(Date.now()),
+            queueDepth: this.queueDepth.snapshot(),
+            waitTimeMs: this.waitTime.snapshot()
+        };
+    }
+}
+
+OrderScheduler.LANES = LANES;
+
+module.exports = new OrderScheduler();
@@ -0,0 +1,268 @@
+// src/service/portfolioSnapshot.js
+
+const crypto = require('crypto');
+const { EventEmitter } = require('events');
+const dhanHttpClient = require('../config/dhanHttpClient');
+require('dotenv').config();
+
+const SNAPSHOT_DEFAULTS = {
+    refreshInterval: parseInt(process.env.PORTFOLIO_REFRESH_MS) || 1000,  // One upstream refresh per account per interval
+    idleTimeout: parseInt(process.env.PORTFOLIO_IDLE_MS) || 60000,        // Stop refreshing after this long without readers
+    maxSubscribers: parseInt(process.env.PORTFOLIO_MAX_STREAMS) || 10     // Open delta streams per account per process
+};
+
+// Row keys: one holding per security, one position per security and product
+const PORTFOLIO_KINDS = {
+    holdings: {
+        path: '/holdings',
+        key: row => String(row.securityId)
+    },
+    positions: {
+        path: '/positions',
+        key: row => `${row.securityId}:${row.productType}`
+    }
+};
+
+// The serialized rows of one kind, plus what clients need to validate their copy
+class Snapshot {
+    constructor(kind) {
+        this.kind = kind;
+        this.rows = new Map();       // key -> row
+        this.rowJson = new Map();    // key -> JSON of the row, for cheap comparison
+        this.body = '[]';
+        this.etag = null;
+        this.version = 0;
+        this.fetchedAt = null;
+    }
+
+    // Replace the rows; returns the delta, or null when nothing changed
+    apply(rows, fetchedAt) {
+        const keyOf = PORTFOLIO_KINDS[this.kind].key;
+        const nextRows = new Map();
+        const nextJson = new Map();
+        const upserts = [];
+
+        for (const row of rows) {
+            const key = keyOf(row);
+            const json = JSON.stringify(row);
+            nextRows.set(key, row);
+            nextJson.set(key, json);
+            if (this.rowJson.get(key) !== json) upserts.push(row);
+        }
+
+        const removed = [];
+        for (const key of this.rowJson.keys()) {
+            if (!nextJson.has(key)) removed.push(key);
+        }
+
+        this.fetchedAt = fetchedAt;
+        if (upserts.length === 0 && removed.length === 0 && this.etag !== null) return null;
+
+        this.rows = nextRows;
+        this.rowJson = nextJson;
+        this.body = `[${[...nextJson.values()].join(',')}]`;
+        // Content hash, so every worker of a cluster hands out the same ETag for the same data
+        this.etag = `"${crypto.createHash('sha1').update(this.body).digest('base64url')}"`;
+        this.version++;
+
+        return { kind: this.kind, version: this.version, etag: this.etag, upserts, removed };
+    }
+}
+
+// Holdings and positions of one account, refreshed on one timer while anyone reads them
+class AccountPortfolio extends EventEmitter {
+    constructor(account, settings) {
+        super();
+        this.account = account;
+        this.settings = settings;
+        this.snapshots = {};
+        for (const kind of Object.keys(PORTFOLIO_KINDS)) {
+            this.snapshots[kind] = new Snapshot(kind);
+        }
+
+        this.lastReadAt = 0;
+        this.running = false;
+        this._subscribers = 0;
+        this._timer = null;
+        this._refreshing = null;
+        this.lastError = null;
+
+        this.stats = {
+            upstreamRequests: 0,
+            upstreamErrors: 0,
+            reads: 0,
+            deltas: 0
+        };
+    }
+
+    // Snapshot of one kind. A read that (re)starts the refresh loop, or finds
+    // the snapshot older than refreshInterval, waits for a fresh one; a
+    // refresh already in flight is shared.
+    async get(kind) {
+        const now = Date.now();
+        this.lastReadAt = now;
+        this.stats.reads++;
+        const snapshot = this.snapshots[kind];
+        const stale = snapshot.fetchedAt === null || now - snapshot.fetchedAt > this.settings.refreshInterval;
+        const wasRunning = this.running;
+        if (!wasRunning) this.start();
+        if (!wasRunning || stale) await this.refresh();
+        if (this.snapshots[kind].etag === null) {
+            throw this.lastError || new Error(`Portfolio snapshot failed: no ${kind} data yet`);
+        }
+        return this.snapshots[kind];
+    }
+
+    // Listen for { kind, version, etag, upserts, removed } deltas.
+    // Returns a function that removes the listener again; throws (429) once
+    // the account has maxSubscribers streams.
+    subscribe(listener, onError) {
+        if (this._subscribers >= this.settings.maxSubscribers) {
+            const error = new Error(`Portfolio stream limit reached: ${this.settings.maxSubscribers} open streams for this account`);
+            error.status = 429;
+            throw error;
+        }
+        this.on('delta', listener);
+        if (onError) this.on('error', onError);
+        this._subscribers++;
+        if (!this.running) this.start();
+
+        let subscribed = true;
+        return () => {
+            if (!subscribed) return;
+            subscribed = false;
+            this.removeListener('delta', listener);
+            if (onError) this.removeListener('error', onError);
+            this._subscribers--;
+            this.lastReadAt = Date.now();
+        };
+    }
+
+    get subscribers() {
+        return this._subscribers;
+    }
+
+    start() {
+        this.running = true;
+        this.tick();
+    }
+
+    stop() {
+        this.running = false;
+        clearTimeout(this._timer);
+        this._timer = null;
+    }
+
+    schedule(delay) {
+        clearTimeout(this._timer);
+        this._timer = setTimeout(() => this.tick(), delay);
+    }
+
+    async tick() {
+        this._timer = null;
+        if (this._subscribers === 0 && Date.now() - this.lastReadAt > this.settings.idleTimeout) {
+            this.running = false;
+            return;
+        }
+
+        await this.refresh();
+        if (this.running) this.schedule(this.settings.refreshInterval);
+    }
+
+    // Fetch every kind once; concurrent callers share the same refresh
+    refresh() {
+        if (!this._refreshing) {
+            this._refreshing = Promise.all(Object.keys(PORTFOLIO_KINDS).map(kind => this.refreshKind(kind)))
+                .finally(() => {
+                    this._refreshing = null;
+                });
+        }
+        return this._refreshing;
+    }
+
+    async refreshKind(kind) {
+        try {
+            this.stats.upstreamRequests++;
+            const response = await dhanHttpClient.api.get(PORTFOLIO_KINDS[kind].path, {
+                headers: { 'access-token': this.account.accessToken }
+            });
+            if (!Array.isArray(response.data)) {
+                throw new Error(`unexpected ${kind} response`);
+            }
+
+            this.lastError = null;
+            const delta = this.snapshots[kind].apply(response.data, Date.now());
+            if (delta) {
+                this.stats.deltas++;
+                this.emit('delta', delta);
+            }
+        } catch (error) {
+            // Keep serving the last good snapshot
+            this.stats.upstreamErrors++;
+            this.lastError = error;
+            this.reportError(error);
+        }
+    }
+
+    // 'error' without listeners would throw, so only emit when someone listens
+    reportError(error) {
+        if (this.listenerCount('error') > 0) this.emit('error', error);
+    }
+}
+
+// Server-side holdings/positions per account. However many dashboards poll
+// or stream an account, Dhan sees one request per kind per refresh interval;
+// readers get the in-memory snapshot (with an ETag) or row-level deltas.
+class PortfolioSnapshotManager {
+    constructor(options = {}) {
+        this.settings = { ...SNAPSHOT_DEFAULTS, ...options };
+        this.kinds = Object.keys(PORTFOLIO_KINDS);
+        // dhanClientId -> AccountPortfolio
+        this._portfolios = new Map();
+    }
+
+    // Portfolio state for an account context from the account registry
+    portfolio(account) {
+        const id = account.dhanClientId || '';
+        let portfolio = this._portfolios.get(id);
+        if (!portfolio) {
+            portfolio = new AccountPortfolio(account, this.settings);
+            this._portfolios.set(id, portfolio);
+        }
+        // A re-registered account brings a new token
+        portfolio.account = account;
+        return portfolio;
+    }
+
+    get(account, kind) {
+        if (!PORTFOLIO_KINDS[kind]) {
+            throw new Error(`Portfolio snapshot failed: unknown kind ${kind}`);
+        }
+        return this.portfolio(account).get(kind);
+    }
+
+    subscribe(account, listener, onError) {
+        return this.portfolio(account).subscribe(listener, onError);
+    }
+
+    getStats() {
+        const stats = {};
+        for (const [id, portfolio] of this._portfolios) {
+            stats[id || 'default'] = {
+                ...portfolio.stats,
+                subscribers: portfolio.subscribers,
+                running: portfolio.running
+            };
+        }
+        return stats;
+    }
+
+    stop() {
+        for (const portfolio of this._portfolios.values()) {
+            portfolio.stop();
+        }
+        this._portfolios.clear();
+    }
+}
+
+module.exports = new PortfolioSnapshotManager();
@@ -1,86 +1,45 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const orderScheduler = require('./orderScheduler');
+const { mapWithConcurrency } = require('../utils/concurrency');
+const { validatePositionConversion, isValidConversion } = require('../validation/orderSchemas');
 require('dotenv').config();
 
-// Validation constants
-const POSITION_TYPES = {
-    PRODUCT_TYPES: ['CNC', 'INTRADAY', 'MARGIN', 'MTF', 'CO', 'BO'],
-    EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO', 'MCX_COMM'],
-    POSITION_TYPES: ['LONG', 'SHORT', 'CLOSED']
+// Bulk (end-of-day) conversion settings
+const BULK_CONVERSION_DEFAULTS = {
+    concurrency: parseInt(process.env.POSITION_CONVERT_CONCURRENCY) || 10,  // Conversions handed to the scheduler at once
+    maxWaitMs: parseInt(process.env.POSITION_CONVERT_MAX_WAIT_MS) || 60000  // Refuse runs the order budget can't finish sooner
 };
 
+// Accept a single value or a list for the bulk conversion filters
+function toSet(value) {
+    if (value === undefined || value === null) return null;
+    return new Set((Array.isArray(value) ? value : [value]).map(String));
+}
+
 class PositionConverterService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
-        this.dhanClientId = process.env.DHAN_CLIENT_ID;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
+        this.dhanClientId = account.dhanClientId || process.env.DHAN_CLIENT_ID;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
+
+        // Orders of one account share one budget
+        this.scheduler = account.scheduler || orderScheduler;
     }
 
     validateConversionParams(params) {
-        const errors = [];
-
-        // Required field validations
-        if (!params.fromProductType || !POSITION_TYPES.PRODUCT_TYPES.includes(params.fromProductType)) {
-            errors.push('Invalid or missing fromProductType');
-        }
-
-        if (!params.toProductType || !POSITION_TYPES.PRODUCT_TYPES.includes(params.toProductType)) {
-            errors.push('Invalid or missing toProductType');
-        }
-
-        if (!params.exchangeSegment || !POSITION_TYPES.EXCHANGE_SEGMENTS.includes(params.exchangeSegment)) {
-            errors.push('Invalid or missing exchangeSegment');
-        }
-
-        if (!params.positionType || !POSITION_TYPES.POSITION_TYPES.includes(params.positionType)) {
-            errors.push('Invalid or missing positionType');
-        }
-
-        if (!params.securityId) {
-            errors.push('Missing securityId');
-        }
-
-        // Quantity validation
-        if (!Number.isInteger(params.convertQty) || params.convertQty <= 0) {
-            errors.push('convertQty must be a positive integer');
-        }
-
-        // Product type conversion validation
-        if (params.fromProductType === params.toProductType) {
-            errors.push('fromProductType and toProductType cannot be the same');
-        }
-
-        // Validate specific conversion rules
-        if (!this.isValidConversion(params.fromProductType, params.toProductType)) {
-            errors.push('Invalid product type conversion combination');
-        }
-
-        return errors;
+        return validatePositionConversion(params);
     }
 
     isValidConversion(fromType, toType) {
-        // Define valid conversion paths
-        const validConversions = {
-            'INTRADAY': ['CNC', 'MARGIN'],
-            'CNC': ['INTRADAY', 'MTF'],
-            'MARGIN': ['INTRADAY'],
-            'MTF': ['CNC'],
-            'CO': ['INTRADAY'],
-            'BO': ['INTRADAY']
-        };
-
-        return validConversions[fromType]?.includes(toType) || false;
+        return isValidConversion(fromType, toType);
     }
 
-    async convertPosition(params) {
+    async convertPosition(params, options = {}) {
         try {
             const conversionParams = {
                 dhanClientId: params.dhanClientId || this.dhanClientId,
@@ -94,7 +53,7 @@ class PositionConverterService {
             }
 
             // Make API call to convert position
-            const response = await this.api.post('/positions/convert', conversionParams);
+            const response = await this.scheduler.schedule(() => this.api.post('/positions/convert', conversionParams), options);
             return response.data;
 
         } catch (error) {
@@ -105,6 +64,155 @@ class PositionConverterService {
         }
     }
 
+    // Work out the conversion for one /positions row. Returns the request
+    // params, or the reason the row is skipped.
+    planConversion(position, toProductType) {
+        const netQty = parseInt(position.netQty) || 0;
+        const entry = {
+            securityId: position.securityId,
+            tradingSymbol: position.tradingSymbol,
+            exchangeSegment: position.exchangeSegment,
+            positionType: position.positionType,
+            fromProductType: position.productType,
+            toProductType,
+            convertQty: Math.abs(netQty)
+        };
+
+        if (position.positionType === 'CLOSED' || netQty === 0) {
+            return { ...entry, status: 'skipped', reason: 'Position is closed' };
+        }
+        if (position.productType === toProductType) {
+            return { ...entry, status: 'skipped', reason: `Already ${toProductType}` };
+        }
+        if (!this.isValidConversion(position.productType, toProductType)) {
+            return { ...entry, status: 'skipped', reason: `${position.productType} cannot be converted to ${toProductType}` };
+        }
+
+        const params = {
+            dhanClientId: position.dhanClientId || this.dhanClientId,
+            fromProductType: position.productType,
+            exchangeSegment: position.exchangeSegment,
+            positionType: position.positionType,
+            securityId: String(position.securityId),
+            tradingSymbol: position.tradingSymbol,
+            convertQty: entry.convertQty,
+            toProductType
+        };
+        const validationErrors = this.validateConversionParams(params);
+        if (validationErrors.length > 0) {
+            return { ...entry, status: 'skipped', reason: `Validation failed: ${validationErrors.join(', ')}` };
+        }
+        return { ...entry, status: 'planned', params };
+    }
+
+    // Convert every open position that matches the filters to toProductType,
+    // e.g. all INTRADAY positions to CNC before the close.
+    //   toProductType     target product type (required)
+    //   fromProductType,
+    //   exchangeSegment,
+    //   securityIds       filters; a value or a list
+    //   filter            extra (position) => boolean
+    //   positions         rows to use instead of fetching /positions
+    //   dryRun            report what would be converted without converting
+    //   concurrency, lane passed on to the order scheduler
+    // Conversions share the account's order budget with every other order;
+    // `concurrency` of them wait in the scheduler at a time, so other orders
+    // can still get in between. Returns a report with one result per position;
+    // a failed conversion is reported rather than failing the whole run.
+    async convertPositions(options = {}) {
+        const settings = { ...BULK_CONVERSION_DEFAULTS, ...options };
+        const startedAt = Date.now();
+
+        try {
+            if (!settings.toProductType) {
+                throw new Error('Validation failed: toProductType is required');
+            }
+
+            let positions = settings.positions;
+            if (!positions) {
+                const response = await this.api.get('/positions');
+                positions = response.data;
+            }
+            if (!Array.isArray(positions)) {
+                throw new Error('Validation failed: positions must be an array');
+            }
+
+            const fromProductTypes = toSet(settings.fromProductType);
+            const exchangeSegments = toSet(settings.exchangeSegment);
+            const securityIds = toSet(settings.securityIds);
+            const selected = positions.filter(position =>
+                (!fromProductTypes || fromProductTypes.has(position.productType))
+                && (!exchangeSegments || exchangeSegments.has(position.exchangeSegment))
+                && (!securityIds || securityIds.has(String(position.securityId)))
+                && (!settings.filter || settings.filter(position)));
+
+            const plan = selected.map(position => this.planConversion(position, settings.toProductType));
+            const eligible = plan.filter(entry => entry.status === 'planned');
+
+            // When the last conversion would go out, behind the orders already queued
+            const now = Date.now();
+            const finishAt = eligible.length > 0
+                ? this.scheduler.slotTime(now, this.scheduler.queuedAhead(settings.lane || 'entry') + eligible.length - 1)
+                : now;
+
+            const report = {
+                dryRun: Boolean(settings.dryRun),
+                toProductType: settings.toProductType,
+                total: positions.length,
+                selected: selected.length,
+                eligible: eligible.length,
+                skipped: plan.length - eligible.length,
+                expectedDurationMs: finishAt - now,
+                converted: 0,
+                failed: 0,
+                results: plan
+            };
+
+            // All or nothing: don't start a run that would stall half-converted
+            // waiting for the order budget
+            if (!settings.dryRun && finishAt - now > settings.maxWaitMs) {
+                const error = new Error(`Bulk position conversion failed: the order budget can't place ${eligible.length} `
+                    + `conversions within ${settings.maxWaitMs}ms; narrow the selection or retry later`);
+                error.status = 429;
+                throw error;
+            }
+
+            if (!settings.dryRun) {
+                await mapWithConcurrency(eligible, settings.concurrency, async (entry) => {
+                    const requestedAt = Date.now();
+                    try {
+                        const response = await this.scheduler.schedule(
+                            () => this.api.post('/positions/convert', entry.params),
+                            { lane: settings.lane, label: `convert ${entry.securityId}` }
+                        );
+                        entry.status = 'converted';
+                        entry.data = response.data;
+                        report.converted++;
+                    } catch (error) {
+                        entry.status = 'failed';
+                        entry.error = error.response
+                            ? (error.response.data && error.response.data.message) || error.response.statusText
+                            : error.message;
+                        report.failed++;
+                    }
+                    entry.durationMs = Date.now() - requestedAt;
+                });
+            }
+
+            for (const entry of plan) {
+                delete entry.params;
+            }
+            report.durationMs = Date.now() - startedAt;
+            return report;
+
+        } catch (error) {
+            if (error.response) {
+                throw new Error(`Bulk position conversion failed: ${error.response.data.message || error.response.statusText}`);
+            }
+            throw error;
+        }
+    }
+
     // Helper methods for common conversion scenarios
     async convertIntradayToCNC(params) {
         return this.convertPosition({
@@ -153,6 +261,23 @@ class PositionConverterService {
             toProductType: 'INTRADAY'
         });
     }
+
+    // End-of-day bulk conversions of every open intraday position
+    async convertAllIntradayToCNC(options = {}) {
+        return this.convertPositions({
+            ...options,
+            fromProductType: 'INTRADAY',
+            toProductType: 'CNC'
+        });
+    }
+
+    async convertAllIntradayToMargin(options = {}) {
+        return this.convertPositions({
+            ...options,
+            fromProductType: 'INTRADAY',
+            toProductType: 'MARGIN'
+        });
+    }
 }
 
 module.exports = new PositionConverterService();
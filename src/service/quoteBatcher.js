@@ -0,0 +1,168 @@
+// src/service/quoteBatcher.js
+
+const { EventEmitter } = require('events');
+const dhanHttpClient = require('../config/dhanHttpClient');
+require('dotenv').config();
+
+const BATCH_DEFAULTS = {
+    enabled: process.env.QUOTE_BATCH_ENABLED !== 'false',
+    windowMs: parseInt(process.env.QUOTE_BATCH_WINDOW_MS) || 3,             // Latency added to the first request of a batch
+    maxBatchSize: parseInt(process.env.QUOTE_BATCH_MAX_SIZE) || 1000,       // Instruments per request (Dhan's maximum)
+    minIntervalMs: parseInt(process.env.QUOTE_BATCH_MIN_INTERVAL_MS) || 1000 // Between requests (Dhan allows 1 per second)
+};
+
+// Segments the market quote API accepts
+const QUOTE_SEGMENTS = ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO', 'MCX_COMM', 'NSE_CURRENCY', 'BSE_CURRENCY', 'IDX_I'];
+
+// Collects last-price lookups for a few ms and sends them as one
+// POST /marketfeed/ltp, then resolves each waiting caller with its own quote.
+//   request:  { "NSE_EQ": [11536, 1333], "NSE_FNO": [49081] }
+//   response: { "data": { "NSE_EQ": { "11536": { "last_price": 4520 } } }, "status": "success" }
+// Emits 'quotes' with a Map of securityId -> quote after every batch.
+class QuoteBatcher extends EventEmitter {
+    constructor(options = {}) {
+        super();
+        // One 'quotes' listener per account trigger book
+        this.setMaxListeners(0);
+        this.settings = { ...BATCH_DEFAULTS, ...options };
+
+        // "segment:securityId" -> { exchangeSegment, securityId, callers }
+        this._pending = new Map();
+        this._timer = null;
+        this._dueAt = 0;
+        this._lastSentAt = 0;
+
+        this.stats = {
+            requests: 0,
+            batches: 0,
+            instruments: 0,
+            failedBatches: 0
+        };
+    }
+
+    // Instrument of a /quotes/:symbol request: "NSE_EQ:11536", or a security
+    // id with ?exchangeSegment=. Null for anything else (e.g. a trading symbol).
+    parseInstrument(symbol, exchangeSegment) {
+        let segment = exchangeSegment;
+        let securityId = symbol;
+        const separator = String(symbol).indexOf(':');
+        if (!segment && separator !== -1) {
+            segment = symbol.slice(0, separator);
+            securityId = symbol.slice(separator + 1);
+        }
+        if (!QUOTE_SEGMENTS.includes(segment) || !/^\d+$/.test(securityId)) return null;
+        return { exchangeSegment: segment, securityId };
+    }
+
+    // Resolve with the quote ({ last_price }) of one instrument, fetched as part of the next batch
+    get(exchangeSegment, securityId) {
+        this.stats.requests++;
+        const key = `${exchangeSegment}:${securityId}`;
+        return new Promise((resolve, reject) => {
+            if (!this._pending.has(key)) {
+                this._pending.set(key, { exchangeSegment, securityId: String(securityId), callers: [] });
+            }
+            this._pending.get(key).callers.push({ resolve, reject });
+            this.schedule();
+        });
+    }
+
+    // Send the next batch after the collection window, a full batch at once,
+    // but never sooner than minIntervalMs after the previous request
+    schedule() {
+        if (this._pending.size === 0) return;
+        const now = Date.now();
+        const window = this._pending.size >= this.settings.maxBatchSize ? 0 : this.settings.windowMs;
+        const dueAt = Math.max(now + window, this._lastSentAt + this.settings.minIntervalMs);
+        if (this._timer) {
+            if (this._dueAt <= dueAt) return;
+            clearTimeout(this._timer);
+        }
+        this._dueAt = dueAt;
+        this._timer = setTimeout(() => {
+            this._timer = null;
+            this.sendBatch().then(() => this.schedule());
+        }, dueAt - now);
+    }
+
+    // Send everything collected so far, e.g. on shutdown
+    async flush() {
+        if (this._timer) {
+            clearTimeout(this._timer);
+            this._timer = null;
+        }
+        while (this._pending.size > 0) {
+            await this.sendBatch();
+        }
+    }
+
+    // One POST /marketfeed/ltp with up to maxBatchSize waiting instruments
+    async sendBatch() {
+        const batch = [];
+        for (const [key, entry] of this._pending) {
+            if (batch.length >= this.settings.maxBatchSize) break;
+            batch.push(entry);
+            this._pending.delete(key);
+        }
+        if (batch.length === 0) return;
+
+        const body = {};
+        for (const { exchangeSegment, securityId } of batch) {
+            if (!body[exchangeSegment]) body[exchangeSegment] = [];
+            body[exchangeSegment].push(Number(securityId));
+        }
+
+        this._lastSentAt = Date.now();
+        this.stats.batches++;
+        this.stats.instruments += batch.length;
+        const startedAt = Date.now();
+        const waiting = batch.reduce((sum, entry) => sum + entry.callers.length, 0);
+
+        try {
+            const response = await dhanHttpClient.api.post('/marketfeed/ltp', body, {
+                headers: {
+                    'access-token': process.env.DHAN_ACCESS_TOKEN,
+                    'client-id': process.env.DHAN_CLIENT_ID
+                }
+            });
+
+            const data = (response.data && response.data.data) || {};
+            const quotes = new Map();
+            for (const { exchangeSegment, securityId, callers } of batch) {
+                const quote = data[exchangeSegment] && data[exchangeSegment][securityId];
+                if (quote === undefined) {
+                    const error = new Error(`Quote not found for ${exchangeSegment}:${securityId}`);
+                    error.status = 404;
+                    callers.forEach(caller => caller.reject(error));
+                } else {
+                    quotes.set(securityId, quote);
+                    callers.forEach(caller => caller.resolve(quote));
+                }
+            }
+            // Price feed for local consumers such as trigger books
+            if (quotes.size > 0) this.emit('quotes', quotes);
+        } catch (error) {
+            this.stats.failedBatches++;
+            for (const { callers } of batch) {
+                callers.forEach(caller => caller.reject(error));
+            }
+        }
+
+        this.emit('batch', { instruments: batch.length, requests: waiting, durationMs: Date.now() - startedAt });
+    }
+
+    getStats() {
+        return {
+            ...this.stats,
+            pending: this._pending.size,
+            averageBatchSize: this.stats.batches > 0 ? this.stats.instruments / this.stats.batches : 0,
+            windowMs: this.settings.windowMs,
+            maxBatchSize: this.settings.maxBatchSize,
+            minIntervalMs: this.settings.minIntervalMs
+        };
+    }
+}
+
+QuoteBatcher.QUOTE_SEGMENTS = QUOTE_SEGMENTS;
+
+module.exports = new QuoteBatcher();
@@ -0,0 +1,218 @@
+// src/service/readThroughCache.js
+
+const crypto = require('crypto');
+const util = require('util');
+require('dotenv').config();
+
+function envInt(name, fallback) {
+    const value = parseInt(process.env[name]);
+    return Number.isNaN(value) ? fallback : value;
+}
+
+const CACHE_DEFAULTS = {
+    ttl: envInt('QUOTE_CACHE_TTL_MS', 250),           // Upstream responses are reused for this many ms
+    redis: process.env.QUOTE_CACHE_REDIS === 'true',  // Share responses between server instances
+    lockTtl: envInt('QUOTE_CACHE_LOCK_MS', 1000),     // How long one instance may hold the upstream fetch
+    pollInterval: 10,                                 // How often instances waiting on the lock re-check Redis
+    sweepSize: 10000,                                 // Drop expired entries once a route grows past this
+    keyPrefix: 'rtc:'
+};
+
+// Delete the lock only while it still holds our token: once it has lapsed
+// another instance may own it
+const RELEASE_LOCK = `
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+`;
+
+// Read-through cache for the upstream proxy routes. Per route and key it
+// serves a fresh local copy, joins an identical request already in flight
+// (single-flight), or fetches once and keeps the result for a short TTL.
+// With the Redis tier enabled, one instance takes a short lock and fetches
+// while the others wait for the shared copy.
+class ReadThroughCache {
+    constructor(options = {}) {
+        this.settings = { ...CACHE_DEFAULTS, ...options };
+
+        // route -> Map(key -> { value, expiresAt })
+        this._entries = new Map();
+        // route -> Map(key -> in-flight promise)
+        this._inFlight = new Map();
+        // route -> counters
+        this._stats = new Map();
+
+        this.redisClient = null;
+    }
+
+    // Redis client and promisified commands, created on first use
+    getRedis() {
+        if (!this.redisClient) {
+            const redisConfig = require('../config/redisConfig');
+            this.redisClient = redisConfig.getSharedClient();
+            this.redis = {
+                get: util.promisify(this.redisClient.get).bind(this.redisClient),
+                set: util.promisify(this.redisClient.set).bind(this.redisClient),
+                eval: util.promisify(this.redisClient.eval).bind(this.redisClient)
+            };
+        }
+        return this.redis;
+    }
+
+    routeState(route) {
+        if (!this._entries.has(route)) {
+            this._entries.set(route, new Map());
+            this._inFlight.set(route, new Map());
+            this._stats.set(route, {
+                hits: 0,
+                misses: 0,
+                coalesced: 0,      // Joined a request already in flight on this instance
+                sharedHits: 0,     // Served from the Redis tier
+                upstreamCalls: 0,
+                errors: 0
+            });
+        }
+        return {
+            entries: this._entries.get(route),
+            inFlight: this._inFlight.get(route),
+            stats: this._stats.get(route)
+        };
+    }
+
+    sweep(entries, now) {
+        if (entries.size < this.settings.sweepSize) return;
+        for (const [key, entry] of entries) {
+            if (entry.expiresAt <= now) entries.delete(key);
+        }
+    }
+
+    // Resolve to { value, source } where source is HIT, COALESCED, SHARED or MISS
+    async get(route, key, fetch, options = {}) {
+        const ttl = options.ttl !== undefined ? options.ttl : this.settings.ttl;
+        const { entries, inFlight, stats } = this.routeState(route);
+
+        const cached = entries.get(key);
+        if (cached && cached.expiresAt > Date.now()) {
+            stats.hits++;
+            return { value: cached.value, source: 'HIT' };
+        }
+
+        const pending = inFlight.get(key);
+        if (pending) {
+            stats.coalesced++;
+            const { value } = await pending;
+            return { value, source: 'COALESCED' };
+        }
+
+        stats.misses++;
+        const request = this.load(route, key, fetch, ttl, stats)
+            .then((result) => {
+                if (ttl > 0) {
+                    const now = Date.now();
+                    this.sweep(entries, now);
+                    entries.set(key, { value: result.value, expiresAt: now + ttl });
+                }
+                return result;
+            })
+            .catch((error) => {
+                stats.errors++;
+                throw error;
+            })
+            .finally(() => {
+                inFlight.delete(key);
+            });
+
+        inFlight.set(key, request);
+        return request;
+    }
+
+    async load(route, key, fetch, ttl, stats) {
+        if (!this.settings.redis || ttl <= 0) {
+            stats.upstreamCalls++;
+            return { value: await fetch(), source: 'MISS' };
+        }
+
+        const cacheKey = `${this.settings.keyPrefix}${route}:${key}`;
+        const lockKey = `${cacheKey}:lock`;
+        let redis;
+        let lockToken = null;
+        try {
+            redis = this.getRedis();
+            const shared = await redis.get(cacheKey);
+            if (shared !== null) {
+                stats.sharedHits++;
+                return { value: JSON.parse(shared), source: 'SHARED' };
+            }
+
+            const token = crypto.randomBytes(8).toString('hex');
+            const locked = await redis.set(lockKey, token, 'PX', this.settings.lockTtl, 'NX');
+            if (locked) {
+                lockToken = token;
+            } else {
+                // Another instance is fetching; wait for its copy until the lock lapses
+                const deadline = Date.now() + this.settings.lockTtl;
+                while (Date.now() < deadline) {
+                    await new Promise(resolve => setTimeout(resolve, this.settings.pollInterval));
+                    const value = await redis.get(cacheKey);
+                    if (value !== null) {
+                        stats.sharedHits++;
+                        return { value: JSON.parse(value), source: 'SHARED' };
+                    }
+                }
+            }
+        } catch (error) {
+            // The shared tier is best effort; fall through to a direct fetch
+            console.error('Read-through cache Redis error:', error.message);
+            redis = null;
+        }
+
+        stats.upstreamCalls++;
+        try {
+            const value = await fetch();
+            if (redis) {
+                redis.set(cacheKey, JSON.stringify(value), 'PX', ttl)
+                    .catch(error => console.error('Read-through cache Redis error:', error.message));
+            }
+            return { value, source: 'MISS' };
+        } finally {
+            // Also after a failed fetch, so waiting instances fetch themselves
+            // instead of polling out the lock. Commands on one client run in
+            // order, so the shared copy is written before the lock goes.
+            if (lockToken) this.releaseLock(lockKey, lockToken);
+        }
+    }
+
+    releaseLock(lockKey, token) {
+        this.redis.eval(RELEASE_LOCK, 1, lockKey, token)
+            .catch(error => console.error('Read-through cache Redis error:', error.message));
+    }
+
+    // Express helper: serve a cached upstream response and tag it with X-Cache
+    async respond(res, route, key, fetch, options) {
+        const { value, source } = await this.get(route, key, fetch, options);
+        res.set('X-Cache', source);
+        res.json(value);
+    }
+
+    getStats(route) {
+        if (route) {
+            return this._stats.has(route) ? { ...this._stats.get(route) } : null;
+        }
+        const stats = {};
+        for (const [name, counters] of this._stats) {
+            stats[name] = { ...counters, entries: this._entries.get(name).size };
+        }
+        return stats;
+    }
+
+    clear(route) {
+        if (route) {
+            if (this._entries.has(route)) this._entries.get(route).clear();
+            return;
+        }
+        for (const entries of this._entries.values()) entries.clear();
+    }
+}
+
+module.exports = new ReadThroughCache();
@@ -1,96 +1,37 @@
-const axios = require('axios');
+const dhanHttpClient = require('../config/dhanHttpClient');
+const orderScheduler = require('./orderScheduler');
+const { validateSliceOrder } = require('../validation/orderSchemas');
 require('dotenv').config();
 
-// Validation constants
-const ORDER_TYPES = {
-    TRANSACTION_TYPES: ['BUY', 'SELL'],
-    EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO', 'MCX_COMM'],
-    PRODUCT_TYPES: ['CNC', 'INTRADAY', 'MARGIN', 'MTF', 'CO', 'BO'],
-    ORDER_TYPES: ['LIMIT', 'MARKET', 'STOP_LOSS', 'STOP_LOSS_MARKET'],
-    VALIDITY_TYPES: ['DAY', 'IOC'],
-    AMO_TIMES: ['OPEN', 'OPEN_30', 'OPEN_60', 'PRE_OPEN']
+// Local slicing settings
+const LOCAL_SLICE_DEFAULTS = {
+    maxWaitMs: parseInt(process.env.SLICE_ORDER_MAX_WAIT_MS) || 60000  // Refuse slices the order budget can't place sooner
 };
 
 class SliceOrderService {
-    constructor() {
+    constructor(account = {}) {
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
-        this.dhanClientId = process.env.DHAN_CLIENT_ID;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
+        this.dhanClientId = account.dhanClientId || process.env.DHAN_CLIENT_ID;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'Content-Type': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
+
+        // Orders of one account share one budget
+        this.scheduler = account.scheduler || orderScheduler;
     }
 
     validateSliceOrderParams(params) {
-        const errors = [];
-
-        // Required field validations
-        if (!params.transactionType || !ORDER_TYPES.TRANSACTION_TYPES.includes(params.transactionType)) {
-            errors.push('Invalid or missing transactionType. Must be BUY or SELL');
-        }
-
-        if (!params.exchangeSegment || !ORDER_TYPES.EXCHANGE_SEGMENTS.includes(params.exchangeSegment)) {
-            errors.push('Invalid or missing exchangeSegment');
-        }
-
-        if (!params.productType || !ORDER_TYPES.PRODUCT_TYPES.includes(params.productType)) {
-            errors.push('Invalid or missing productType');
-        }
-
-        if (!params.orderType || !ORDER_TYPES.ORDER_TYPES.includes(params.orderType)) {
-            errors.push('Invalid or missing orderType');
-        }
-
-        if (!params.validity || !ORDER_TYPES.VALIDITY_TYPES.includes(params.validity)) {
-            errors.push('Invalid or missing validity');
-        }
-
-        if (!params.securityId) {
-            errors.push('Missing securityId');
-        }
-
-        // Numeric validations
-        if (!Number.isInteger(params.quantity)) {
-            errors.push('Quantity must be an integer');
-        }
-
-        if (params.disclosedQuantity && !Number.isInteger(params.disclosedQuantity)) {
-            errors.push('Disclosed quantity must be an integer');
-        }
-
-        if (params.price && typeof params.price !== 'number') {
-            errors.push('Price must be a number');
-        }
-
-        if (params.triggerPrice && typeof params.triggerPrice !== 'number') {
-            errors.push('Trigger price must be a number');
-        }
-
-        // AMO validations
-        if (params.afterMarketOrder && params.amoTime && !ORDER_TYPES.AMO_TIMES.includes(params.amoTime)) {
-            errors.push('Invalid amoTime');
-        }
+        return validateSliceOrder(params);
+    }
 
-        // BO validations
-        if (params.productType === 'BO') {
-            if (typeof params.boProfitValue !== 'number') {
-                errors.push('boProfitValue must be a number for BO orders');
-            }
-            if (typeof params.boStopLossValue !== 'number') {
-                errors.push('boStopLossValue must be a number for BO orders');
-            }
+    async placeSliceOrder(orderParams, options = {}) {
+        if (options.local) {
+            return this.placeLocalSliceOrder(orderParams, options);
         }
 
-        return errors;
-    }
-
-    async placeSliceOrder(orderParams) {
         try {
             // Generate correlation ID if not provided
             const correlationId = orderParams.correlationId || `SLICE_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
@@ -108,7 +49,7 @@ class SliceOrderService {
             }
 
             // Make API call to place slice order
-            const response = await this.api.post('/orders/slicing', params);
+            const response = await this.scheduler.schedule(() => this.api.post('/orders/slicing', params), options);
             return response.data;
 
         } catch (error) {
@@ -119,6 +60,119 @@ class SliceOrderService {
         }
     }
 
+    // Split quantity into children no larger than freezeQuantity, rounded down to whole lots
+    splitQuantity(quantity, freezeQuantity, lotSize = 1) {
+        const maxChild = Math.floor(freezeQuantity / lotSize) * lotSize;
+        if (maxChild <= 0) {
+            throw new Error('freezeQuantity must be at least one lot');
+        }
+        if (quantity % lotSize !== 0) {
+            throw new Error(`Quantity ${quantity} is not a multiple of lot size ${lotSize}`);
+        }
+
+        const sizes = [];
+        for (let remaining = quantity; remaining > 0; remaining -= maxChild) {
+            sizes.push(Math.min(remaining, maxChild));
+        }
+        return sizes;
+    }
+
+    // Slice locally: place freeze-quantity children through /orders instead of
+    // one /orders/slicing call. Children go out concurrently under the order
+    // budget (via the order scheduler), each with correlationId
+    // `<parent>_<n>` (a parent id is generated when none is given), and
+    // options.onChild is called as each one completes.
+    // Every child costs one order of the account budget (5 a day with the
+    // defaults in Config.js): a slice the budget can't place within
+    // options.maxWaitMs is refused with 429 before any child is sent.
+    async placeLocalSliceOrder(orderParams, options = {}) {
+        const settings = { ...LOCAL_SLICE_DEFAULTS, ...options };
+        const freezeQuantity = options.freezeQuantity || orderParams.freezeQuantity;
+        if (!freezeQuantity) {
+            throw new Error('freezeQuantity is required for local slicing');
+        }
+
+        const correlationId = orderParams.correlationId || `SLICE_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
+        const params = {
+            dhanClientId: orderParams.dhanClientId || this.dhanClientId,
+            correlationId,
+            ...orderParams
+        };
+        delete params.freezeQuantity;
+
+        const validationErrors = this.validateSliceOrderParams(params);
+        if (validationErrors.length > 0) {
+            throw new Error(`Validation failed: ${validationErrors.join(', ')}`);
+        }
+
+        const sizes = this.splitQuantity(params.quantity, freezeQuantity, options.lotSize || orderParams.lotSize || 1);
+
+        // When the last child would go out, behind the orders already queued
+        const now = Date.now();
+        const finishAt = this.scheduler.slotTime(now, this.scheduler.queuedAhead(options.lane || 'entry') + sizes.length - 1);
+        if (finishAt - now > settings.maxWaitMs) {
+            const error = new Error(`Slice order placement failed: the order budget can't place ${sizes.length} `
+                + `child orders within ${settings.maxWaitMs}ms; raise freezeQuantity or use /orders/slicing`);
+            error.status = 429;
+            throw error;
+        }
+
+        const startedAt = Date.now();
+        const summary = {
+            correlationId,
+            quantity: params.quantity,
+            children: sizes.length,
+            placed: 0,
+            failed: 0,
+            placedQuantity: 0,
+            failedQuantity: 0,
+            statuses: {},
+            results: new Array(sizes.length)
+        };
+
+        await Promise.all(sizes.map(async (quantity, index) => {
+            const child = {
+                ...params,
+                quantity,
+                correlationId: `${correlationId}_${index + 1}`
+            };
+            delete child.lotSize;
+            if (child.disclosedQuantity) {
+                child.disclosedQuantity = Math.min(child.disclosedQuantity, quantity);
+            }
+
+            let result;
+            try {
+                const response = await this.scheduler.schedule(() => this.api.post('/orders', child), {
+                    lane: options.lane,
+                    label: child.correlationId
+                });
+                result = { index, correlationId: child.correlationId, quantity, status: 'placed', data: response.data };
+                summary.placed++;
+                summary.placedQuantity += quantity;
+                const orderStatus = response.data && response.data.orderStatus;
+                if (orderStatus) {
+                    summary.statuses[orderStatus] = (summary.statuses[orderStatus] || 0) + 1;
+                }
+            } catch (error) {
+                const message = error.response
+                    ? (error.response.data && error.response.data.message) || error.response.statusText
+                    : error.message;
+                result = { index, correlationId: child.correlationId, quantity, status: 'failed', error: message };
+                summary.failed++;
+                summary.failedQuantity += quantity;
+            }
+
+            summary.results[index] = result;
+            if (options.onChild) {
+                options.onChild(result, summary);
+            }
+        }));
+
+        summary.durationMs = Date.now() - startedAt;
+        return summary;
+    }
+
     // Helper methods for common slice order types
     async placeLimitSliceOrder(params) {
         return this.placeSliceOrder({
@@ -1,4 +1,5 @@
-const axios = require('axios');
+const { EventEmitter } = require('events');
+const dhanHttpClient = require('../config/dhanHttpClient');
 require('dotenv').config();
 
 // Constants for validation
@@ -10,18 +11,23 @@ const TRADE_CONSTANTS = {
     OPTION_TYPES: ['CALL', 'PUT', 'NA']
 };
 
-class TradesService {
-    constructor() {
+class TradesService extends EventEmitter {
+    constructor(account = {}) {
+        super();
         this.baseURL = process.env.DHAN_API_URL || 'https://api.dhan.co/v2';
-        this.accessToken = process.env.DHAN_ACCESS_TOKEN;
+        this.accessToken = account.accessToken || process.env.DHAN_ACCESS_TOKEN;
         
-        this.api = axios.create({
+        this.api = dhanHttpClient.createApi({
             baseURL: this.baseURL,
-            headers: {
-                'Accept': 'application/json',
-                'access-token': this.accessToken
-            }
+            accessToken: this.accessToken
         });
+
+        // Incremental sync state: exchangeTradeId -> { fingerprint, trade, seenIn }
+        this._tradeIndex = new Map();
+        this._tradesByOrderId = new Map();
+        this._tradesBySecurityId = new Map();
+        this._syncGeneration = 0;
+        this._lastSync = null;
     }
 
     validateTradeData(trade) {
@@ -67,7 +73,115 @@ class TradesService {
         };
     }
 
-    async getAllTrades() {
+    // Cheap identity of a raw row; a trade is only re-validated and
+    // re-transformed when this changes
+    tradeFingerprint(trade) {
+        return `${trade.orderId}|${trade.tradedQuantity}|${trade.tradedPrice}|${trade.updateTime}|${trade.exchangeTime}`;
+    }
+
+    addToLookup(lookup, key, tradeId) {
+        let ids = lookup.get(key);
+        if (!ids) {
+            ids = new Set();
+            lookup.set(key, ids);
+        }
+        ids.add(tradeId);
+    }
+
+    removeFromLookup(lookup, key, tradeId) {
+        const ids = lookup.get(key);
+        if (!ids) return;
+        ids.delete(tradeId);
+        if (ids.size === 0) lookup.delete(key);
+    }
+
+    indexTrade(tradeId, fingerprint, trade, previous) {
+        if (previous) {
+            this.removeFromLookup(this._tradesByOrderId, previous.trade.orderId, tradeId);
+            this.removeFromLookup(this._tradesBySecurityId, previous.trade.securityId, tradeId);
+        }
+        this._tradeIndex.set(tradeId, { fingerprint, trade, seenIn: this._syncGeneration });
+        this.addToLookup(this._tradesByOrderId, trade.orderId, tradeId);
+        this.addToLookup(this._tradesBySecurityId, trade.securityId, tradeId);
+    }
+
+    // Fetch the trade book and only transform trades that are new or changed.
+    // Emits 'tradeAdded', 'tradeUpdated' and 'tradeRemoved'.
+    async syncTrades() {
+        try {
+            const response = await this.api.get('/trades');
+
+            if (!Array.isArray(response.data)) {
+                throw new Error('Invalid response format: Expected array of trades');
+            }
+
+            const generation = ++this._syncGeneration;
+            const changes = { added: [], updated: [], removed: [] };
+
+            for (const raw of response.data) {
+                const tradeId = raw && raw.exchangeTradeId;
+                if (!tradeId) continue;
+
+                const fingerprint = this.tradeFingerprint(raw);
+                const known = this._tradeIndex.get(tradeId);
+                if (known && known.fingerprint === fingerprint) {
+                    known.seenIn = generation;
+                    continue;
+                }
+
+                if (!this.validateTradeData(raw)) {
+                    // Still at Dhan: keep the last valid version rather than sweep it
+                    if (known) known.seenIn = generation;
+                    continue;
+                }
+
+                const trade = this.transformTradeData(raw);
+                this.indexTrade(tradeId, fingerprint, trade, known);
+
+                if (known) {
+                    changes.updated.push(trade);
+                    this.emit('tradeUpdated', trade, known.trade);
+                } else {
+                    changes.added.push(trade);
+                    this.emit('tradeAdded', trade);
+                }
+            }
+
+            // Trades that disappeared upstream (e.g. after the daily reset)
+            for (const [tradeId, entry] of this._tradeIndex) {
+                if (entry.seenIn === generation) continue;
+                this._tradeIndex.delete(tradeId);
+                this.removeFromLookup(this._tradesByOrderId, entry.trade.orderId, tradeId);
+                this.removeFromLookup(this._tradesBySecurityId, entry.trade.securityId, tradeId);
+                changes.removed.push(entry.trade);
+                this.emit('tradeRemoved', entry.trade);
+            }
+
+            this._lastSync = Date.now();
+            return changes;
+
+        } catch (error) {
+            const errorMessage = error.response?.data?.message || error.message;
+            throw new Error(`Failed to sync trades: ${errorMessage}`);
+        }
+    }
+
+    getTradesByOrderId(orderId) {
+        const ids = this._tradesByOrderId.get(orderId);
+        return ids ? [...ids].map(id => this._tradeIndex.get(id).trade) : [];
+    }
+
+    getTradesBySecurityId(securityId) {
+        const ids = this._tradesBySecurityId.get(securityId);
+        return ids ? [...ids].map(id => this._tradeIndex.get(id).trade) : [];
+    }
+
+    async getAllTrades(options = {}) {
+        if (options.incremental) {
+            await this.syncTrades();
+            return [...this._tradeIndex.values()].map(entry => entry.trade);
+        }
+
         try {
             const response = await this.api.get('/trades');
             
@@ -93,6 +207,12 @@ class TradesService {
             throw new Error('Order ID is required');
         }
 
+        // Answer from the synced index when the order has a single known trade
+        const known = this._tradesByOrderId.get(orderId);
+        if (known && known.size === 1) {
+            return this.getTradesByOrderId(orderId)[0];
+        }
+
         try {
             const response = await this.api.get(`/trades/${orderId}`);
             
@@ -0,0 +1,291 @@
+// src/service/triggerBook.js
+
+const { EventEmitter } = require('events');
+require('dotenv').config();
+
+const TRIGGER_BOOK_DEFAULTS = {
+    nearPercent: parseFloat(process.env.TRIGGER_NEAR_PCT) || 1   // "Near" band around the price, in percent
+};
+
+// Forever order legs carry their trigger in one of these fields
+const TRIGGER_FIELDS = ['triggerPrice', 'triggerPrice1'];
+
+// Statuses whose triggers can still fire
+const RESTING_STATUSES = new Set(['TRANSIT', 'PENDING', 'CONFIRM']);
+
+// First index whose price is >= value
+function lowerBound(prices, value) {
+    let lo = 0;
+    let hi = prices.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (prices[mid] < value) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+}
+
+// First index whose price is > value
+function upperBound(prices, value) {
+    let lo = 0;
+    let hi = prices.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (prices[mid] <= value) lo = mid + 1;
+        else hi = mid;
+    }
+    return lo;
+}
+
+// Legs of one security and one trigger field, sorted by trigger price.
+// Inserts and removals only mark it dirty; it is re-sorted on the next query,
+// so loading thousands of orders costs one sort, not one splice each.
+class TriggerSide {
+    constructor() {
+        this.legs = new Map();           // leg key -> leg
+        this.prices = new Float64Array(0);
+        this.sorted = [];                // legs in the same order as prices
+        this.dirty = false;
+    }
+
+    add(key, leg) {
+        this.legs.set(key, leg);
+        this.dirty = true;
+    }
+
+    delete(key) {
+        if (this.legs.delete(key)) this.dirty = true;
+    }
+
+    rebuild() {
+        this.sorted = [...this.legs.values()].sort((a, b) => a.triggerPrice - b.triggerPrice);
+        this.prices = Float64Array.from(this.sorted, leg => leg.triggerPrice);
+        this.dirty = false;
+    }
+
+    // Legs with lo <= triggerPrice <= hi, appended to out
+    range(lo, hi, out) {
+        if (this.dirty) this.rebuild();
+        const end = upperBound(this.prices, hi);
+        for (let i = lowerBound(this.prices, lo); i < end; i++) {
+            out.push(this.sorted[i]);
+        }
+        return out;
+    }
+}
+
+// In-memory index of resting GTT/OCO triggers, keyed by securityId with one
+// price-sorted side per trigger field. Queries are two binary searches per
+// side, so a tick costs O(log n) plus the legs it returns.
+// Emits 'triggers' with [{ securityId, price, near, crossed }] after each
+// price update that finds something.
+class TriggerBook extends EventEmitter {
+    constructor(options = {}) {
+        super();
+        this.settings = { ...TRIGGER_BOOK_DEFAULTS, ...options };
+
+        // securityId -> { triggerPrice: TriggerSide, triggerPrice1: TriggerSide }
+        this._securities = new Map();
+        // orderId -> [{ securityId, field, key }]
+        this._orders = new Map();
+        // securityId -> last price seen, to find triggers crossed between ticks
+        this._lastPrices = new Map();
+        // tradingSymbol -> securityId of the orders added, for feeds keyed by symbol
+        this._symbols = new Map();
+
+        this._feed = null;
+        this._onQuotes = null;
+        this._attached = false;
+        this.size = 0;
+    }
+
+    // Trigger legs of a forever order: from placement params plus the response,
+    // or a row of GET /forever/orders (one row per leg or one row with both)
+    legsOf(order) {
+        const legs = [];
+        for (const field of TRIGGER_FIELDS) {
+            const triggerPrice = parseFloat(order[field]);
+            if (!(triggerPrice > 0)) continue;
+
+            const second = field === 'triggerPrice1';
+            legs.push({
+                orderId: String(order.orderId),
+                securityId: String(order.securityId),
+                exchangeSegment: order.exchangeSegment,
+                transactionType: order.transactionType,
+                orderFlag: order.orderFlag || order.orderType,
+                legName: second ? null : order.legName || null,
+                field,
+                triggerPrice,
+                price: parseFloat(second ? order.price1 : order.price) || 0,
+                quantity: parseInt(second ? order.quantity1 : order.quantity) || 0
+            });
+        }
+        return legs;
+    }
+
+    side(securityId, field) {
+        let sides = this._securities.get(securityId);
+        if (!sides) {
+            sides = { triggerPrice: new TriggerSide(), triggerPrice1: new TriggerSide() };
+            this._securities.set(securityId, sides);
+        }
+        return sides[field];
+    }
+
+    // Add the legs of one order (list rows of the same order accumulate)
+    addLegs(order) {
+        if (order.orderStatus && !RESTING_STATUSES.has(order.orderStatus)) return 0;
+
+        const legs = this.legsOf(order);
+        if (legs.length > 0 && order.tradingSymbol) {
+            this._symbols.set(String(order.tradingSymbol), String(order.securityId));
+        }
+        for (const leg of legs) {
+            const key = `${leg.orderId}:${leg.field}:${leg.legName || ''}`;
+            if (!this._orders.has(leg.orderId)) this._orders.set(leg.orderId, []);
+            const entries = this._orders.get(leg.orderId);
+            if (!entries.some(entry => entry.key === key)) {
+                entries.push({ securityId: leg.securityId, field: leg.field, key });
+                this.size++;
+            }
+            this.side(leg.securityId, leg.field).add(key, leg);
+        }
+        if (legs.length > 0) this.attach();
+        return legs.length;
+    }
+
+    // Add or replace an order, e.g. right after placing it
+    addOrder(order) {
+        this.removeOrder(order.orderId);
+        return this.addLegs(order);
+    }
+
+    removeOrder(orderId) {
+        const entries = this._orders.get(String(orderId));
+        if (!entries) return false;
+        for (const { securityId, field, key } of entries) {
+            const sides = this._securities.get(securityId);
+            sides[field].delete(key);
+            if (sides.triggerPrice.legs.size === 0 && sides.triggerPrice1.legs.size === 0) {
+                this._securities.delete(securityId);
+            }
+        }
+        this.size -= entries.length;
+        this._orders.delete(String(orderId));
+        return true;
+    }
+
+    // Replace the whole book with a forever order list
+    load(orders) {
+        this.clear();
+        for (const order of orders) {
+            this.addLegs(order);
+        }
+        return this.size;
+    }
+
+    clear() {
+        this._securities.clear();
+        this._orders.clear();
+        this._symbols.clear();
+        this.size = 0;
+    }
+
+    // Legs of securityId with a trigger between lo and hi (inclusive)
+    between(securityId, lo, hi) {
+        const sides = this._securities.get(String(securityId));
+        const out = [];
+        if (!sides) return out;
+        const min = Math.min(lo, hi);
+        const max = Math.max(lo, hi);
+        for (const field of TRIGGER_FIELDS) {
+            sides[field].range(min, max, out);
+        }
+        return out;
+    }
+
+    // Legs that trigger within `percent` of price
+    near(securityId, price, percent = this.settings.nearPercent) {
+        const band = price * percent / 100;
+        return this.between(securityId, price - band, price + band);
+    }
+
+    // Apply a batch of prices: an object or Map of securityId -> price, or an
+    // array of [securityId, price]. Returns the securities with legs near the
+    // new price or crossed since the previous one.
+    updatePrices(updates, percent = this.settings.nearPercent) {
+        const entries = Array.isArray(updates) ? updates
+            : updates instanceof Map ? updates.entries() : Object.entries(updates);
+        const results = [];
+
+        for (const [id, value] of entries) {
+            const price = Number(value);
+            if (!(price > 0)) continue;
+            const securityId = String(id);
+            const previous = this._lastPrices.get(securityId);
+            this._lastPrices.set(securityId, price);
+            if (!this._securities.has(securityId)) continue;
+
+            const near = this.near(securityId, price, percent);
+            const crossed = previous === undefined || previous === price ? [] : this.between(securityId, previous, price);
+            if (near.length > 0 || crossed.length > 0) {
+                results.push({ securityId, price, near, crossed });
+            }
+        }
+
+        if (results.length > 0) this.emit('triggers', results);
+        return results;
+    }
+
+    // securityId a feed entry is for: the quote's own securityId field, else
+    // its key, resolved through the trading symbols of the orders in the book
+    securityIdOf(quote, key) {
+        const securityId = quote.securityId ?? quote.security_id;
+        if (securityId !== undefined && securityId !== null) return String(securityId);
+        return this._symbols.get(String(key)) || String(key);
+    }
+
+    // Take prices from a quote source that emits 'quotes' with a Map of
+    // symbol or securityId -> quote (e.g. the quote batcher, keyed by the
+    // requested symbol). Listening starts once the book holds a trigger.
+    setQuoteFeed(feed, priceOf = quote => quote.last_price ?? quote.lastPrice ?? quote.LTP) {
+        this.detach();
+        this._feed = feed;
+        this._onQuotes = (quotes) => {
+            const prices = [];
+            for (const [key, quote] of quotes) {
+                if (!quote) continue;
+                const securityId = this.securityIdOf(quote, key);
+                if (this._securities.has(securityId)) prices.push([securityId, priceOf(quote)]);
+            }
+            if (prices.length > 0) this.updatePrices(prices);
+        };
+        if (this.size > 0) this.attach();
+    }
+
+    attach() {
+        if (this._feed && !this._attached) {
+            this._feed.on('quotes', this._onQuotes);
+            this._attached = true;
+        }
+    }
+
+    detach() {
+        if (this._feed && this._attached) {
+            this._feed.removeListener('quotes', this._onQuotes);
+            this._attached = false;
+        }
+    }
+
+    getStats() {
+        return {
+            legs: this.size,
+            orders: this._orders.size,
+            securities: this._securities.size,
+            nearPercent: this.settings.nearPercent
+        };
+    }
+}
+
+module.exports = TriggerBook;
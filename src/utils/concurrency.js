@@ -0,0 +1,26 @@
+// src/utils/concurrency.js
+
+// Run fn over items with at most `limit` calls in flight.
+// Results keep the order of items; the first rejection rejects the whole run.
+async function mapWithConcurrency(items, limit, fn) {
+    const results = new Array(items.length);
+    let next = 0;
+
+    const worker = async () => {
+        while (next < items.length) {
+            const index = next++;
+            results[index] = await fn(items[index], index);
+        }
+    };
+
+    const workers = [];
+    for (let i = 0; i < Math.min(Math.max(1, limit), items.length); i++) {
+        workers.push(worker());
+    }
+    await Promise.all(workers);
+    return results;
+}
+
+module.exports = {
+    mapWithConcurrency
+};
@@ -0,0 +1,44 @@
+// src/utils/retry.js
+
+// Network failures worth retrying when there is no HTTP status
+const RETRYABLE_CODES = ['ECONNRESET', 'ECONNREFUSED', 'ECONNABORTED', 'ETIMEDOUT', 'EAI_AGAIN', 'EPIPE'];
+
+// 429s, 5xx responses and transient network errors
+function isRetryableError(error) {
+    const status = error.status || (error.response && error.response.status);
+    if (status) {
+        return status === 429 || status >= 500;
+    }
+    return RETRYABLE_CODES.includes(error.code);
+}
+
+// Call fn until it succeeds, retrying retryable errors with exponential backoff and jitter
+async function retryWithBackoff(fn, options = {}) {
+    const {
+        retries = 3,
+        baseDelay = 500,
+        maxDelay = 10000,
+        shouldRetry = isRetryableError,
+        onRetry = null
+    } = options;
+
+    for (let attempt = 0; ; attempt++) {
+        try {
+            return await fn(attempt);
+        } catch (error) {
+            if (attempt >= retries || !shouldRetry(error)) {
+                throw error;
+            }
+            // Never sooner than a Retry-After from Dhan or the upstream guard
+            const backoff = Math.min(maxDelay, baseDelay * 2 ** attempt) * (0.5 + Math.random() / 2);
+            const delay = Math.max(backoff, Math.min(maxDelay, error.retryAfter || 0));
+            if (onRetry) onRetry(error, attempt + 1, delay);
+            await new Promise(resolve => setTimeout(resolve, delay));
+        }
+    }
+}
+
+module.exports = {
+    isRetryableError,
+    retryWithBackoff
+};
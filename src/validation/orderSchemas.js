@@ -0,0 +1,174 @@
+// src/validation/orderSchemas.js
+
+const {
+    compileSchema,
+    requiredEnum,
+    optionalEnum,
+    required,
+    optionalInteger,
+    optionalNumber
+} = require('./schema');
+const metrics = require('../metrics');
+
+// Validation constants
+const ORDER_TYPES = {
+    TRANSACTION_TYPES: ['BUY', 'SELL'],
+    EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO', 'MCX_COMM'],
+    PRODUCT_TYPES: ['CNC', 'INTRADAY', 'MARGIN', 'MTF', 'CO', 'BO'],
+    ORDER_TYPES: ['LIMIT', 'MARKET', 'STOP_LOSS', 'STOP_LOSS_MARKET'],
+    VALIDITY_TYPES: ['DAY', 'IOC'],
+    AMO_TIMES: ['OPEN', 'OPEN_30', 'OPEN_60', 'PRE_OPEN']
+};
+
+const FOREVER_ORDER_TYPES = {
+    ORDER_FLAGS: ['SINGLE', 'OCO'],
+    TRANSACTION_TYPES: ['BUY', 'SELL'],
+    EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO'],
+    PRODUCT_TYPES: ['CNC', 'MTF', 'MARGIN'],
+    ORDER_TYPES: ['LIMIT', 'MARKET']
+};
+
+const POSITION_TYPES = {
+    PRODUCT_TYPES: ['CNC', 'INTRADAY', 'MARGIN', 'MTF', 'CO', 'BO'],
+    EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO', 'MCX_COMM'],
+    POSITION_TYPES: ['LONG', 'SHORT', 'CLOSED']
+};
+
+const MARGIN_CONSTANTS = {
+    EXCHANGE_SEGMENTS: ['NSE_EQ', 'NSE_FNO', 'BSE_EQ', 'BSE_FNO', 'MCX_COMM'],
+    TRANSACTION_TYPES: ['BUY', 'SELL'],
+    PRODUCT_TYPES: ['CNC', 'INTRADAY', 'MARGIN', 'MTF', 'CO', 'BO']
+};
+
+// Valid product type conversion paths
+// A Map, so inherited names such as 'constructor' are not product types
+const VALID_CONVERSIONS = new Map([
+    ['INTRADAY', new Set(['CNC', 'MARGIN'])],
+    ['CNC', new Set(['INTRADAY', 'MTF'])],
+    ['MARGIN', new Set(['INTRADAY'])],
+    ['MTF', new Set(['CNC'])],
+    ['CO', new Set(['INTRADAY'])],
+    ['BO', new Set(['INTRADAY'])]
+]);
+
+function isValidConversion(fromType, toType) {
+    const targets = VALID_CONVERSIONS.get(fromType);
+    return targets !== undefined && targets.has(toType);
+}
+
+// Validation time per schema when metrics are enabled; the bare validator otherwise
+function timedValidator(schema, validate) {
+    return metrics.timed(validate, 'validation_duration_ms', { schema }, 'Order parameter validation time');
+}
+
+const validatePlaceOrder = timedValidator('placeOrder', compileSchema([
+    requiredEnum('transactionType', ORDER_TYPES.TRANSACTION_TYPES, 'Invalid or missing transactionType. Must be BUY or SELL'),
+    requiredEnum('exchangeSegment', ORDER_TYPES.EXCHANGE_SEGMENTS, 'Invalid or missing exchangeSegment'),
+    optionalEnum('productType', ORDER_TYPES.PRODUCT_TYPES, 'Invalid productType'),
+    requiredEnum('orderType', ORDER_TYPES.ORDER_TYPES, 'Invalid or missing orderType'),
+    requiredEnum('validity', ORDER_TYPES.VALIDITY_TYPES, 'Invalid or missing validity'),
+    optionalEnum('amoTime', ORDER_TYPES.AMO_TIMES, 'Invalid amoTime'),
+    optionalInteger('quantity', 'Quantity must be an integer'),
+    optionalInteger('disclosedQuantity', 'Disclosed quantity must be an integer'),
+    optionalNumber('price', 'Price must be a number'),
+    optionalNumber('triggerPrice', 'Trigger price must be a number')
+]));
+
+const validateSliceOrder = timedValidator('sliceOrder', compileSchema([
+    requiredEnum('transactionType', ORDER_TYPES.TRANSACTION_TYPES, 'Invalid or missing transactionType. Must be BUY or SELL'),
+    requiredEnum('exchangeSegment', ORDER_TYPES.EXCHANGE_SEGMENTS, 'Invalid or missing exchangeSegment'),
+    requiredEnum('productType', ORDER_TYPES.PRODUCT_TYPES, 'Invalid or missing productType'),
+    requiredEnum('orderType', ORDER_TYPES.ORDER_TYPES, 'Invalid or missing orderType'),
+    requiredEnum('validity', ORDER_TYPES.VALIDITY_TYPES, 'Invalid or missing validity'),
+    required('securityId', 'Missing securityId'),
+    { check: 'Number.isInteger(p.quantity)', message: 'Quantity must be an integer' },
+    optionalInteger('disclosedQuantity', 'Disclosed quantity must be an integer'),
+    optionalNumber('price', 'Price must be a number'),
+    optionalNumber('triggerPrice', 'Trigger price must be a number'),
+    {
+        check: '!(p.afterMarketOrder && p.amoTime) || amoTimes.has(p.amoTime)',
+        scope: { amoTimes: new Set(ORDER_TYPES.AMO_TIMES) },
+        message: 'Invalid amoTime'
+    },
+    { check: "p.productType !== 'BO' || typeof p.boProfitValue === 'number'", message: 'boProfitValue must be a number for BO orders' },
+    { check: "p.productType !== 'BO' || typeof p.boStopLossValue === 'number'", message: 'boStopLossValue must be a number for BO orders' }
+]));
+
+const validateForeverOrder = timedValidator('foreverOrder', compileSchema([
+    requiredEnum('orderFlag', FOREVER_ORDER_TYPES.ORDER_FLAGS, 'Invalid or missing orderFlag. Must be SINGLE or OCO'),
+    requiredEnum('transactionType', FOREVER_ORDER_TYPES.TRANSACTION_TYPES, 'Invalid or missing transactionType. Must be BUY or SELL'),
+    requiredEnum('exchangeSegment', FOREVER_ORDER_TYPES.EXCHANGE_SEGMENTS, 'Invalid or missing exchangeSegment'),
+    requiredEnum('productType', FOREVER_ORDER_TYPES.PRODUCT_TYPES, 'Invalid or missing productType'),
+    requiredEnum('orderType', FOREVER_ORDER_TYPES.ORDER_TYPES, 'Invalid or missing orderType'),
+    required('validity', 'Missing validity'),
+    required('securityId', 'Missing securityId'),
+    { check: 'Number.isInteger(p.quantity) && p.quantity > 0', message: 'Quantity must be a positive integer' },
+    optionalInteger('disclosedQuantity', 'Disclosed quantity must be an integer'),
+    optionalNumber('price', 'Price must be a number'),
+    optionalNumber('triggerPrice', 'Trigger price must be a number'),
+    // OCO specific validations
+    { check: "p.orderFlag !== 'OCO' || typeof p.price1 === 'number'", message: 'price1 must be a number for OCO orders' },
+    { check: "p.orderFlag !== 'OCO' || typeof p.triggerPrice1 === 'number'", message: 'triggerPrice1 must be a number for OCO orders' },
+    {
+        check: "p.orderFlag !== 'OCO' || (Number.isInteger(p.quantity1) && p.quantity1 > 0)",
+        message: 'quantity1 must be a positive integer for OCO orders'
+    },
+    // Disclosed quantity (30% rule)
+    {
+        check: '!p.disclosedQuantity || !(p.disclosedQuantity < p.quantity * 0.3)',
+        message: 'Disclosed quantity must be at least 30% of the total quantity'
+    }
+]));
+
+const validatePositionConversion = timedValidator('positionConversion', compileSchema([
+    requiredEnum('fromProductType', POSITION_TYPES.PRODUCT_TYPES, 'Invalid or missing fromProductType'),
+    requiredEnum('toProductType', POSITION_TYPES.PRODUCT_TYPES, 'Invalid or missing toProductType'),
+    requiredEnum('exchangeSegment', POSITION_TYPES.EXCHANGE_SEGMENTS, 'Invalid or missing exchangeSegment'),
+    requiredEnum('positionType', POSITION_TYPES.POSITION_TYPES, 'Invalid or missing positionType'),
+    required('securityId', 'Missing securityId'),
+    { check: 'Number.isInteger(p.convertQty) && p.convertQty > 0', message: 'convertQty must be a positive integer' },
+    { check: 'p.fromProductType !== p.toProductType', message: 'fromProductType and toProductType cannot be the same' },
+    {
+        check: 'isValidConversion(p.fromProductType, p.toProductType)',
+        scope: { isValidConversion },
+        message: 'Invalid product type conversion combination'
+    }
+]));
+
+const validateMargin = timedValidator('margin', compileSchema([
+    required('dhanClientId', 'dhanClientId is required'),
+    requiredEnum('exchangeSegment', MARGIN_CONSTANTS.EXCHANGE_SEGMENTS,
+        `Invalid exchangeSegment. Must be one of: ${MARGIN_CONSTANTS.EXCHANGE_SEGMENTS.join(', ')}`),
+    requiredEnum('transactionType', MARGIN_CONSTANTS.TRANSACTION_TYPES, 'Invalid transactionType. Must be either BUY or SELL'),
+    { check: "typeof p.quantity === 'number' && p.quantity > 0", message: 'Quantity must be a positive number' },
+    optionalEnum('productType', MARGIN_CONSTANTS.PRODUCT_TYPES,
+        `Invalid productType. Must be one of: ${MARGIN_CONSTANTS.PRODUCT_TYPES.join(', ')}`),
+    required('securityId', 'securityId is required'),
+    { check: "typeof p.price === 'number' && p.price > 0", message: 'Price must be a positive number' },
+    {
+        check: "p.triggerPrice === undefined || (typeof p.triggerPrice === 'number' && p.triggerPrice >= 0)",
+        message: 'Trigger price must be a non-negative number'
+    },
+    // Product type compatibility checks
+    {
+        check: "(p.productType !== 'CO' && p.productType !== 'BO') || p.triggerPrice !== undefined",
+        message: 'Trigger price is required for CO and BO orders'
+    },
+    {
+        check: "p.productType !== 'CNC' || !p.exchangeSegment || p.exchangeSegment.includes('EQ')",
+        message: 'CNC product type is only valid for equity segments'
+    }
+]));
+
+module.exports = {
+    ORDER_TYPES,
+    FOREVER_ORDER_TYPES,
+    POSITION_TYPES,
+    MARGIN_CONSTANTS,
+    isValidConversion,
+    validatePlaceOrder,
+    validateSliceOrder,
+    validateForeverOrder,
+    validatePositionConversion,
+    validateMargin
+};
@@ -0,0 +1,79 @@
+// src/validation/schema.js
+
+// Shared result for valid input, so the valid path allocates nothing.
+// Callers only read it (length / join), never push into it.
+const NO_ERRORS = Object.freeze([]);
+
+// Compile a list of rules into a validator function, once at startup.
+//
+// Each rule is { check, message, scope }: check is a JS expression over the
+// params object `p` that is true when the rule passes, and scope holds any
+// values the expression refers to (e.g. a Set of allowed values). The rules
+// are generated into one straight-line function, so the valid path is a
+// sequence of inline checks returning NO_ERRORS; messages are only collected,
+// by a second generated function, once a rule has failed.
+function compileSchema(rules) {
+    const scope = {};
+    const messages = [];
+    const checks = rules.map((rule, index) => {
+        let check = rule.check;
+        for (const [name, value] of Object.entries(rule.scope || {})) {
+            const scopedName = `${name}_${index}`;
+            scope[scopedName] = value;
+            check = check.replace(new RegExp(`\\b${name}\\b`, 'g'), scopedName);
+        }
+        messages.push(rule.message);
+        return check;
+    });
+
+    const scopeNames = Object.keys(scope);
+    const scopeValues = scopeNames.map(name => scope[name]);
+
+    const collectBody = [
+        'const errors = [];',
+        ...checks.map((check, i) => `if (!(${check})) errors.push(messages[${i}]);`),
+        'return errors;'
+    ].join('\n');
+    const collectErrors = new Function(...scopeNames, 'messages', `return function collectErrors(p) {\n${collectBody}\n};`)(
+        ...scopeValues, messages);
+
+    const validateBody = [
+        ...checks.map(check => `if (!(${check})) return collectErrors(p);`),
+        'return NO_ERRORS;'
+    ].join('\n');
+    return new Function(...scopeNames, 'collectErrors', 'NO_ERRORS', `return function validate(p) {\n${validateBody}\n};`)(
+        ...scopeValues, collectErrors, NO_ERRORS);
+}
+
+// Required field whose value must be one of values
+function requiredEnum(field, values, message) {
+    return { check: `!!p.${field} && allowed.has(p.${field})`, scope: { allowed: new Set(values) }, message };
+}
+
+// Optional field that must be one of values when present
+function optionalEnum(field, values, message) {
+    return { check: `!p.${field} || allowed.has(p.${field})`, scope: { allowed: new Set(values) }, message };
+}
+
+function required(field, message) {
+    return { check: `!!p.${field}`, message };
+}
+
+// Optional numeric fields, only checked when set
+function optionalInteger(field, message) {
+    return { check: `!p.${field} || Number.isInteger(p.${field})`, message };
+}
+
+function optionalNumber(field, message) {
+    return { check: `!p.${field} || typeof p.${field} === 'number'`, message };
+}
+
+module.exports = {
+    NO_ERRORS,
+    compileSchema,
+    requiredEnum,
+    optionalEnum,
+    required,
+    optionalInteger,
+    optionalNumber
+};